@@ -1,39 +1,68 @@
 """
 API依赖项
 全局依赖，如用户认证、权限验证等
+
+认证依赖返回的用户对象来自认证缓存的快照，不绑定数据库会话，
+需要修改用户数据的接口应在自己的会话中重新查询用户
 """
-from fastapi import Depends, HTTPException, status
+import math
+from typing import Callable, Optional
+
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
 
-from app.core.database import get_db
-from app.core.security import decode_access_token
+from app.core.config import settings
+from app.core.database import get_db, AsyncSessionLocal  # noqa: F401
+from app.core.rate_limit import rate_limiter, RateLimitRule
 from app.models.user import User
+from app.services.auth_cache import auth_cache
 
 
 # HTTP Bearer认证方案
 security = HTTPBearer()
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """
-    获取当前登录用户
-    从JWT令牌中解析用户信息
-    """
-    token = credentials.credentials
-    
-    # 解码JWT令牌
-    payload = decode_access_token(token)
+def _decode_credentials(credentials: HTTPAuthorizationCredentials) -> dict:
+    """解码JWT令牌"""
+    payload = auth_cache.decode_token(credentials.credentials)
     if not payload:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="无效的认证令牌",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
+    return payload
+
+
+async def _load_user(user_id: int) -> User:
+    """获取用户（优先使用快照缓存）"""
+    user = auth_cache.get_user(user_id)
+    if user is not None:
+        return user
+
+    async with AsyncSessionLocal() as db:
+        user = await db.get(User, user_id)
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="用户不存在",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        auth_cache.set_user(user)
+
+    # 返回快照副本，与其他接口拿到的对象行为一致
+    return auth_cache.get_user(user_id) or user
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> User:
+    """
+    获取当前登录用户
+    从JWT令牌中解析用户信息
+    """
+    payload = _decode_credentials(credentials)
+
     # 获取用户ID
     user_id = payload.get("user_id")
     if not user_id:
@@ -42,23 +71,54 @@ async def get_current_user(
             detail="无效的令牌数据",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    # 查询用户
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="用户不存在",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
+
+    user = await _load_user(user_id)
+
     # 检查用户状态
     if user.status.value != "active":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="账号已被禁用"
         )
-    
+
+    return user
+
+
+async def get_current_active_user(
+    current_user: User = Depends(get_current_user)
+) -> User:
+    """
+    获取当前活跃用户
+    get_current_user 已校验用户状态，保留此依赖兼容旧接口
+    """
+    return current_user
+
+
+async def get_current_admin_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> User:
+    """
+    获取当前管理员用户
+    验证JWT token中是否包含管理员标识
+    """
+    payload = _decode_credentials(credentials)
+
+    user_id = payload.get("user_id")
+    if user_id is None or not payload.get("is_admin", False):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="需要管理员权限"
+        )
+
+    user = await _load_user(user_id)
+
+    # 验证是否是管理员账号
+    if user.phone != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="需要管理员权限"
+        )
+
     return user
 
 
@@ -74,6 +134,62 @@ async def get_current_certified_user(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="需要完成实名认证"
         )
-    
+
     return current_user
 
+
+def get_client_ip(request: Request) -> str:
+    """
+    客户端IP
+    直连地址是受信任的反向代理时取代理设置的 X-Real-IP，其次取 X-Forwarded-For 的最后一个地址（代理追加的那个）
+    """
+    peer = request.client.host if request.client else ""
+    if peer in settings.RATE_LIMIT_TRUSTED_PROXIES:
+        forwarded = request.headers.get("x-real-ip") or request.headers.get("x-forwarded-for", "").split(",")[-1]
+        if forwarded.strip():
+            return forwarded.strip()
+    return peer or "unknown"
+
+
+def rate_limit(scope: str, rule: str, by: str = "ip") -> Callable:
+    """
+    生成限流依赖，超过限制时返回 429（带 Retry-After 头）
+
+    在业务逻辑之前执行，被拒绝的请求不会访问数据库或调用短信等外部服务
+
+    Args:
+        scope: 限流场景，不同场景分别计数
+        rule: 限流规则 "次数/秒数"（取自配置），留空表示不限制
+        by: 限流对象：ip - 客户端IP；user - 当前登录用户；其他值 - JSON请求体中的同名字段（如 phone）
+    """
+    parsed = RateLimitRule.parse(rule)
+
+    async def check(key: Optional[str]):
+        if parsed is None or not settings.RATE_LIMIT_ENABLED or not key:
+            return
+        result = await rate_limiter.hit_async(scope, key, parsed)
+        if not result.allowed:
+            retry_after = max(int(math.ceil(result.retry_after)), 1)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"操作过于频繁，请{retry_after}秒后再试",
+                headers={"Retry-After": str(retry_after)},
+            )
+
+    if by == "ip":
+        async def dependency(request: Request):
+            await check(get_client_ip(request))
+    elif by == "user":
+        async def dependency(current_user: User = Depends(get_current_user)):
+            await check(str(current_user.id))
+    else:
+        async def dependency(request: Request):
+            # 请求体已由 FastAPI 读取并缓存，这里不会重复读取；格式错误时交给参数校验返回 422
+            try:
+                body = await request.json()
+            except ValueError:
+                return
+            value = body.get(by) if isinstance(body, dict) else None
+            await check(str(value).strip() if value is not None else None)
+
+    return dependency
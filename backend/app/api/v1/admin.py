@@ -12,6 +12,8 @@ from pydantic import BaseModel
 
 from app.core.database import get_db
 from app.core.response import Response
+from app.core.pagination import paginate, COUNT_PATTERN
+from app.core.rate_limit import rate_limiter
 from app.api.v1.deps import get_current_admin_user
 from app.models.user import User, UserStatus
 from app.models.project import Project, ProjectCategory, ProjectReview
@@ -22,6 +24,14 @@ from app.models.points import PointsGoods, PointsRecord, PointsExchangeRecord
 from app.models.group import UserGroup, GroupMember
 from app.models.invite import InviteRecord, WithdrawRecord
 from app.schemas.project import ProjectCreate, ProjectUpdate
+from app.services.stats_service import stats_service
+from app.services.catalog_cache import catalog_cache
+from app.services.auth_cache import auth_cache
+from app.services.wechat_service import wechat_service
+from app.services.review_service import review_service
+from app.services.pricing_engine import pricing_engine
+from app.services.wallet_service import wallet_service
+from app.services.project_search import project_search, paginate_ids, order_by_ids
 
 
 router = APIRouter()
@@ -102,134 +112,26 @@ async def get_dashboard_stats(
     db: Session = Depends(get_db),
     current_admin: User = Depends(get_current_admin_user)
 ):
-    """获取后台首页统计数据"""
-    from datetime import datetime, timedelta
-    
-    today = datetime.now().date()
-    yesterday = today - timedelta(days=1)
-    this_month_start = today.replace(day=1)
-    last_month_start = (this_month_start - timedelta(days=1)).replace(day=1)
-    last_month_end = this_month_start - timedelta(days=1)
-    
-    # 用户统计
-    total_users = db.query(func.count(User.id)).scalar() or 0
-    today_new_users = db.query(func.count(User.id)).filter(
-        func.date(User.created_at) == today
-    ).scalar() or 0
-    yesterday_new_users = db.query(func.count(User.id)).filter(
-        func.date(User.created_at) == yesterday
-    ).scalar() or 0
-    this_month_users = db.query(func.count(User.id)).filter(
-        func.date(User.created_at) >= this_month_start
-    ).scalar() or 0
-    
-    # 订单统计
-    total_orders = db.query(func.count(Order.id)).scalar() or 0
-    today_orders = db.query(func.count(Order.id)).filter(
-        func.date(Order.created_at) == today
-    ).scalar() or 0
-    yesterday_orders = db.query(func.count(Order.id)).filter(
-        func.date(Order.created_at) == yesterday
-    ).scalar() or 0
-    this_month_orders = db.query(func.count(Order.id)).filter(
-        func.date(Order.created_at) >= this_month_start
-    ).scalar() or 0
-    
-    # 待处理订单
-    pending_orders = db.query(func.count(Order.id)).filter(
-        Order.status.in_(['unpaid', 'paid', 'confirmed'])
-    ).scalar() or 0
-    
-    # 收入统计
-    total_revenue = db.query(func.sum(Order.total_fee)).filter(
-        Order.status.in_(['paid', 'confirmed', 'testing', 'completed'])
-    ).scalar() or 0
-    today_revenue = db.query(func.sum(Order.total_fee)).filter(
-        Order.status.in_(['paid', 'confirmed', 'testing', 'completed']),
-        func.date(Order.paid_at) == today
-    ).scalar() or 0
-    this_month_revenue = db.query(func.sum(Order.total_fee)).filter(
-        Order.status.in_(['paid', 'confirmed', 'testing', 'completed']),
-        func.date(Order.paid_at) >= this_month_start
-    ).scalar() or 0
-    
-    # 项目统计
-    total_projects = db.query(func.count(Project.id)).scalar() or 0
-    active_projects = db.query(func.count(Project.id)).filter(
-        Project.status == 'active'
-    ).scalar() or 0
-    
-    # 充值统计
-    total_recharge = db.query(func.sum(RechargeRecord.amount)).filter(
-        RechargeRecord.status == RechargeStatus.SUCCESS
-    ).scalar() or 0
-    pending_recharge = db.query(func.count(RechargeRecord.id)).filter(
-        RechargeRecord.status == RechargeStatus.PENDING
-    ).scalar() or 0
-    
-    # 最近7天订单趋势
-    order_trend = []
-    for i in range(6, -1, -1):
-        day = today - timedelta(days=i)
-        count = db.query(func.count(Order.id)).filter(
-            func.date(Order.created_at) == day
-        ).scalar() or 0
-        order_trend.append({
-            "date": day.strftime("%m-%d"),
-            "count": count
-        })
-    
-    # 最近7天收入趋势
-    revenue_trend = []
-    for i in range(6, -1, -1):
-        day = today - timedelta(days=i)
-        amount = db.query(func.sum(Order.total_fee)).filter(
-            Order.status.in_(['paid', 'confirmed', 'testing', 'completed']),
-            func.date(Order.paid_at) == day
-        ).scalar() or 0
-        revenue_trend.append({
-            "date": day.strftime("%m-%d"),
-            "amount": float(amount)
-        })
-    
-    # 订单状态分布
-    order_status_dist = []
-    for status_val in ['unpaid', 'paid', 'confirmed', 'testing', 'completed', 'cancelled']:
-        count = db.query(func.count(Order.id)).filter(Order.status == status_val).scalar() or 0
-        order_status_dist.append({"status": status_val, "count": count})
-    
+    """
+    获取后台首页统计数据
+    - 只读取 daily_stats 汇总表，由后台任务每 DASHBOARD_STATS_REFRESH_SECONDS 秒重算
+    - 全量合计和订单状态分布为最近一次刷新时的快照
+    """
+    return Response.success(data=stats_service.get_dashboard_stats(db))
+
+
+@router.get("/cache/stats", summary="获取缓存命中统计")
+async def get_cache_stats(
+    current_admin: User = Depends(get_current_admin_user)
+):
+    """获取进程内缓存的命中/未命中统计"""
     return Response.success(data={
-        "users": {
-            "total": total_users,
-            "today": today_new_users,
-            "yesterday": yesterday_new_users,
-            "this_month": this_month_users
-        },
-        "orders": {
-            "total": total_orders,
-            "today": today_orders,
-            "yesterday": yesterday_orders,
-            "this_month": this_month_orders,
-            "pending": pending_orders
-        },
-        "revenue": {
-            "total": float(total_revenue),
-            "today": float(today_revenue),
-            "this_month": float(this_month_revenue)
-        },
-        "projects": {
-            "total": total_projects,
-            "active": active_projects
-        },
-        "recharge": {
-            "total": float(total_recharge),
-            "pending_count": pending_recharge
-        },
-        "trends": {
-            "orders": order_trend,
-            "revenue": revenue_trend
-        },
-        "order_status_distribution": order_status_dist
+        "catalog": catalog_cache.stats(),
+        "auth": auth_cache.stats(),
+        "wechat_credentials": wechat_service.credentials.stats(),
+        "review_authors": review_service.stats(),
+        "project_prices": pricing_engine.stats(),
+        "rate_limit": rate_limiter.stats()
     })
 
 
@@ -241,6 +143,8 @@ async def get_users(
     page_size: int = Query(20, ge=1, le=100, description="每页数量"),
     search: Optional[str] = Query(None, description="搜索关键字（手机号/昵称）"),
     status: Optional[str] = Query(None, description="用户状态"),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的next_cursor）"),
+    count: Optional[str] = Query(None, pattern=COUNT_PATTERN, description="总数统计方式: exact/estimate/none"),
     db: Session = Depends(get_db),
     current_admin: User = Depends(get_current_admin_user)
 ):
@@ -265,11 +169,8 @@ async def get_users(
     if status:
         query = query.filter(User.status == status)
     
-    # 总数
-    total = query.count()
-    
     # 分页
-    users = query.order_by(User.created_at.desc()).offset((page - 1) * page_size).limit(page_size).all()
+    result = paginate(db, query, User.created_at, User.id, page, page_size, cursor, count)
     
     return Response.success(
         data={
@@ -292,11 +193,9 @@ async def get_users(
                     "created_at": u.created_at.isoformat() if u.created_at else None,
                     "last_login_at": u.last_login_at.isoformat() if u.last_login_at else None
                 }
-                for u in users
+                for u in result.items
             ],
-            "total": total,
-            "page": page,
-            "page_size": page_size
+            **result.meta()
         }
     )
 
@@ -371,6 +270,7 @@ async def update_user_status(
     
     user.status = user_status
     db.commit()
+    auth_cache.invalidate_user(user_id)
     
     return Response.success(message="用户状态修改成功")
 
@@ -395,15 +295,7 @@ async def get_projects_admin(
     - 支持状态筛选
     """
     query = db.query(Project)
-    
-    # 搜索
-    if search:
-        query = query.filter(
-            or_(
-                Project.name.like(f"%{search}%"),
-                Project.project_no.like(f"%{search}%")
-            )
-        )
+    search = (search or "").strip()
     
     # 分类筛选
     if category_id:
@@ -413,11 +305,21 @@ async def get_projects_admin(
     if status:
         query = query.filter(Project.status == status)
     
-    # 总数
-    total = query.count()
-    
-    # 分页
-    projects = query.order_by(Project.created_at.desc()).offset((page - 1) * page_size).limit(page_size).all()
+    if search:
+        # 搜索：由搜索索引返回按相关度排序的项目ID
+        ids = project_search.search(db, search, status=status or None, category_id=category_id)
+        total = len(ids)
+        page_ids = paginate_ids(ids, page, page_size)
+        projects = order_by_ids(
+            query.filter(Project.id.in_(page_ids)).all() if page_ids else [],
+            page_ids
+        )
+    else:
+        # 总数
+        total = query.count()
+        
+        # 分页
+        projects = query.order_by(Project.created_at.desc()).offset((page - 1) * page_size).limit(page_size).all()
     
     return Response.success(
         data={
@@ -468,6 +370,8 @@ async def create_project_admin(
     db.add(new_project)
     db.commit()
     db.refresh(new_project)
+    catalog_cache.invalidate()
+    project_search.index_project(new_project)
     
     return Response.success(
         data={"id": new_project.id},
@@ -496,6 +400,9 @@ async def update_project_admin(
         setattr(existing_project, key, value)
     
     db.commit()
+    catalog_cache.invalidate()
+    pricing_engine.invalidate_project(project_id)
+    project_search.index_project(existing_project)
     
     return Response.success(message="项目更新成功")
 
@@ -518,6 +425,8 @@ async def update_project_status_admin(
     
     project.status = status
     db.commit()
+    catalog_cache.invalidate()
+    project_search.index_project(project)
     
     return Response.success(message="项目状态修改成功")
 
@@ -540,6 +449,8 @@ async def delete_project_admin(
     # 软删除：设置状态为 archived
     project.status = "archived"
     db.commit()
+    catalog_cache.invalidate()
+    project_search.index_project(project)
     
     return Response.success(message="项目删除成功")
 
@@ -552,6 +463,8 @@ async def get_orders_admin(
     page_size: int = Query(20, ge=1, le=100, description="每页数量"),
     search: Optional[str] = Query(None, description="搜索关键字（订单号/用户手机号）"),
     status: Optional[str] = Query(None, description="订单状态筛选"),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的next_cursor）"),
+    count: Optional[str] = Query(None, pattern=COUNT_PATTERN, description="总数统计方式: exact/estimate/none"),
     db: Session = Depends(get_db),
     current_admin: User = Depends(get_current_admin_user)
 ):
@@ -580,15 +493,12 @@ async def get_orders_admin(
     if status:
         query = query.filter(Order.status == status)
     
-    # 总数
-    total = query.count()
-    
     # 分页查询
-    orders_db = query.order_by(Order.created_at.desc()).offset((page - 1) * page_size).limit(page_size).all()
+    result = paginate(db, query, Order.created_at, Order.id, page, page_size, cursor, count)
     
     # 格式化返回
     orders = []
-    for o in orders_db:
+    for o in result.items:
         orders.append({
             "id": o.id,
             "order_no": o.order_no,
@@ -599,17 +509,15 @@ async def get_orders_admin(
             "project_name": o.project.name if o.project else None,
             "sample_name": o.sample_name,
             "quantity": o.quantity,
-            "total_amount": float(o.total_fee or 0),
+            "total_amount": o.total_fee or 0,
             "status": o.status,
-            "created_at": o.created_at.isoformat() if o.created_at else None,
-            "paid_at": o.paid_at.isoformat() if o.paid_at else None
+            "created_at": o.created_at,
+            "paid_at": o.paid_at
         })
     
     return Response.success(data={
         "items": orders,
-        "total": total,
-        "page": page,
-        "page_size": page_size
+        **result.meta()
     })
 
 
@@ -765,6 +673,7 @@ async def create_category_admin(
     db.add(category)
     db.commit()
     db.refresh(category)
+    catalog_cache.invalidate()
     
     return Response.success(data={"id": category.id}, message="分类创建成功")
 
@@ -785,6 +694,7 @@ async def update_category_admin(
         setattr(category, key, value)
     
     db.commit()
+    catalog_cache.invalidate()
     return Response.success(message="分类更新成功")
 
 
@@ -806,6 +716,7 @@ async def delete_category_admin(
     
     db.delete(category)
     db.commit()
+    catalog_cache.invalidate()
     return Response.success(message="分类删除成功")
 
 
@@ -937,6 +848,8 @@ async def get_recharges_admin(
     page_size: int = Query(20, ge=1, le=100),
     search: Optional[str] = Query(None, description="搜索充值单号/用户手机号"),
     status: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的next_cursor）"),
+    count: Optional[str] = Query(None, pattern=COUNT_PATTERN, description="总数统计方式: exact/estimate/none"),
     db: Session = Depends(get_db),
     current_admin: User = Depends(get_current_admin_user)
 ):
@@ -955,8 +868,8 @@ async def get_recharges_admin(
     if status:
         query = query.filter(RechargeRecord.status == status)
     
-    total = query.count()
-    records = query.order_by(desc(RechargeRecord.created_at)).offset((page - 1) * page_size).limit(page_size).all()
+    result = paginate(db, query, RechargeRecord.created_at, RechargeRecord.id, page, page_size, cursor, count)
+    records = result.items
     
     # 获取用户信息
     user_ids = [r.user_id for r in records]
@@ -981,9 +894,7 @@ async def get_recharges_admin(
             }
             for r in records
         ],
-        "total": total,
-        "page": page,
-        "page_size": page_size
+        **result.meta()
     })
 
 
@@ -996,7 +907,8 @@ async def update_recharge_status_admin(
     current_admin: User = Depends(get_current_admin_user)
 ):
     """管理员修改充值状态"""
-    record = db.query(RechargeRecord).filter(RechargeRecord.id == recharge_id).first()
+    # 锁定充值记录，与支付回调串行处理，余额只增加一次
+    record = db.query(RechargeRecord).filter(RechargeRecord.id == recharge_id).with_for_update().first()
     if not record:
         raise HTTPException(status_code=404, detail="充值记录不存在")
     
@@ -1006,13 +918,17 @@ async def update_recharge_status_admin(
     if remark:
         record.remark = remark
     
-    # 如果状态改为成功，更新用户余额
+    # 如果状态改为成功，增加用户余额（原子更新并记录钱包流水）
     if new_status == "success" and old_status != "success":
-        user = db.query(User).filter(User.id == record.user_id).first()
-        if user:
-            actual_amount = record.actual_amount or record.amount
-            user.prepaid_balance = (user.prepaid_balance or 0) + actual_amount
-            record.completed_at = datetime.utcnow()
+        wallet_service.credit_sync(
+            db,
+            record.user_id,
+            record.actual_amount or record.amount,
+            biz_type="recharge",
+            biz_no=record.recharge_no,
+            remark=f"管理员确认充值（管理员ID：{current_admin.id}）"
+        )
+        record.completed_at = datetime.utcnow()
     
     db.commit()
     return Response.success(message=f"充值状态已从 {old_status} 更新为 {new_status}")
@@ -3,14 +3,16 @@
 用户注册、登录、短信验证码
 """
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 from pydantic import BaseModel
 
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.core.security import verify_password, get_password_hash, create_access_token
 from app.core.response import Response
 from app.core.config import settings
+from app.api.deps import rate_limit
 from app.models.user import User
 from app.schemas.user import UserRegister, UserLogin, SMSCodeRequest, SMSLoginRequest, WechatLoginRequest, TokenResponse
 from app.services.sms_service import sms_service
@@ -26,10 +28,14 @@ class AdminLoginRequest(BaseModel):
     password: str
 
 
-@router.post("/send-sms", summary="发送短信验证码")
+@router.post("/send-sms", summary="发送短信验证码", dependencies=[
+    Depends(rate_limit("sms_ip", settings.RATE_LIMIT_SMS_IP)),
+    Depends(rate_limit("sms_phone", settings.RATE_LIMIT_SMS_PHONE, by="phone")),
+    Depends(rate_limit("sms_phone_daily", settings.RATE_LIMIT_SMS_PHONE_DAILY, by="phone")),
+])
 async def send_sms_code(
     request: SMSCodeRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     发送短信验证码
@@ -41,7 +47,7 @@ async def send_sms_code(
     """
     # 如果是注册场景，检查手机号是否已注册
     if request.scene == "register":
-        existing_user = db.query(User).filter(User.phone == request.phone).first()
+        existing_user = (await db.execute(select(User).where(User.phone == request.phone))).scalar_one_or_none()
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -51,7 +57,7 @@ async def send_sms_code(
     # login场景：不检查用户是否存在，支持自动注册
     # reset_password场景：检查用户是否存在
     if request.scene == "reset_password":
-        existing_user = db.query(User).filter(User.phone == request.phone).first()
+        existing_user = (await db.execute(select(User).where(User.phone == request.phone))).scalar_one_or_none()
         if not existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -83,7 +89,7 @@ async def send_sms_code(
 @router.post("/register", response_model=TokenResponse, summary="用户注册")
 async def register(
     request: UserRegister,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     用户注册
@@ -108,7 +114,7 @@ async def register(
         )
     
     # 检查手机号是否已注册
-    existing_user = db.query(User).filter(User.phone == request.phone).first()
+    existing_user = (await db.execute(select(User).where(User.phone == request.phone))).scalar_one_or_none()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -124,8 +130,8 @@ async def register(
     )
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     
     # 生成JWT令牌
     access_token = create_access_token(
@@ -140,10 +146,13 @@ async def register(
     )
 
 
-@router.post("/login", response_model=TokenResponse, summary="用户登录")
+@router.post("/login", response_model=TokenResponse, summary="用户登录", dependencies=[
+    Depends(rate_limit("login_ip", settings.RATE_LIMIT_LOGIN_IP)),
+    Depends(rate_limit("login_phone", settings.RATE_LIMIT_LOGIN_PHONE, by="phone")),
+])
 async def login(
     request: UserLogin,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     用户登录
@@ -152,7 +161,7 @@ async def login(
     2. 返回JWT令牌
     """
     # 查询用户
-    user = db.query(User).filter(User.phone == request.phone).first()
+    user = (await db.execute(select(User).where(User.phone == request.phone))).scalar_one_or_none()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -176,7 +185,7 @@ async def login(
     # 更新最后登录时间
     from datetime import datetime
     user.last_login_at = datetime.utcnow()
-    db.commit()
+    await db.commit()
     
     # 生成JWT令牌
     access_token = create_access_token(
@@ -191,10 +200,13 @@ async def login(
     )
 
 
-@router.post("/sms-login", response_model=TokenResponse, summary="短信验证码登录")
+@router.post("/sms-login", response_model=TokenResponse, summary="短信验证码登录", dependencies=[
+    Depends(rate_limit("login_ip", settings.RATE_LIMIT_LOGIN_IP)),
+    Depends(rate_limit("login_phone", settings.RATE_LIMIT_LOGIN_PHONE, by="phone")),
+])
 async def sms_login(
     request: SMSLoginRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     短信验证码登录
@@ -218,7 +230,7 @@ async def sms_login(
         )
     
     # 查找用户
-    user = db.query(User).filter(User.phone == request.phone).first()
+    user = (await db.execute(select(User).where(User.phone == request.phone))).scalar_one_or_none()
     
     # 如果用户不存在，自动注册
     if not user:
@@ -234,8 +246,8 @@ async def sms_login(
         )
         
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
     
     # 检查用户状态
     if user.status.value != "active":
@@ -247,7 +259,7 @@ async def sms_login(
     # 更新最后登录时间
     from datetime import datetime
     user.last_login_at = datetime.utcnow()
-    db.commit()
+    await db.commit()
     
     # 生成JWT令牌
     access_token = create_access_token(
@@ -265,7 +277,7 @@ async def sms_login(
 @router.post("/wechat-login", summary="微信小程序登录")
 async def wechat_login(
     request: WechatLoginRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     微信小程序登录
@@ -293,7 +305,7 @@ async def wechat_login(
         )
     
     # 2. 根据openid查询用户
-    user = db.query(User).filter(User.wechat_openid == openid).first()
+    user = (await db.execute(select(User).where(User.wechat_openid == openid))).scalar_one_or_none()
     
     # 如果用户不存在，自动创建
     if not user:
@@ -306,8 +318,8 @@ async def wechat_login(
         )
         
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
     
     # 检查用户状态
     if user.status.value != "active":
@@ -319,7 +331,7 @@ async def wechat_login(
     # 更新最后登录时间
     from datetime import datetime
     user.last_login_at = datetime.utcnow()
-    db.commit()
+    await db.commit()
     
     # 3. 生成JWT令牌
     access_token = create_access_token(
@@ -338,10 +350,12 @@ async def wechat_login(
     )
 
 
-@router.post("/admin-login", summary="管理员登录")
+@router.post("/admin-login", summary="管理员登录", dependencies=[
+    Depends(rate_limit("login_ip", settings.RATE_LIMIT_LOGIN_IP)),
+])
 async def admin_login(
     request: AdminLoginRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     管理员登录（用户名+密码）
@@ -353,7 +367,7 @@ async def admin_login(
     # 验证管理员账号
     if request.username == "admin" and request.password == "123456":
         # 查找或创建管理员用户
-        admin_user = db.query(User).filter(User.phone == "admin").first()
+        admin_user = (await db.execute(select(User).where(User.phone == "admin"))).scalar_one_or_none()
         
         if not admin_user:
             # 创建管理员用户
@@ -365,13 +379,13 @@ async def admin_login(
                 is_certified=True
             )
             db.add(admin_user)
-            db.commit()
-            db.refresh(admin_user)
+            await db.commit()
+            await db.refresh(admin_user)
         
         # 更新最后登录时间
         from datetime import datetime
         admin_user.last_login_at = datetime.utcnow()
-        db.commit()
+        await db.commit()
         
         # 生成JWT令牌
         access_token = create_access_token(
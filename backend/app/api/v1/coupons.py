@@ -3,13 +3,16 @@
 """
 from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
+from datetime import datetime
+from typing import Optional
 
 from app.core.database import get_db
 from app.core.response import Response
+from app.core.pagination import paginate, COUNT_PATTERN
 from app.api.v1.deps import get_current_user
 from app.models.user import User
 from app.models.coupon import Coupon, UserCoupon, CouponStatus, UserCouponStatus
+from app.services.coupon_inventory import coupon_inventory, CouponClaimError
 
 
 router = APIRouter()
@@ -20,6 +23,8 @@ async def get_my_coupons(
     status: str = Query("available", description="券状态：available,used,expired"),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的next_cursor）"),
+    count: Optional[str] = Query(None, pattern=COUNT_PATTERN, description="总数统计方式: exact/estimate/none"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -43,11 +48,8 @@ async def get_my_coupons(
             (UserCoupon.expire_at <= datetime.now())
         )
     
-    # 总数
-    total = query.count()
-    
     # 分页查询
-    items = query.order_by(UserCoupon.created_at.desc()).offset((page - 1) * page_size).limit(page_size).all()
+    result = paginate(db, query, UserCoupon.created_at, UserCoupon.id, page, page_size, cursor, count)
     
     # 统计可用优惠券数量
     available_count = db.query(UserCoupon).filter(
@@ -58,7 +60,7 @@ async def get_my_coupons(
     
     # 格式化返回数据
     coupon_list = []
-    for item in items:
+    for item in result.items:
         coupon_list.append({
             "id": item.id,
             "coupon_id": item.coupon_id,
@@ -74,9 +76,7 @@ async def get_my_coupons(
     
     return Response.success(data={
         "items": coupon_list,
-        "total": total,
-        "page": page,
-        "page_size": page_size,
+        **result.meta(),
         "available_count": available_count
     })
 
@@ -164,47 +164,14 @@ async def receive_coupon(
     if coupon.end_time and coupon.end_time < now:
         raise HTTPException(status_code=400, detail="优惠券已过期")
     
-    # 检查库存
+    # 快速失败：已领完的优惠券不再进入事务（以条件 UPDATE 的结果为准）
     if coupon.total_quantity > 0 and coupon.received_quantity >= coupon.total_quantity:
         raise HTTPException(status_code=400, detail="优惠券已被领完")
     
-    # 检查是否已领取
-    existing = db.query(UserCoupon).filter(
-        UserCoupon.user_id == current_user.id,
-        UserCoupon.coupon_id == coupon_id,
-        UserCoupon.status == UserCouponStatus.UNUSED
-    ).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="您已领取过该优惠券")
-    
-    # 创建用户优惠券
-    expire_at = datetime.now() + timedelta(days=coupon.valid_days)
-    
-    # 确定优惠值
-    discount_value = None
-    if coupon.type.value == "discount":
-        discount_value = coupon.discount_rate
-    elif coupon.type.value == "cash":
-        discount_value = coupon.cash_amount
-    elif coupon.type.value == "full_reduction":
-        discount_value = coupon.reduction_amount
-    
-    user_coupon = UserCoupon(
-        user_id=current_user.id,
-        coupon_id=coupon.id,
-        coupon_name=coupon.name,
-        coupon_type=coupon.type.value,
-        discount_value=discount_value,
-        status=UserCouponStatus.UNUSED,
-        expire_at=expire_at
-    )
-    db.add(user_coupon)
-    
-    # 更新优惠券领取数量
-    coupon.received_quantity += 1
-    
-    db.commit()
-    db.refresh(user_coupon)
+    try:
+        user_coupon = coupon_inventory.claim(db, coupon, current_user.id)
+    except CouponClaimError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return Response.success(data={
         "id": user_coupon.id,
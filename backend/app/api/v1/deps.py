@@ -1,19 +1,16 @@
 """
 API依赖注入
+认证依赖统一由 app.api.deps 提供，此处保留导入路径兼容旧代码
 """
-from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import jwt, JWTError
-from sqlalchemy.orm import Session
+from typing import Generator
 
-from app.core.config import settings
 from app.core.database import SessionLocal
-from app.models.user import User
-
-
-# HTTP Bearer Token
-security = HTTPBearer()
+from app.api.deps import (  # noqa: F401
+    security,
+    get_current_user,
+    get_current_active_user,
+    get_current_admin_user,
+)
 
 
 def get_db() -> Generator:
@@ -23,103 +20,3 @@ def get_db() -> Generator:
         yield db
     finally:
         db.close()
-
-
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """
-    获取当前登录用户
-    从JWT token中解析用户ID并查询用户信息
-    """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="无法验证凭据",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    
-    try:
-        # 解析token
-        token = credentials.credentials
-        payload = jwt.decode(
-            token,
-            settings.JWT_SECRET_KEY,
-            algorithms=[settings.JWT_ALGORITHM]
-        )
-        user_id: int = payload.get("user_id")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    # 查询用户
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
-        raise credentials_exception
-    
-    return user
-
-
-def get_current_active_user(
-    current_user: User = Depends(get_current_user)
-) -> User:
-    """
-    获取当前活跃用户
-    验证用户状态是否为活跃
-    """
-    if current_user.status.value != "active":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="用户已被禁用"
-        )
-    return current_user
-
-
-def get_current_admin_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """
-    获取当前管理员用户
-    验证JWT token中是否包含管理员标识
-    """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="无法验证凭据",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    
-    try:
-        # 解析token
-        token = credentials.credentials
-        payload = jwt.decode(
-            token,
-            settings.JWT_SECRET_KEY,
-            algorithms=[settings.JWT_ALGORITHM]
-        )
-        user_id: int = payload.get("user_id")
-        is_admin: bool = payload.get("is_admin", False)
-        
-        if user_id is None or not is_admin:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="需要管理员权限"
-            )
-    except JWTError:
-        raise credentials_exception
-    
-    # 查询用户
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
-        raise credentials_exception
-    
-    # 验证是否是管理员账号
-    if user.phone != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="需要管理员权限"
-        )
-    
-    return user
-
@@ -12,7 +12,8 @@ from app.core.database import get_db
 from app.core.response import Response
 from app.api.v1.deps import get_current_user
 from app.models.user import User
-from app.models.invite import InviteRecord, WithdrawRecord, InviteConfig, InviteStatus, WithdrawStatus
+from app.models.invite import InviteRecord, InviteConfig
+from app.services.invite_rewards import invite_reward_service, WithdrawError
 
 
 router = APIRouter()
@@ -34,36 +35,17 @@ async def get_invite_stats(
     """
     获取用户的邀请统计数据
     """
-    # 查询邀请记录
-    invite_records = db.query(InviteRecord).filter(
-        InviteRecord.inviter_id == current_user.id
-    ).all()
-    
-    # 统计数据
-    total_invites = len(invite_records)
-    completed_invites = len([r for r in invite_records if r.status == InviteStatus.COMPLETED])
-    pending_invites = len([r for r in invite_records if r.status == InviteStatus.PENDING])
-    
-    # 计算奖励金额
-    total_reward = sum(float(r.reward_amount) for r in invite_records if r.status == InviteStatus.COMPLETED)
-    
-    # 查询已提现金额
-    withdrawn_records = db.query(WithdrawRecord).filter(
-        WithdrawRecord.user_id == current_user.id,
-        WithdrawRecord.status.in_([WithdrawStatus.APPROVED, WithdrawStatus.COMPLETED])
-    ).all()
-    withdrawn = sum(float(r.amount) for r in withdrawn_records)
-    
-    # 可提现金额
-    withdrawable = total_reward - withdrawn
+    # 邀请数、奖励和提现金额按状态聚合（两条 GROUP BY 查询）
+    summary = invite_reward_service.summary(db, current_user.id)
     
     return Response.success(data={
-        "withdrawable": withdrawable,
-        "my_invites": total_invites,
-        "completed_invites": completed_invites,
-        "pending_invites": pending_invites,
-        "total_reward": total_reward,
-        "withdrawn": withdrawn
+        "withdrawable": float(summary["withdrawable"]),
+        "my_invites": summary["total_invites"],
+        "completed_invites": summary["completed_invites"],
+        "pending_invites": summary["pending_invites"],
+        "total_reward": float(summary["total_reward"]),
+        "withdrawn": float(summary["withdrawn"]),
+        "pending_withdraw": float(summary["pending_withdraw"])
     })
 
 
@@ -112,7 +94,7 @@ async def get_invite_records(
 
 @router.post("/withdraw", summary="申请提现")
 async def withdraw_rewards(
-    amount: float = Query(..., description="提现金额"),
+    data: WithdrawRequest,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -129,41 +111,21 @@ async def withdraw_rewards(
     if amount < config.min_withdraw_amount:
         raise HTTPException(status_code=400, detail=f"最低提现金额为{config.min_withdraw_amount}元")
     
-    # 计算可提现金额
-    invite_records = db.query(InviteRecord).filter(
-        InviteRecord.inviter_id == current_user.id,
-        InviteRecord.status == InviteStatus.COMPLETED
-    ).all()
-    total_reward = sum(r.reward_amount for r in invite_records)
-    
-    withdrawn_records = db.query(WithdrawRecord).filter(
-        WithdrawRecord.user_id == current_user.id,
-        WithdrawRecord.status.in_([WithdrawStatus.APPROVED, WithdrawStatus.COMPLETED])
-    ).all()
-    withdrawn = sum(r.amount for r in withdrawn_records)
-    
-    available = total_reward - withdrawn
-    
-    if amount > available:
-        raise HTTPException(status_code=400, detail=f"可提现金额不足，当前可提现：{available}元")
-    
-    # 创建提现记录
-    withdraw = WithdrawRecord(
-        user_id=current_user.id,
-        amount=amount,
-        withdraw_type="invite_reward",
-        account_type=data.account_type,
-        account_name=data.account_name,
-        account_number=data.account_number,
-        status=WithdrawStatus.PENDING
-    )
-    db.add(withdraw)
-    db.commit()
-    db.refresh(withdraw)
+    # 锁定用户后计算可提现金额并创建提现记录
+    try:
+        withdraw = invite_reward_service.apply_withdraw(
+            db,
+            current_user.id,
+            amount,
+            account_type=data.account_type,
+            account_name=data.account_name,
+            account_number=data.account_number
+        )
+    except WithdrawError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return Response.success(data={
         "withdraw_id": withdraw.id,
         "amount": float(withdraw.amount),
         "status": withdraw.status.value
     }, message="提现申请已提交，请等待审核")
-
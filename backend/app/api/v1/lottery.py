@@ -6,13 +6,18 @@ from sqlalchemy.orm import Session
 from sqlalchemy import desc, func
 from typing import Optional
 from datetime import datetime, timedelta
-import random
 
+from app.core.config import settings
 from app.core.database import get_db
 from app.core.response import Response
+from app.core.pagination import paginate, COUNT_PATTERN
 from app.api.v1.deps import get_current_user
+from app.api.deps import rate_limit
 from app.models.user import User
 from app.models.lottery import LotteryPrize, LotteryRecord, LotteryChance, PrizeType, PrizeStatus
+from app.services.lottery_engine import lottery_engine
+from app.services.wallet_service import wallet_service
+from app.services.points_ledger import points_ledger
 
 
 router = APIRouter()
@@ -45,87 +50,19 @@ async def get_lottery_chances(
     })
 
 
-@router.post("/draw", summary="进行抽奖")
+@router.post("/draw", summary="进行抽奖", dependencies=[
+    Depends(rate_limit("lottery_user", settings.RATE_LIMIT_LOTTERY_USER, by="user")),
+])
 async def do_lottery(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """进行一次抽奖"""
-    now = datetime.utcnow()
-    
-    # 检查是否有抽奖机会
-    chance = db.query(LotteryChance).filter(
-        LotteryChance.user_id == current_user.id,
-        LotteryChance.is_used == False,
-        (LotteryChance.expire_at == None) | (LotteryChance.expire_at > now)
-    ).first()
-    
-    if not chance:
-        raise HTTPException(status_code=400, detail="暂无抽奖次数")
-    
-    # 获取所有可用奖品
-    prizes = db.query(LotteryPrize).filter(
-        LotteryPrize.is_active == True
-    ).order_by(LotteryPrize.sort_order).all()
-    
-    if not prizes:
-        raise HTTPException(status_code=400, detail="暂无可抽取的奖品")
-    
-    # 按概率抽奖
-    total_probability = sum(p.probability for p in prizes)
-    if total_probability == 0:
-        raise HTTPException(status_code=400, detail="奖品概率配置错误")
-    
-    rand = random.randint(1, 10000)
-    cumulative = 0
-    selected_prize = None
-    
-    for prize in prizes:
-        cumulative += prize.probability
-        if rand <= cumulative:
-            selected_prize = prize
-            break
-    
-    # 如果没选中任何奖品，选择最后一个（通常是谢谢参与）
-    if not selected_prize:
-        selected_prize = prizes[-1]
-    
-    # 检查奖品是否还有库存
-    if selected_prize.total_limit > 0 and selected_prize.issued_count >= selected_prize.total_limit:
-        # 库存不足，选择谢谢参与或其他奖品
-        empty_prize = db.query(LotteryPrize).filter(
-            LotteryPrize.prize_type == PrizeType.EMPTY,
-            LotteryPrize.is_active == True
-        ).first()
-        if empty_prize:
-            selected_prize = empty_prize
-    
-    # 创建中奖记录
-    record = LotteryRecord(
-        user_id=current_user.id,
-        prize_id=selected_prize.id,
-        prize_name=selected_prize.name,
-        prize_type=selected_prize.prize_type.value if selected_prize.prize_type else None,
-        prize_value=selected_prize.value,
-        prize_icon=selected_prize.icon,
-        status=PrizeStatus.UNCLAIMED if selected_prize.prize_type != PrizeType.EMPTY else PrizeStatus.CLAIMED,
-        expire_at=now + timedelta(days=7)  # 7天内领取
-    )
-    db.add(record)
-    
-    # 更新奖品发放数量
-    selected_prize.issued_count += 1
-    
-    # 标记抽奖机会已使用
-    chance.is_used = True
-    chance.used_at = now
-    
-    db.commit()
-    db.refresh(record)
-    
-    # 更新机会记录
-    chance.record_id = record.id
-    db.commit()
+    try:
+        record, selected_prize = lottery_engine.draw(db, current_user.id)
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
     
     return Response.success(data={
         "prize": {
@@ -170,6 +107,8 @@ async def get_lottery_records(
     status: Optional[str] = Query(None, description="状态筛选"),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的next_cursor）"),
+    count: Optional[str] = Query(None, pattern=COUNT_PATTERN, description="总数统计方式: exact/estimate/none"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -181,8 +120,7 @@ async def get_lottery_records(
     if status:
         query = query.filter(LotteryRecord.status == status)
     
-    total = query.count()
-    records = query.order_by(desc(LotteryRecord.created_at)).offset((page - 1) * page_size).limit(page_size).all()
+    result = paginate(db, query, LotteryRecord.created_at, LotteryRecord.id, page, page_size, cursor, count)
     
     return Response.success(data={
         "items": [
@@ -198,11 +136,9 @@ async def get_lottery_records(
                 "claimed_at": r.claimed_at.isoformat() if r.claimed_at else None,
                 "expire_at": r.expire_at.isoformat() if r.expire_at else None
             }
-            for r in records
+            for r in result.items
         ],
-        "total": total,
-        "page": page,
-        "page_size": page_size
+        **result.meta()
     })
 
 
@@ -213,10 +149,11 @@ async def claim_prize(
     current_user: User = Depends(get_current_user)
 ):
     """领取中奖奖品"""
+    # 锁定中奖记录，同一奖品的并发领取只有一个成功
     record = db.query(LotteryRecord).filter(
         LotteryRecord.id == record_id,
         LotteryRecord.user_id == current_user.id
-    ).first()
+    ).with_for_update().first()
     
     if not record:
         raise HTTPException(status_code=404, detail="中奖记录不存在")
@@ -238,11 +175,26 @@ async def claim_prize(
     
     if prize:
         if prize.prize_type == PrizeType.POINTS:
-            # 发放积分
-            current_user.points_balance = (current_user.points_balance or 0) + (prize.points_amount or 0)
+            # 发放积分（原子更新并记录积分流水）
+            if prize.points_amount:
+                points_ledger.record(
+                    db,
+                    current_user.id,
+                    prize.points_amount,
+                    type="lottery",
+                    related_id=record.id,
+                    description=f"抽奖奖品：{prize.name}"
+                )
         elif prize.prize_type == PrizeType.CASH:
-            # 发放现金红包到余额
-            current_user.prepaid_balance = (current_user.prepaid_balance or 0) + prize.value
+            # 发放现金红包到余额（原子更新并记录钱包流水）
+            wallet_service.credit_sync(
+                db,
+                current_user.id,
+                prize.value,
+                biz_type="prize",
+                biz_no=str(record.id),
+                remark=f"抽奖奖品：{prize.name}"
+            )
         elif prize.prize_type == PrizeType.COUPON and prize.coupon_id:
             # 发放优惠券
             from app.models.coupon import Coupon, UserCoupon, UserCouponStatus
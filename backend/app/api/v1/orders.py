@@ -3,89 +3,82 @@
 """
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
-import time
 from decimal import Decimal
 
-from app.api.deps import get_db, get_current_user
+from app.core.database import get_async_db
+from app.core.id_generator import id_generator
+from app.api.deps import get_current_user
 from app.models.user import User
-from app.models.order import Order, OrderSample, OrderFee, OrderStatusHistory, UserAddress
-from app.models.project import Project
+from app.models.order import Order, OrderSample, OrderStatusHistory, UserAddress
+from app.models.coupon import UserCoupon, UserCouponStatus
+from app.models.points import PointsRecord
+from app.services.pricing_engine import pricing_engine, PricingError, ProjectNotFoundError
+from app.services.points_ledger import points_ledger, InsufficientPointsError
+from app.services.order_writer import order_writer
 from app.schemas.order import (
     OrderCreate, OrderCalculate, OrderCalculateResponse,
     OrderDetail, OrderListResponse, OrderListItem, OrderCancel, OrderFeeDetail
 )
 from app.core.response import SuccessResponse, ErrorResponse
+from app.core.pagination import paginate, COUNT_PATTERN
 
 router = APIRouter()
 
 
+# 可由用户直接取消的订单状态
+CANCELLABLE_STATUSES = ("pending_payment", "confirmed")
+
+
 def generate_order_no() -> str:
     """生成订单号"""
-    return f"ORD{int(time.time())}{int(time.time() * 1000000) % 1000000}"
+    return id_generator.next_no("ORD")
 
 
 @router.post("/calculate")
 async def calculate_order(
     data: OrderCalculate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     计算订单费用（下单前）
     """
-    # 从数据库查询项目信息
-    project = db.query(Project).filter(Project.id == data.project_id).first()
-    if not project:
-        raise HTTPException(status_code=404, detail="项目不存在")
-    
-    # 基础费用：项目单价 × 样品数量
-    project_fee = Decimal(str(project.current_price)) * data.sample_count
-    
-    # 加急费用
-    urgent_fee = Decimal("100.00") if data.is_urgent else Decimal("0")
-    
-    # 运费计算
-    shipping_fee = Decimal("0")
-    if data.shipping_method == "express":
-        shipping_fee = Decimal("20.00")
-    elif data.shipping_method == "platform":
-        shipping_fee = Decimal("30.00")
-    
-    # 优惠计算
-    discount_amount = Decimal("0")
-    if data.coupon_id:
-        discount_amount = Decimal("50.00")  # 模拟优惠券
-    
-    # 积分抵扣（100积分=1元，最多抵扣20%）
-    if data.use_points > 0:
-        points_discount = Decimal(data.use_points) / 100
-        max_discount = (project_fee + urgent_fee + shipping_fee) * Decimal("0.2")
-        points_discount = min(points_discount, max_discount)
-        discount_amount += points_discount
-    
-    # 总费用
-    total_fee = project_fee + urgent_fee + shipping_fee - discount_amount
-    
-    # 费用明细
-    fee_details = [
-        OrderFeeDetail(fee_type="project", fee_name="检测费用", amount=project_fee)
-    ]
-    if urgent_fee > 0:
-        fee_details.append(OrderFeeDetail(fee_type="urgent", fee_name="加急费用", amount=urgent_fee))
-    if shipping_fee > 0:
-        fee_details.append(OrderFeeDetail(fee_type="shipping", fee_name="运费", amount=shipping_fee))
-    if discount_amount > 0:
-        fee_details.append(OrderFeeDetail(fee_type="discount", fee_name="优惠", amount=-discount_amount))
+    try:
+        quote = await pricing_engine.quote(
+            db,
+            current_user.id,
+            data.project_id,
+            sample_count=data.sample_count,
+            is_urgent=data.is_urgent,
+            shipping_method=data.shipping_method,
+            coupon_id=data.coupon_id,
+            use_points=data.use_points,
+            points_balance=current_user.points_balance or 0
+        )
+    except ProjectNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except PricingError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     result = OrderCalculateResponse(
-        project_fee=project_fee,
-        urgent_fee=urgent_fee,
-        shipping_fee=shipping_fee,
-        discount_amount=discount_amount,
-        total_fee=total_fee,
-        fee_details=fee_details
+        project_fee=quote.project_fee,
+        urgent_fee=quote.urgent_fee,
+        shipping_fee=quote.shipping_fee,
+        discount_amount=quote.discount_amount,
+        total_fee=quote.total_fee,
+        fee_details=[
+            OrderFeeDetail(fee_type=fee_type, fee_name=fee_name, amount=amount)
+            for fee_type, fee_name, amount in quote.fee_details()
+        ],
+        coupon_id=quote.coupon.user_coupon_id if quote.coupon else None,
+        coupon_discount=quote.coupon_discount,
+        points_used=quote.points_used,
+        points_discount=quote.points_discount,
+        best_coupon_id=quote.best_coupon_id,
+        available_coupons=quote.available_coupons
     )
     
     return SuccessResponse(data=result)
@@ -94,7 +87,7 @@ async def calculate_order(
 @router.post("/create")
 async def create_order(
     data: OrderCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -103,57 +96,49 @@ async def create_order(
     # 验证地址（如果需要）
     address = None
     if data.shipping_method in ["express", "platform"] and data.address_id:
-        address = db.query(UserAddress).filter(
-            UserAddress.id == data.address_id,
-            UserAddress.user_id == current_user.id
-        ).first()
+        address = (await db.execute(
+            select(UserAddress).where(
+                UserAddress.id == data.address_id,
+                UserAddress.user_id == current_user.id
+            )
+        )).scalar_one_or_none()
         if not address:
             raise HTTPException(status_code=400, detail="地址不存在")
     
-    # 从数据库查询项目信息
-    project = db.query(Project).filter(Project.id == data.project_id).first()
-    if not project:
-        raise HTTPException(status_code=404, detail="项目不存在")
-    
-    project_id = data.project_id
-    project_fee = project.current_price  # 从数据库获取项目价格
-    project_name = project.name
-    lab_id = project.lab_id if project.lab_id else 1
-    lab_name = project.lab_name if hasattr(project, 'lab_name') else "平台实验室"
-    
-    # 计算费用：项目单价 × 样品数量
-    project_fee = Decimal(str(project_fee)) * len(data.samples)
-    
-    # 加急费用
-    urgent_fee = Decimal("100.00") if data.is_urgent else Decimal("0")
-    
-    # 运费
-    shipping_fee = Decimal("0")
-    if data.shipping_method == "express":
-        shipping_fee = Decimal("20.00")
-    elif data.shipping_method == "platform":
-        shipping_fee = Decimal("30.00")
-    
-    # 优惠金额
-    discount_amount = Decimal("0")
-    
-    # 总费用
-    total_fee = project_fee + urgent_fee + shipping_fee - discount_amount
-    
-    # 创建订单
-    order = Order(
-        order_no=generate_order_no(),
+    # 计价（与试算同一套逻辑，项目价格从数据库重新读取）
+    try:
+        quote = await pricing_engine.quote(
+            db,
+            current_user.id,
+            data.project_id,
+            sample_count=len(data.samples),
+            is_urgent=data.is_urgent,
+            shipping_method=data.shipping_method,
+            coupon_id=data.coupon_id,
+            use_points=data.use_points,
+            fresh=True
+        )
+    except ProjectNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except PricingError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    project = quote.project
+    
+    # 创建订单（主表、样品、费用明细、状态记录批量写入）
+    order_no = generate_order_no()
+    order_values = dict(
+        order_no=order_no,
         user_id=current_user.id,
-        project_id=project_id,
-        project_name=project_name,
-        lab_id=lab_id,
-        lab_name=lab_name,
+        project_id=project.id,
+        project_name=project.name,
+        lab_id=project.lab_id,
+        lab_name=project.lab_name,
         status="pending_payment",
-        project_fee=project_fee,
-        urgent_fee=urgent_fee,
-        shipping_fee=shipping_fee,
-        discount_amount=discount_amount,
-        total_fee=total_fee,
+        project_fee=quote.project_fee,
+        urgent_fee=quote.urgent_fee,
+        shipping_fee=quote.shipping_fee,
+        discount_amount=quote.discount_amount,
+        total_fee=quote.total_fee,
         paid_fee=Decimal("0"),
         sample_count=len(data.samples),
         shipping_method=data.shipping_method,
@@ -163,63 +148,53 @@ async def create_order(
     
     # 设置收货信息
     if address:
-        order.receiver_name = address.receiver_name
-        order.receiver_phone = address.phone
-        order.receiver_address = f"{address.province}{address.city}{address.district or ''}{address.detail_address}"
-    
-    db.add(order)
-    db.flush()  # 获取order.id
-    
-    # 创建样品记录
-    for sample_data in data.samples:
-        sample = OrderSample(
-            order_id=order.id,
-            sample_name=sample_data.sample_name,
-            sample_type=sample_data.sample_type,
-            sample_desc=sample_data.sample_desc,
-            quantity=sample_data.quantity,
-            photos=sample_data.photos,
-            test_params=sample_data.test_params,
-            special_requirements=sample_data.special_requirements
+        order_values.update(
+            receiver_name=address.receiver_name,
+            receiver_phone=address.phone,
+            receiver_address=f"{address.province}{address.city}{address.district or ''}{address.detail_address}"
         )
-        db.add(sample)
-    
-    # 创建费用明细
-    fee_items = [
-        ("project", "检测费用", project_fee),
-    ]
-    if urgent_fee > 0:
-        fee_items.append(("urgent", "加急费用", urgent_fee))
-    if shipping_fee > 0:
-        fee_items.append(("shipping", "运费", shipping_fee))
     
-    for fee_type, fee_name, amount in fee_items:
-        fee = OrderFee(
-            order_id=order.id,
-            fee_type=fee_type,
-            fee_name=fee_name,
-            amount=amount
-        )
-        db.add(fee)
-    
-    # 记录状态变更
-    history = OrderStatusHistory(
-        order_id=order.id,
-        from_status=None,
-        to_status="pending_payment",
-        operator_id=current_user.id,
-        operator_type="user",
-        remark="创建订单"
+    order_id = await order_writer.create(
+        db, order_values, data.samples, quote.fee_details(), operator_id=current_user.id
     )
-    db.add(history)
     
-    db.commit()
-    db.refresh(order)
+    # 核销优惠券（条件更新，同一张券不会被两个订单使用）
+    if quote.coupon:
+        used = await db.execute(
+            update(UserCoupon).where(
+                UserCoupon.id == quote.coupon.user_coupon_id,
+                UserCoupon.user_id == current_user.id,
+                UserCoupon.status == UserCouponStatus.UNUSED
+            ).values(
+                status=UserCouponStatus.USED, order_id=order_id, used_at=datetime.now()
+            ).execution_options(synchronize_session=False)
+        )
+        if used.rowcount == 0:
+            await db.rollback()
+            raise HTTPException(status_code=400, detail="优惠券不可用")
+    
+    # 扣减积分
+    if quote.points_used:
+        try:
+            await db.run_sync(lambda session: points_ledger.record(
+                session,
+                current_user.id,
+                -quote.points_used,
+                type="order",
+                related_id=order_id,
+                description=f"订单抵扣：{order_no}"
+            ))
+        except InsufficientPointsError as e:
+            await db.rollback()
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    # 订单数据都已在本地，提交后无需 refresh
+    await db.commit()
     
     return SuccessResponse(data={
-        "order_id": order.id,
-        "order_no": order.order_no,
-        "total_fee": float(order.total_fee)
+        "order_id": order_id,
+        "order_no": order_no,
+        "total_fee": float(quote.total_fee)
     }, message="订单创建成功")
 
 
@@ -228,27 +203,30 @@ async def get_order_list(
     status: Optional[str] = Query("all", description="订单状态"),
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=50),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的next_cursor）"),
+    count: Optional[str] = Query(None, pattern=COUNT_PATTERN, description="总数统计方式: exact/estimate/none"),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     获取订单列表
+    支持 page 分页和 cursor 游标分页
     """
-    query = db.query(Order).filter(Order.user_id == current_user.id)
-    
-    # 状态筛选
-    if status and status != "all":
-        query = query.filter(Order.status == status)
-    
-    # 总数
-    total = query.count()
+    def load_page(session):
+        query = session.query(Order).filter(Order.user_id == current_user.id)
+        
+        # 状态筛选
+        if status and status != "all":
+            query = query.filter(Order.status == status)
+        
+        return paginate(session, query, Order.created_at, Order.id, page, page_size, cursor, count)
     
     # 分页
-    orders = query.order_by(Order.created_at.desc()).offset((page - 1) * page_size).limit(page_size).all()
+    result = await db.run_sync(load_page)
     
     # 转换为列表项
     items = []
-    for order in orders:
+    for order in result.items:
         items.append(OrderListItem(
             id=order.id,
             order_no=order.order_no,
@@ -261,29 +239,37 @@ async def get_order_list(
             project_image=None  # TODO: 从项目表获取
         ))
     
-    result = OrderListResponse(total=total, list=items)
-    return SuccessResponse(data=result)
+    return SuccessResponse(data=OrderListResponse(
+        total=result.total,
+        list=items,
+        next_cursor=result.next_cursor,
+        has_more=result.has_more
+    ))
 
 
 @router.get("/{order_id}")
 async def get_order_detail(
     order_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     获取订单详情
     """
-    order = db.query(Order).filter(
-        Order.id == order_id,
-        Order.user_id == current_user.id
-    ).first()
+    order = (await db.execute(
+        select(Order).where(
+            Order.id == order_id,
+            Order.user_id == current_user.id
+        )
+    )).scalar_one_or_none()
     
     if not order:
         raise HTTPException(status_code=404, detail="订单不存在")
     
     # 获取样品列表
-    samples = db.query(OrderSample).filter(OrderSample.order_id == order_id).all()
+    samples = (await db.execute(
+        select(OrderSample).where(OrderSample.order_id == order_id)
+    )).scalars().all()
     
     # 构建详情
     detail = OrderDetail(
@@ -298,29 +284,68 @@ async def get_order_detail(
 async def cancel_order(
     order_id: int,
     data: OrderCancel,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     取消订单
     """
-    order = db.query(Order).filter(
-        Order.id == order_id,
-        Order.user_id == current_user.id
-    ).first()
+    order = (await db.execute(
+        select(Order).where(
+            Order.id == order_id,
+            Order.user_id == current_user.id
+        )
+    )).scalar_one_or_none()
     
     if not order:
         raise HTTPException(status_code=404, detail="订单不存在")
     
     # 只有待支付和待确认的订单可以直接取消
-    if order.status not in ["pending_payment", "confirmed"]:
+    if order.status not in CANCELLABLE_STATUSES:
         raise HTTPException(status_code=400, detail="当前状态不允许取消")
     
-    # 更新订单状态
+    # 更新订单状态（条件更新，并发取消只有一个成功，优惠券和积分只退还一次）
     old_status = order.status
-    order.status = "cancelled"
-    order.cancel_reason = data.reason
-    order.cancelled_at = datetime.now()
+    cancelled = await db.execute(
+        update(Order).where(
+            Order.id == order.id,
+            Order.status == old_status
+        ).values(
+            status="cancelled", cancel_reason=data.reason, cancelled_at=datetime.now()
+        ).execution_options(synchronize_session=False)
+    )
+    if cancelled.rowcount == 0:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="订单状态已变化，请刷新后重试")
+    
+    # 退还下单时核销的优惠券
+    await db.execute(
+        update(UserCoupon).where(
+            UserCoupon.order_id == order.id,
+            UserCoupon.user_id == current_user.id,
+            UserCoupon.status == UserCouponStatus.USED
+        ).values(
+            status=UserCouponStatus.UNUSED, order_id=None, used_at=None
+        ).execution_options(synchronize_session=False)
+    )
+    
+    # 退还下单时抵扣的积分
+    points_used = -((await db.execute(
+        select(func.coalesce(func.sum(PointsRecord.points), 0)).where(
+            PointsRecord.user_id == current_user.id,
+            PointsRecord.related_id == order.id,
+            PointsRecord.type == "order"
+        )
+    )).scalar() or 0)
+    if points_used > 0:
+        await db.run_sync(lambda session: points_ledger.record(
+            session,
+            current_user.id,
+            points_used,
+            type="order_cancel",
+            related_id=order.id,
+            description=f"订单取消退还：{order.order_no}"
+        ))
     
     # 记录状态变更
     history = OrderStatusHistory(
@@ -333,7 +358,7 @@ async def cancel_order(
     )
     db.add(history)
     
-    db.commit()
+    await db.commit()
     
     return SuccessResponse(message="订单已取消")
 
@@ -341,16 +366,18 @@ async def cancel_order(
 @router.post("/{order_id}/confirm-receipt")
 async def confirm_receipt(
     order_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     确认收样（用户确认实验室收到样品）
     """
-    order = db.query(Order).filter(
-        Order.id == order_id,
-        Order.user_id == current_user.id
-    ).first()
+    order = (await db.execute(
+        select(Order).where(
+            Order.id == order_id,
+            Order.user_id == current_user.id
+        )
+    )).scalar_one_or_none()
     
     if not order:
         raise HTTPException(status_code=404, detail="订单不存在")
@@ -374,7 +401,7 @@ async def confirm_receipt(
     )
     db.add(history)
     
-    db.commit()
+    await db.commit()
     
     return SuccessResponse(message="已确认收样")
 
@@ -1,13 +1,19 @@
 """
 支付相关API
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime
-import time
+import logging
 from decimal import Decimal
+from typing import Optional
 
-from app.api.deps import get_db, get_current_user
+from app.core.database import get_db, get_async_db
+from app.core.id_generator import id_generator
+from app.api.deps import get_current_user
 from app.models.user import User
 from app.models.order import Order, Payment, OrderStatusHistory
 from app.schemas.order import PaymentCreate, PaymentInDB
@@ -15,29 +21,151 @@ from app.core.response import SuccessResponse
 from app.core.security import verify_password
 from app.services.alipay_service import alipay_service
 from app.services.wechatpay_service import wechatpay_service
+from app.services.wallet_service import wallet_service, InsufficientBalanceError
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
 def generate_payment_no() -> str:
     """生成支付单号"""
-    return f"PAY{int(time.time())}{int(time.time() * 1000000) % 1000000}"
+    return id_generator.next_no("PAY")
+
+
+def _balance_payment_response(payment: Payment) -> SuccessResponse:
+    """余额支付成功的响应"""
+    return SuccessResponse(data={
+        "payment_id": payment.id,
+        "payment_no": payment.payment_no,
+        "status": "success",
+        "message": "支付成功"
+    }, message="支付成功")
+
+
+async def _replay_balance_payment(
+    db: AsyncSession,
+    user_id: int,
+    idempotency_key: Optional[str]
+) -> Optional[SuccessResponse]:
+    """幂等键已使用过时返回原支付结果"""
+    transaction = await wallet_service.find_by_idempotency_key(db, user_id, idempotency_key)
+    if not transaction:
+        return None
+    
+    payment = (await db.execute(
+        select(Payment).where(Payment.payment_no == transaction.biz_no)
+    )).scalar_one_or_none()
+    if not payment:
+        return None
+    return _balance_payment_response(payment)
+
+
+async def _pay_with_balance(
+    db: AsyncSession,
+    order: Order,
+    user_id: int,
+    idempotency_key: Optional[str]
+) -> SuccessResponse:
+    """
+    余额支付订单
+    
+    订单状态和余额都通过条件 UPDATE 修改：并发支付同一订单只有一个成功，并发扣款不会透支；
+    余额扣款放在事务最后，用户行锁只持有到提交
+    """
+    amount_to_pay = order.total_fee - (order.paid_fee or Decimal("0"))
+    now = datetime.now()
+    
+    # 更新订单状态（仍为待支付时才更新）
+    result = await db.execute(
+        update(Order)
+        .where(Order.id == order.id, Order.status == "pending_payment")
+        .values(paid_fee=Order.total_fee, status="confirmed", payment_method="balance", paid_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        await db.rollback()
+        # 同一幂等键的并发请求：等首个请求提交后返回其结果
+        replay = await _replay_balance_payment(db, user_id, idempotency_key)
+        if replay:
+            return replay
+        raise HTTPException(status_code=400, detail="订单状态不正确")
+    
+    # 创建支付记录
+    payment = Payment(
+        payment_no=generate_payment_no(),
+        order_id=order.id,
+        order_no=order.order_no,
+        user_id=user_id,
+        payment_method="balance",
+        payment_channel="balance",
+        amount=amount_to_pay,
+        status="success",
+        paid_at=now
+    )
+    db.add(payment)
+    
+    # 记录状态变更
+    db.add(OrderStatusHistory(
+        order_id=order.id,
+        from_status="pending_payment",
+        to_status="confirmed",
+        operator_id=user_id,
+        operator_type="user",
+        remark="余额支付成功"
+    ))
+    await db.flush()
+    
+    # 扣除用户余额
+    try:
+        await wallet_service.debit(
+            db,
+            user_id,
+            amount_to_pay,
+            biz_type="order_pay",
+            biz_no=payment.payment_no,
+            idempotency_key=idempotency_key,
+            remark=f"订单支付 {order.order_no}",
+            count_as_spending=True
+        )
+    except InsufficientBalanceError as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    except IntegrityError:
+        await db.rollback()
+        replay = await _replay_balance_payment(db, user_id, idempotency_key)
+        if replay:
+            return replay
+        raise HTTPException(status_code=409, detail="重复的支付请求")
+    
+    await db.commit()
+    return _balance_payment_response(payment)
 
 
 @router.post("/create")
 async def create_payment(
     data: PaymentCreate,
-    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=64),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     创建支付
+    
+    余额支付支持幂等：请求头 Idempotency-Key（或请求体 idempotency_key）相同的重复请求返回首次支付的结果
     """
+    if data.payment_method == "balance":
+        replay = await _replay_balance_payment(db, current_user.id, idempotency_key or data.idempotency_key)
+        if replay:
+            return replay
+    
     # 查询订单
-    order = db.query(Order).filter(
-        Order.id == data.order_id,
-        Order.user_id == current_user.id
-    ).first()
+    order = (await db.execute(
+        select(Order).where(
+            Order.id == data.order_id,
+            Order.user_id == current_user.id
+        )
+    )).scalar_one_or_none()
     
     if not order:
         raise HTTPException(status_code=404, detail="订单不存在")
@@ -62,57 +190,7 @@ async def create_payment(
         if not verify_password(data.payment_password, current_user.hashed_password):
             raise HTTPException(status_code=400, detail="支付密码错误")
         
-        # 检查余额（从数据库获取）
-        user_balance = current_user.prepaid_balance if current_user.prepaid_balance else Decimal("0")
-        
-        if user_balance < amount_to_pay:
-            raise HTTPException(status_code=400, detail=f"余额不足，当前余额：¥{user_balance}，需要支付：¥{amount_to_pay}")
-        
-        # 创建支付记录
-        payment = Payment(
-            payment_no=generate_payment_no(),
-            order_id=order.id,
-            order_no=order.order_no,
-            user_id=current_user.id,
-            payment_method="balance",
-            payment_channel="balance",
-            amount=amount_to_pay,
-            status="success",
-            paid_at=datetime.now()
-        )
-        db.add(payment)
-        
-        # 更新订单状态
-        order.paid_fee = order.total_fee
-        order.status = "confirmed"
-        order.payment_method = "balance"
-        order.paid_at = datetime.now()
-        
-        # 记录状态变更
-        history = OrderStatusHistory(
-            order_id=order.id,
-            from_status="pending_payment",
-            to_status="confirmed",
-            operator_id=current_user.id,
-            operator_type="user",
-            remark="余额支付成功"
-        )
-        db.add(history)
-        
-        # 扣除用户余额
-        current_user.prepaid_balance = current_user.prepaid_balance - amount_to_pay
-        current_user.total_spent = (current_user.total_spent or Decimal("0")) + amount_to_pay
-        current_user.total_orders = (current_user.total_orders or 0) + 1
-        
-        db.commit()
-        db.refresh(payment)
-        
-        return SuccessResponse(data={
-            "payment_id": payment.id,
-            "payment_no": payment.payment_no,
-            "status": "success",
-            "message": "支付成功"
-        }, message="支付成功")
+        return await _pay_with_balance(db, order, current_user.id, idempotency_key or data.idempotency_key)
     
     # 支付宝支付
     elif data.payment_method == "alipay":
@@ -168,8 +246,8 @@ async def create_payment(
             status="pending"
         )
         db.add(payment)
-        db.commit()
-        db.refresh(payment)
+        await db.commit()
+        await db.refresh(payment)
         
         # 调用微信支付服务获取支付参数
         try:
@@ -193,7 +271,7 @@ async def create_payment(
             }, message="请在新页面完成支付")
             
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             raise HTTPException(status_code=500, detail=f"创建微信支付失败: {str(e)}")
     
     else:
@@ -203,21 +281,30 @@ async def create_payment(
 @router.post("/balance-pay")
 async def balance_pay(
     data: dict,
-    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=64),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     余额支付（简化版，不需要支付密码）
+    
+    请求头 Idempotency-Key（或请求体 idempotency_key）相同的重复请求返回首次支付的结果
     """
     order_id = data.get("order_id")
     if not order_id:
         raise HTTPException(status_code=400, detail="缺少订单ID")
     
+    replay = await _replay_balance_payment(db, current_user.id, idempotency_key or data.get("idempotency_key"))
+    if replay:
+        return replay
+    
     # 查询订单
-    order = db.query(Order).filter(
-        Order.id == order_id,
-        Order.user_id == current_user.id
-    ).first()
+    order = (await db.execute(
+        select(Order).where(
+            Order.id == order_id,
+            Order.user_id == current_user.id
+        )
+    )).scalar_one_or_none()
     
     if not order:
         raise HTTPException(status_code=404, detail="订单不存在")
@@ -225,75 +312,24 @@ async def balance_pay(
     if order.status != "pending_payment":
         raise HTTPException(status_code=400, detail="订单状态不正确")
     
-    # 计算待支付金额
-    amount_to_pay = order.total_fee - (order.paid_fee or Decimal("0"))
-    
-    # 检查余额
-    user_balance = current_user.prepaid_balance if current_user.prepaid_balance else Decimal("0")
-    
-    if user_balance < amount_to_pay:
-        raise HTTPException(status_code=400, detail=f"余额不足，当前余额：¥{user_balance}，需要支付：¥{amount_to_pay}")
-    
-    # 创建支付记录
-    payment = Payment(
-        payment_no=generate_payment_no(),
-        order_id=order.id,
-        order_no=order.order_no,
-        user_id=current_user.id,
-        payment_method="balance",
-        payment_channel="balance",
-        amount=amount_to_pay,
-        status="success",
-        paid_at=datetime.now()
-    )
-    db.add(payment)
-    
-    # 更新订单状态
-    order.paid_fee = order.total_fee
-    order.status = "confirmed"
-    order.payment_method = "balance"
-    order.paid_at = datetime.now()
-    
-    # 记录状态变更
-    history = OrderStatusHistory(
-        order_id=order.id,
-        from_status="pending_payment",
-        to_status="confirmed",
-        operator_id=current_user.id,
-        operator_type="user",
-        remark="余额支付成功"
-    )
-    db.add(history)
-    
-    # 扣除用户余额
-    current_user.prepaid_balance = current_user.prepaid_balance - amount_to_pay
-    current_user.total_spent = (current_user.total_spent or Decimal("0")) + amount_to_pay
-    current_user.total_orders = (current_user.total_orders or 0) + 1
-    
-    db.commit()
-    db.refresh(payment)
-    
-    return SuccessResponse(data={
-        "payment_id": payment.id,
-        "payment_no": payment.payment_no,
-        "status": "success",
-        "message": "支付成功"
-    }, message="支付成功")
+    return await _pay_with_balance(db, order, current_user.id, idempotency_key or data.get("idempotency_key"))
 
 
 @router.get("/{payment_id}/status")
 async def get_payment_status(
     payment_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     查询支付状态
     """
-    payment = db.query(Payment).filter(
-        Payment.id == payment_id,
-        Payment.user_id == current_user.id
-    ).first()
+    payment = (await db.execute(
+        select(Payment).where(
+            Payment.id == payment_id,
+            Payment.user_id == current_user.id
+        )
+    )).scalar_one_or_none()
     
     if not payment:
         raise HTTPException(status_code=404, detail="支付记录不存在")
@@ -310,7 +346,7 @@ async def get_payment_status(
 @router.post("/{payment_id}/alipay/notify")
 async def alipay_notify(
     payment_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     支付宝支付回调
@@ -349,6 +385,7 @@ async def wechat_notify(
 ):
     """
     微信支付回调
+    回调处理逻辑与充值回调共用 wechatpay_service，仍使用同步会话
     """
     from fastapi import Request
     from fastapi.responses import Response as FastAPIResponse
@@ -384,7 +421,7 @@ async def wechat_notify(
                 media_type='application/xml'
             )
     except Exception as e:
-        print(f'微信支付回调异常: {str(e)}')
+        logger.exception(f"微信支付回调异常: {str(e)}")
         return FastAPIResponse(
             content='<xml><return_code><![CDATA[FAIL]]></return_code><return_msg><![CDATA[FAIL]]></return_msg></xml>',
             media_type='application/xml'
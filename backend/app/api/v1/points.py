@@ -3,14 +3,15 @@
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from typing import Optional
 
 from app.core.database import get_db
 from app.core.response import Response
+from app.core.pagination import paginate, COUNT_PATTERN
 from app.api.v1.deps import get_current_user
 from app.models.user import User
 from app.models.points import PointsGoods, PointsRecord, PointsExchangeRecord
+from app.services.points_ledger import points_ledger, InsufficientPointsError
 
 
 router = APIRouter()
@@ -24,27 +25,8 @@ async def get_points_balance(
     """
     获取当前用户的积分余额
     """
-    # 计算用户积分余额
-    total_points = db.query(func.sum(PointsRecord.points)).filter(
-        PointsRecord.user_id == current_user.id
-    ).scalar() or 0
-    
-    # 获取积分明细统计  
-    earned = db.query(func.sum(PointsRecord.points)).filter(
-        PointsRecord.user_id == current_user.id,
-        PointsRecord.points > 0
-    ).scalar() or 0
-    
-    spent = db.query(func.sum(PointsRecord.points)).filter(
-        PointsRecord.user_id == current_user.id,
-        PointsRecord.points < 0
-    ).scalar() or 0
-    
-    return Response.success(data={
-        "balance": int(total_points),
-        "earned": int(earned),
-        "spent": abs(int(spent))
-    })
+    # 积分余额和累计值在积分变动时同步更新到用户表，直接读取
+    return Response.success(data=points_ledger.get_balance(db, current_user.id))
 
 
 @router.get("/goods", summary="获取积分商品列表")
@@ -123,14 +105,8 @@ async def exchange_points_goods(
             detail="商品库存不足"
         )
     
-    # 计算用户积分余额
-    from sqlalchemy import func
-    total_points = db.query(func.sum(PointsRecord.points)).filter(
-        PointsRecord.user_id == current_user.id
-    ).scalar() or 0
-    
-    # 检查积分是否足够
-    if total_points < goods.points:
+    # 检查积分是否足够（扣减时还会以条件 UPDATE 再次校验）
+    if points_ledger.get_balance(db, current_user.id)["balance"] < goods.points:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="积分不足"
@@ -166,16 +142,24 @@ async def exchange_points_goods(
         }, ensure_ascii=False)
     )
     db.add(exchange_record)
+    db.flush()
     
     # 扣减积分
-    points_record = PointsRecord(
-        user_id=current_user.id,
-        points=-goods.points,
-        type="exchange",
-        related_id=exchange_record.id,
-        description=f"兑换商品：{goods.name}"
-    )
-    db.add(points_record)
+    try:
+        points_ledger.record(
+            db,
+            current_user.id,
+            -goods.points,
+            type="exchange",
+            related_id=exchange_record.id,
+            description=f"兑换商品：{goods.name}"
+        )
+    except InsufficientPointsError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="积分不足"
+        )
     
     # 扣减库存
     goods.stock -= 1
@@ -193,27 +177,24 @@ async def exchange_points_goods(
 async def get_points_records(
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(20, ge=1, le=100, description="每页数量"),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的next_cursor）"),
+    count: Optional[str] = Query(None, pattern=COUNT_PATTERN, description="总数统计方式: exact/estimate/none"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     获取用户的积分记录
     """
-    # 总数
-    total = db.query(PointsRecord).filter(
+    query = db.query(PointsRecord).filter(
         PointsRecord.user_id == current_user.id
-    ).count()
+    )
     
     # 分页查询
-    records = db.query(PointsRecord).filter(
-        PointsRecord.user_id == current_user.id
-    ).order_by(
-        PointsRecord.created_at.desc()
-    ).offset((page - 1) * page_size).limit(page_size).all()
+    result = paginate(db, query, PointsRecord.created_at, PointsRecord.id, page, page_size, cursor, count)
     
     # 格式化返回
     items = []
-    for r in records:
+    for r in result.items:
         items.append({
             "id": r.id,
             "points": r.points,
@@ -224,9 +205,7 @@ async def get_points_records(
     
     return Response.success(data={
         "items": items,
-        "total": total,
-        "page": page,
-        "page_size": page_size
+        **result.meta()
     })
 
 
@@ -3,12 +3,13 @@
 """
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
+from sqlalchemy import func
 from typing import Optional
 from decimal import Decimal
 
 from app.core.database import get_db
 from app.core.response import Response
+from app.core.pagination import merge_paginate, COUNT_PATTERN
 from app.api.v1.deps import get_current_user
 from app.models.user import User
 from app.models.recharge import RechargeRecord, RechargeStatus
@@ -46,69 +47,78 @@ async def get_prepay_stats(
     })
 
 
+def _format_recharge(r: RechargeRecord) -> dict:
+    return {
+        "id": r.id,
+        "type": "in",
+        "title": f"充值 - {r.payment_method.value if r.payment_method else ''}",
+        "amount": float(r.actual_amount) if r.actual_amount else 0,
+        "time": r.completed_at.strftime("%Y-%m-%d %H:%M") if r.completed_at else "",
+        "status": "success",
+        "status_text": "充值成功",
+        "order_no": r.recharge_no
+    }
+
+
+def _format_consume(o: Order) -> dict:
+    return {
+        "id": o.id,
+        "type": "out",
+        "title": f"订单支付 - {o.project_name}",
+        "amount": float(o.paid_fee) if o.paid_fee else 0,
+        "time": o.paid_at.strftime("%Y-%m-%d %H:%M") if o.paid_at else "",
+        "status": "success",
+        "status_text": "支付成功",
+        "order_no": o.order_no
+    }
+
+
 @router.get("/records", summary="获取预付记录")
 async def get_prepay_records(
     record_type: Optional[str] = Query(None, description="记录类型: recharge/consume"),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的next_cursor）"),
+    count: Optional[str] = Query(None, pattern=COUNT_PATTERN, description="总数统计方式: exact/estimate/none"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """获取预付记录（充值和消费）"""
-    records = []
+    """
+    获取预付记录（充值和消费）
     
-    # 获取充值记录
+    充值记录和余额支付订单各自按时间倒序读取一页，再按时间归并，不再加载全部历史记录
+    """
+    sources = []
+    formatters = []
+    
+    # 充值记录
     if not record_type or record_type == "recharge":
-        recharges = db.query(RechargeRecord).filter(
-            RechargeRecord.user_id == current_user.id,
-            RechargeRecord.status == RechargeStatus.SUCCESS
-        ).order_by(desc(RechargeRecord.completed_at)).all()
-        
-        for r in recharges:
-            records.append({
-                "id": r.id,
-                "type": "in",
-                "title": f"充值 - {r.payment_method.value if r.payment_method else ''}",
-                "amount": float(r.actual_amount) if r.actual_amount else 0,
-                "time": r.completed_at.strftime("%Y-%m-%d %H:%M") if r.completed_at else "",
-                "status": "success",
-                "status_text": "充值成功",
-                "order_no": r.recharge_no
-            })
+        sources.append((
+            db.query(RechargeRecord).filter(
+                RechargeRecord.user_id == current_user.id,
+                RechargeRecord.status == RechargeStatus.SUCCESS
+            ),
+            RechargeRecord.completed_at,
+            RechargeRecord.id
+        ))
+        formatters.append(_format_recharge)
     
-    # 获取消费记录（使用余额支付的订单）
+    # 消费记录（使用余额支付的订单）
     if not record_type or record_type == "consume":
-        orders = db.query(Order).filter(
-            Order.user_id == current_user.id,
-            Order.payment_method == "balance",
-            Order.status.in_(['paid', 'confirmed', 'testing', 'completed'])
-        ).order_by(desc(Order.paid_at)).all()
-        
-        for o in orders:
-            records.append({
-                "id": o.id,
-                "type": "out",
-                "title": f"订单支付 - {o.project_name}",
-                "amount": float(o.paid_fee) if o.paid_fee else 0,
-                "time": o.paid_at.strftime("%Y-%m-%d %H:%M") if o.paid_at else "",
-                "status": "success",
-                "status_text": "支付成功",
-                "order_no": o.order_no
-            })
-    
-    # 按时间排序
-    records.sort(key=lambda x: x["time"], reverse=True)
+        sources.append((
+            db.query(Order).filter(
+                Order.user_id == current_user.id,
+                Order.payment_method == "balance",
+                Order.status.in_(['paid', 'confirmed', 'testing', 'completed'])
+            ),
+            Order.paid_at,
+            Order.id
+        ))
+        formatters.append(_format_consume)
     
-    # 分页
-    total = len(records)
-    start = (page - 1) * page_size
-    end = start + page_size
-    paged_records = records[start:end]
+    result = merge_paginate(db, sources, page, page_size, cursor, count)
     
     return Response.success(data={
-        "items": paged_records,
-        "total": total,
-        "page": page,
-        "page_size": page_size
+        "items": [formatters[source](row) for source, row in result.items],
+        **result.meta()
     })
-
@@ -3,16 +3,21 @@
 项目列表、详情、分类等
 """
 from fastapi import APIRouter, Depends, Query, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from typing import Optional
 from pydantic import BaseModel
 from decimal import Decimal
 
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.core.response import Response
 from app.models.project import ProjectCategory, Project
-from app.api.v1.deps import get_current_user
+from app.api.deps import get_current_user
 from app.models.user import User
+from app.services.catalog_cache import catalog_cache
+from app.services.view_counter import view_counter
+from app.services.project_search import project_search, paginate_ids, order_by_ids
 
 
 router = APIRouter()
@@ -61,20 +66,25 @@ class ProjectUpdate(BaseModel):
 
 @router.get("/categories", summary="获取项目分类")
 async def get_project_categories(
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """获取检测项目分类"""
-    categories = db.query(ProjectCategory).filter(
-        ProjectCategory.is_active == True
-    ).order_by(ProjectCategory.sort_order).all()
+    """获取检测项目分类（带缓存）"""
+    async def load_categories():
+        categories = (await db.execute(
+            select(ProjectCategory).where(
+                ProjectCategory.is_active == True
+            ).order_by(ProjectCategory.sort_order)
+        )).scalars().all()
+        
+        return [{
+            "id": cat.id,
+            "name": cat.name,
+            "description": cat.description,
+            "icon": cat.icon,
+            "sort_order": cat.sort_order
+        } for cat in categories]
     
-    return Response.success(data=[{
-        "id": cat.id,
-        "name": cat.name,
-        "description": cat.description,
-        "icon": cat.icon,
-        "sort_order": cat.sort_order
-    } for cat in categories])
+    return Response.success(data=await catalog_cache.get_categories(load_categories))
 
 
 @router.get("/admin/list", summary="获取项目列表（管理员）")
@@ -85,38 +95,46 @@ async def get_admin_projects_list(
     category_id: Optional[int] = None,
     status: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取项目列表（管理员）
     - 支持分页、搜索、筛选
     """
-    query = db.query(Project)
-    
-    # 搜索
-    if search:
-        query = query.filter(
-            (Project.name.like(f"%{search}%")) |
-            (Project.project_no.like(f"%{search}%"))
-        )
+    query = select(Project)
+    search = (search or "").strip()
     
     # 按分类筛选
     if category_id:
-        query = query.filter(Project.category_id == category_id)
+        query = query.where(Project.category_id == category_id)
     
     # 按状态筛选
     if status:
-        query = query.filter(Project.status == status)
-    
-    # 总数
-    total = query.count()
+        query = query.where(Project.status == status)
     
-    # 分页
-    offset = (page - 1) * page_size
-    projects = query.order_by(Project.sort_order, Project.created_at.desc()).offset(offset).limit(page_size).all()
+    if search:
+        # 搜索：按相关度排序
+        ids = await db.run_sync(project_search.search, search, status or None, category_id)
+        total = len(ids)
+        page_ids = paginate_ids(ids, page, page_size)
+        projects = order_by_ids(
+            (await db.execute(query.where(Project.id.in_(page_ids)))).scalars().all() if page_ids else [],
+            page_ids
+        )
+    else:
+        # 总数
+        total = (await db.execute(select(func.count()).select_from(query.subquery()))).scalar()
+        
+        # 分页
+        offset = (page - 1) * page_size
+        projects = (await db.execute(
+            query.order_by(Project.sort_order, Project.created_at.desc()).offset(offset).limit(page_size)
+        )).scalars().all()
     
     # 获取分类信息
-    category_map = {cat.id: cat.name for cat in db.query(ProjectCategory).all()}
+    category_map = {
+        cat_id: name for cat_id, name in (await db.execute(select(ProjectCategory.id, ProjectCategory.name))).all()
+    }
     
     return Response.success(data={
         "list": [{
@@ -125,8 +143,8 @@ async def get_admin_projects_list(
             "name": p.name,
             "category_id": p.category_id,
             "category_name": category_map.get(p.category_id, "未知"),
-            "original_price": float(p.original_price),
-            "current_price": float(p.current_price),
+            "original_price": p.original_price,
+            "current_price": p.current_price,
             "unit": p.unit,
             "cover_image": p.cover_image,
             "status": p.status,
@@ -135,7 +153,7 @@ async def get_admin_projects_list(
             "view_count": p.view_count,
             "booking_count": p.booking_count,
             "sort_order": p.sort_order,
-            "created_at": p.created_at.isoformat() if p.created_at else None
+            "created_at": p.created_at
         } for p in projects],
         "total": total,
         "page": page,
@@ -147,10 +165,10 @@ async def get_admin_projects_list(
 async def get_admin_project_detail(
     project_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取项目详情"""
-    project = db.query(Project).filter(Project.id == project_id).first()
+    project = await db.get(Project, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="项目不存在")
     
@@ -186,11 +204,13 @@ async def get_admin_project_detail(
 async def create_project(
     request: ProjectCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """创建新项目"""
     # 检查项目编号是否已存在
-    existing = db.query(Project).filter(Project.project_no == request.project_no).first()
+    existing = (await db.execute(
+        select(Project.id).where(Project.project_no == request.project_no)
+    )).first()
     if existing:
         raise HTTPException(status_code=400, detail="项目编号已存在")
     
@@ -217,8 +237,10 @@ async def create_project(
     )
     
     db.add(project)
-    db.commit()
-    db.refresh(project)
+    await db.commit()
+    await db.refresh(project)
+    catalog_cache.invalidate()
+    project_search.index_project(project)
     
     return Response.success(data={"id": project.id}, message="项目创建成功")
 
@@ -228,10 +250,10 @@ async def update_project(
     project_id: int,
     request: ProjectUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """更新项目信息"""
-    project = db.query(Project).filter(Project.id == project_id).first()
+    project = await db.get(Project, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="项目不存在")
     
@@ -240,7 +262,9 @@ async def update_project(
     for field, value in update_data.items():
         setattr(project, field, value)
     
-    db.commit()
+    await db.commit()
+    catalog_cache.invalidate()
+    project_search.index_project(project)
     return Response.success(message="项目更新成功")
 
 
@@ -248,15 +272,17 @@ async def update_project(
 async def delete_project(
     project_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """删除项目"""
-    project = db.query(Project).filter(Project.id == project_id).first()
+    project = await db.get(Project, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="项目不存在")
     
-    db.delete(project)
-    db.commit()
+    await db.delete(project)
+    await db.commit()
+    catalog_cache.invalidate()
+    project_search.remove_project(project_id)
     
     return Response.success(message="项目删除成功")
 
@@ -266,15 +292,17 @@ async def update_project_status(
     project_id: int,
     status: str = Query(..., description="状态: active/inactive"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """更新项目状态"""
-    project = db.query(Project).filter(Project.id == project_id).first()
+    project = await db.get(Project, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="项目不存在")
     
     project.status = status
-    db.commit()
+    await db.commit()
+    catalog_cache.invalidate()
+    project_search.index_project(project)
     
     return Response.success(message="状态更新成功")
 
@@ -282,7 +310,7 @@ async def update_project_status(
 # 前端用户接口
 @router.get("/old-categories", summary="获取项目分类(OLD)")
 async def get_old_project_categories(
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取检测项目分类（旧接口，保留兼容性）
@@ -328,97 +356,107 @@ async def get_projects(
     keyword: Optional[str] = Query(None, description="搜索关键词"),
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(10, ge=1, le=100, description="每页数量"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取检测项目列表
     支持分类筛选、关键词搜索、分页
+    结果按 (category_id, keyword, page, page_size) 缓存，后台修改项目时失效
     """
-    # 从数据库查询项目列表
-    from sqlalchemy import or_
-    from sqlalchemy.orm import joinedload
-    
-    query = db.query(Project).options(
-        joinedload(Project.category),
-        joinedload(Project.laboratory)
-    ).filter(Project.status == "active")
+    keyword = (keyword or "").strip() or None
     
-    # 分类筛选
-    if category_id:
-        query = query.filter(Project.category_id == category_id)
-    
-    # 关键词搜索
-    if keyword:
-        query = query.filter(
-            or_(
-                Project.name.like(f"%{keyword}%"),
-                Project.project_no.like(f"%{keyword}%"),
-                Project.introduction.like(f"%{keyword}%")
+    async def load_projects():
+        # 从数据库查询项目列表
+        query = select(Project).options(
+            joinedload(Project.category),
+            joinedload(Project.laboratory)
+        ).where(Project.status == "active")
+        
+        # 分类筛选
+        if category_id:
+            query = query.where(Project.category_id == category_id)
+        
+        if keyword:
+            # 关键词搜索：由搜索索引返回按相关度排序的项目ID，只查询当前页
+            ids = await db.run_sync(project_search.search, keyword, "active", category_id)
+            total = len(ids)
+            page_ids = paginate_ids(ids, page, page_size)
+            projects_db = order_by_ids(
+                (await db.execute(query.where(Project.id.in_(page_ids)))).scalars().all() if page_ids else [],
+                page_ids
             )
-        )
-    
-    # 总数
-    total = query.count()
-    
-    # 分页查询
-    projects_db = query.order_by(
-        Project.is_hot.desc(),
-        Project.is_recommended.desc(),
-        Project.sort_order,
-        Project.created_at.desc()
-    ).offset((page - 1) * page_size).limit(page_size).all()
-    
-    # 格式化返回数据
-    projects = []
-    for p in projects_db:
-        projects.append({
-            "id": p.id,
-            "project_no": p.project_no,
-            "name": p.name,
-            "category": p.category.name if p.category else None,
-            "category_id": p.category_id,
-            "original_price": float(p.original_price),
-            "current_price": float(p.current_price),
-            "unit": p.unit,
-            "satisfaction": float(p.satisfaction) if p.satisfaction else 100.0,
-            "order_count": p.order_count or 0,
-            "service_cycle_min": p.service_cycle_min,
-            "service_cycle_max": p.service_cycle_max,
-            "equipment_model": p.equipment_model,
-            "equipment_name": p.equipment_name,
-            "lab_name": p.laboratory.name if p.laboratory else None,
-            "lab_id": p.lab_id,
-            "cover_image": p.cover_image,
-            "is_hot": p.is_hot,
-            "is_recommended": p.is_recommended,
-            "introduction": p.introduction
-        })
+        else:
+            # 总数
+            count_query = select(func.count(Project.id)).where(Project.status == "active")
+            if category_id:
+                count_query = count_query.where(Project.category_id == category_id)
+            total = (await db.execute(count_query)).scalar()
+            
+            # 分页查询
+            projects_db = (await db.execute(
+                query.order_by(
+                    Project.is_hot.desc(),
+                    Project.is_recommended.desc(),
+                    Project.sort_order,
+                    Project.created_at.desc()
+                ).offset((page - 1) * page_size).limit(page_size)
+            )).scalars().all()
+        
+        # 格式化返回数据
+        projects = []
+        for p in projects_db:
+            projects.append({
+                "id": p.id,
+                "project_no": p.project_no,
+                "name": p.name,
+                "category": p.category.name if p.category else None,
+                "category_id": p.category_id,
+                "original_price": float(p.original_price),
+                "current_price": float(p.current_price),
+                "unit": p.unit,
+                "satisfaction": float(p.satisfaction) if p.satisfaction else 100.0,
+                "order_count": p.order_count or 0,
+                "service_cycle_min": p.service_cycle_min,
+                "service_cycle_max": p.service_cycle_max,
+                "equipment_model": p.equipment_model,
+                "equipment_name": p.equipment_name,
+                "lab_name": p.laboratory.name if p.laboratory else None,
+                "lab_id": p.lab_id,
+                "cover_image": p.cover_image,
+                "is_hot": p.is_hot,
+                "is_recommended": p.is_recommended,
+                "introduction": p.introduction
+            })
+        
+        return {
+            "items": projects,
+            "list": projects,  # 兼容旧版本
+            "total": total,
+            "page": page,
+            "page_size": page_size
+        }
     
-    return Response.success(data={
-        "items": projects,
-        "list": projects,  # 兼容旧版本
-        "total": total,
-        "page": page,
-        "page_size": page_size
-    })
+    return Response.success(data=await catalog_cache.get_project_list(
+        category_id, keyword, page, page_size, load_projects
+    ))
 
 
 @router.get("/{project_id}", summary="获取项目详情")
 async def get_project_detail(
     project_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取检测项目详情
     包含项目介绍、预约须知、样品要求、常见问题、结果展示等
     """
     # 从数据库查询项目详情
-    from sqlalchemy.orm import joinedload
-    
-    project_db = db.query(Project).options(
-        joinedload(Project.category),
-        joinedload(Project.laboratory)
-    ).filter(Project.id == project_id).first()
+    project_db = (await db.execute(
+        select(Project).options(
+            joinedload(Project.category),
+            joinedload(Project.laboratory)
+        ).where(Project.id == project_id)
+    )).scalar_one_or_none()
     
     if not project_db:
         raise HTTPException(
@@ -426,9 +464,8 @@ async def get_project_detail(
             detail="项目不存在"
         )
     
-    # 更新浏览量
-    project_db.view_count = (project_db.view_count or 0) + 1
-    db.commit()
+    # 记录浏览量（缓冲后定时批量写回，详情接口本身只读）
+    view_count = (project_db.view_count or 0) + await view_counter.record_view(project_id)
     
     # 构建返回数据
     project = {
@@ -442,7 +479,7 @@ async def get_project_detail(
         "unit": project_db.unit,
         "satisfaction": float(project_db.satisfaction) if project_db.satisfaction else 100.0,
         "order_count": project_db.order_count or 0,
-        "view_count": project_db.view_count or 0,
+        "view_count": view_count,
         "booking_count": project_db.booking_count or 0,
         "service_cycle_min": project_db.service_cycle_min,
         "service_cycle_max": project_db.service_cycle_max,
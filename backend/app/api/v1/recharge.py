@@ -5,18 +5,22 @@ from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import Response as FastAPIResponse
 from sqlalchemy.orm import Session
 import xml.etree.ElementTree as ET
+import logging
 from decimal import Decimal
 from datetime import datetime
 from pydantic import BaseModel, Field
 from typing import Optional
 
 from app.core.database import get_db
+from app.core.id_generator import id_generator
 from app.core.response import Response
 from app.api.deps import get_current_user
 from app.models.user import User
 from app.models.recharge import RechargeRecord, RechargeStatus, RechargeMethod
 from app.services.wechatpay_service import wechatpay_service
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 
@@ -35,11 +39,7 @@ class RechargeListQuery(BaseModel):
 
 def generate_recharge_no() -> str:
     """生成充值单号"""
-    import time
-    import random
-    timestamp = int(time.time() * 1000)
-    rand = random.randint(1000, 9999)
-    return f"RC{timestamp}{rand}"
+    return id_generator.next_no("RC")
 
 
 def calculate_bonus(amount: Decimal) -> Decimal:
@@ -280,8 +280,7 @@ async def wechat_recharge_notify(
         body = await request.body()
         xml_str = body.decode('utf-8')
         
-        print(f"[充值回调] 收到微信回调:")
-        print(f"[充值回调] 原始XML: {xml_str}")
+        logger.debug("收到充值微信回调", extra={"notify_xml": xml_str})
         
         # 解析XML
         root = ET.fromstring(xml_str)
@@ -289,8 +288,6 @@ async def wechat_recharge_notify(
         for child in root:
             notify_data[child.tag] = child.text
         
-        print(f"[充值回调] 解析数据: {notify_data}")
-        
         # 处理回调
         result = await wechatpay_service.handle_recharge_notify(db, notify_data)
         
@@ -305,7 +302,7 @@ async def wechat_recharge_notify(
                 media_type='application/xml'
             )
     except Exception as e:
-        print(f'充值微信支付回调异常: {str(e)}')
+        logger.exception(f"充值微信支付回调异常: {str(e)}")
         return FastAPIResponse(
             content='<xml><return_code><![CDATA[FAIL]]></return_code><return_msg><![CDATA[FAIL]]></return_msg></xml>',
             media_type='application/xml'
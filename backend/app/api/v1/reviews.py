@@ -11,39 +11,13 @@ from app.core.database import get_db
 from app.core.response import Response
 from app.api.v1.deps import get_current_user
 from app.models.user import User
+from app.models.review import OrderReview
+from app.services.review_service import review_service
 
 
 router = APIRouter()
 
 
-# 创建评价表模型
-from sqlalchemy import Column, Integer, String, Text, DateTime, Numeric, Boolean, func
-from app.core.database import Base
-
-class OrderReview(Base):
-    """订单评价表"""
-    __tablename__ = "order_reviews"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, nullable=False, index=True, comment="订单ID")
-    user_id = Column(Integer, nullable=False, index=True, comment="用户ID")
-    project_id = Column(Integer, nullable=False, index=True, comment="项目ID")
-    
-    # 评分（1-5星）
-    service_rating = Column(Integer, default=5, comment="服务质量评分")
-    quality_rating = Column(Integer, default=5, comment="检测效果评分")
-    logistics_rating = Column(Integer, default=5, comment="物流配送评分")
-    
-    # 评价内容
-    content = Column(Text, comment="评价内容")
-    images = Column(Text, comment="评价图片（JSON数组）")
-    tags = Column(String(500), comment="评价标签（逗号分隔）")
-    
-    # 其他信息
-    is_anonymous = Column(Boolean, default=False, comment="是否匿名")
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="评价时间")
-
-
 # Pydantic模型
 class ReviewCreate(BaseModel):
     """创建评价"""
@@ -112,8 +86,12 @@ async def create_review(
     )
     
     db.add(review)
+    db.flush()
+    
+    # 累加项目评分汇总
+    review_service.add_rating(db, review)
+    
     db.commit()
-    db.refresh(review)
     
     return Response.success(data={"id": review.id}, message="评价成功")
 
@@ -166,22 +144,25 @@ async def get_project_reviews(
 ):
     """获取项目的评价列表（公开）"""
     import json
-    from sqlalchemy.orm import joinedload
     
-    query = db.query(OrderReview).filter(OrderReview.project_id == project_id)
-    total = query.count()
+    # 评价数和平均分读取项目评分汇总，不再对评价表 COUNT
+    rating_stats = review_service.get_rating_stats(db, project_id)
     
-    reviews = query.order_by(OrderReview.created_at.desc()).offset((page - 1) * page_size).limit(page_size).all()
+    reviews = db.query(OrderReview).filter(
+        OrderReview.project_id == project_id
+    ).order_by(OrderReview.created_at.desc()).offset((page - 1) * page_size).limit(page_size).all()
+    
+    # 一次查询加载本页所有评价人
+    cards = review_service.load_author_cards(db, (r.user_id for r in reviews if not r.is_anonymous))
     
-    # 获取用户信息
     items = []
     for review in reviews:
-        user = db.query(User).filter(User.id == review.user_id).first()
+        author = review_service.author_card(review, cards)
         
         items.append({
             "id": review.id,
-            "user_nickname": "匿名用户" if review.is_anonymous else (user.nickname if user else "用户"),
-            "user_avatar": None if review.is_anonymous else (user.avatar if user else None),
+            "user_nickname": author["nickname"],
+            "user_avatar": author["avatar"],
             "service_rating": review.service_rating,
             "quality_rating": review.quality_rating,
             "logistics_rating": review.logistics_rating,
@@ -194,8 +175,8 @@ async def get_project_reviews(
     
     return Response.success(data={
         "items": items,
-        "total": total,
+        "total": rating_stats["review_count"],
+        "rating": rating_stats,
         "page": page,
         "page_size": page_size
     })
-
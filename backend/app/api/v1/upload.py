@@ -2,28 +2,19 @@
 文件上传API
 """
 from fastapi import APIRouter, File, UploadFile, HTTPException, Depends
-from sqlalchemy.orm import Session
 from typing import List
-import os
-import uuid
-from datetime import datetime
+import asyncio
 from pathlib import Path
 
-from app.core.database import get_db
 from app.core.response import Response
-from app.core.config import settings
 from app.api.deps import get_current_user
 from app.models.user import User
+from app.services.upload_store import upload_store, UploadTooLargeError, UploadPermissionError
 
 router = APIRouter()
 
-# 上传目录
-UPLOAD_DIR = Path("static/uploads")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-
 # 允许的文件类型
 ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg'}
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 
 
 def allowed_file(filename: str) -> bool:
@@ -34,8 +25,7 @@ def allowed_file(filename: str) -> bool:
 @router.post("/image", summary="上传图片")
 async def upload_image(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user)
 ):
     """
     上传图片
@@ -51,37 +41,17 @@ async def upload_image(
             detail=f"不支持的文件类型。允许的类型: {', '.join(ALLOWED_EXTENSIONS)}"
         )
     
-    # 读取文件内容
-    contents = await file.read()
-    
-    # 检查文件大小
-    if len(contents) > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=400,
-            detail=f"文件过大。最大允许: {MAX_FILE_SIZE / 1024 / 1024}MB"
-        )
-    
-    # 生成唯一文件名
-    ext = Path(file.filename).suffix
-    filename = f"{uuid.uuid4().hex}{ext}"
-    
-    # 按日期组织目录
-    date_dir = UPLOAD_DIR / datetime.now().strftime("%Y%m%d")
-    date_dir.mkdir(parents=True, exist_ok=True)
-    
-    # 保存文件
-    file_path = date_dir / filename
-    with open(file_path, "wb") as f:
-        f.write(contents)
-    
-    # 生成访问URL
-    url = f"/static/uploads/{datetime.now().strftime('%Y%m%d')}/{filename}"
+    # 按块流式写入磁盘，超过大小限制立即中止
+    try:
+        stored = await upload_store.save(file, current_user.id)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return Response.success(
         data={
-            "url": url,
+            "url": stored.url,
             "filename": file.filename,
-            "size": len(contents),
+            "size": stored.size,
             "content_type": file.content_type
         },
         message="上传成功"
@@ -91,8 +61,7 @@ async def upload_image(
 @router.post("/images", summary="批量上传图片")
 async def upload_images(
     files: List[UploadFile] = File(...),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user)
 ):
     """
     批量上传图片
@@ -104,57 +73,23 @@ async def upload_images(
     if len(files) > 10:
         raise HTTPException(status_code=400, detail="最多同时上传10个文件")
     
-    results = []
-    errors = []
-    
-    for file in files:
+    async def save_one(file: UploadFile):
+        """保存单个文件，返回 (成功结果, 错误信息)"""
+        # 检查文件类型
+        if not allowed_file(file.filename):
+            return None, {"filename": file.filename, "error": "不支持的文件类型"}
         try:
-            # 检查文件类型
-            if not allowed_file(file.filename):
-                errors.append({
-                    "filename": file.filename,
-                    "error": "不支持的文件类型"
-                })
-                continue
-            
-            # 读取文件内容
-            contents = await file.read()
-            
-            # 检查文件大小
-            if len(contents) > MAX_FILE_SIZE:
-                errors.append({
-                    "filename": file.filename,
-                    "error": "文件过大"
-                })
-                continue
-            
-            # 生成唯一文件名
-            ext = Path(file.filename).suffix
-            filename = f"{uuid.uuid4().hex}{ext}"
-            
-            # 按日期组织目录
-            date_dir = UPLOAD_DIR / datetime.now().strftime("%Y%m%d")
-            date_dir.mkdir(parents=True, exist_ok=True)
-            
-            # 保存文件
-            file_path = date_dir / filename
-            with open(file_path, "wb") as f:
-                f.write(contents)
-            
-            # 生成访问URL
-            url = f"/static/uploads/{datetime.now().strftime('%Y%m%d')}/{filename}"
-            
-            results.append({
-                "url": url,
-                "filename": file.filename,
-                "size": len(contents)
-            })
-            
+            stored = await upload_store.save(file, current_user.id)
+        except UploadTooLargeError:
+            return None, {"filename": file.filename, "error": "文件过大"}
         except Exception as e:
-            errors.append({
-                "filename": file.filename,
-                "error": str(e)
-            })
+            return None, {"filename": file.filename, "error": str(e)}
+        return {"url": stored.url, "filename": file.filename, "size": stored.size}, None
+    
+    # 并发保存（同时写入的文件数由 upload_store 限制），结果保持上传顺序
+    outcomes = await asyncio.gather(*(save_one(file) for file in files))
+    results = [result for result, _ in outcomes if result]
+    errors = [error for _, error in outcomes if error]
     
     return Response.success(
         data={
@@ -171,31 +106,20 @@ async def upload_images(
 @router.delete("/image", summary="删除图片")
 async def delete_image(
     url: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user)
 ):
     """
     删除图片
     
-    - 需要管理员权限
+    - 只能删除自己上传的图片（同一内容被其他用户引用时保留文件）
     - 传入图片URL
     """
     try:
-        # 从URL提取文件路径
-        if not url.startswith("/static/uploads/"):
-            raise HTTPException(status_code=400, detail="无效的图片URL")
-        
-        file_path = Path(url.replace("/static/uploads/", "static/uploads/"))
-        
-        # 检查文件是否存在
-        if not file_path.exists():
+        if not await upload_store.delete(url, current_user.id):
             raise HTTPException(status_code=404, detail="文件不存在")
-        
-        # 删除文件
-        file_path.unlink()
-        
-        return Response.success(message="删除成功")
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"删除失败: {str(e)}")
-
+    except UploadPermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return Response.success(message="删除成功")
@@ -3,13 +3,15 @@
 用户信息、实名认证、会员管理等
 """
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.core.response import Response
 from app.models.user import User, UserCertification
 from app.schemas.user import UserInfo, UserUpdate, CertificationRequest, CertificationResponse
 from app.api.deps import get_current_user
+from app.services.auth_cache import auth_cache
 
 
 router = APIRouter()
@@ -38,28 +40,31 @@ async def get_current_user_info(
 async def update_user_info(
     request: UserUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """更新当前用户信息"""
+    # current_user 为缓存快照，修改前在当前会话中重新查询
+    user = await db.get(User, current_user.id)
+    
     # 更新用户信息
     if request.nickname is not None:
-        current_user.nickname = request.nickname
+        user.nickname = request.nickname
     if request.avatar is not None:
-        current_user.avatar = request.avatar
+        user.avatar = request.avatar
     if request.email is not None:
-        current_user.email = request.email
+        user.email = request.email
     
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await db.refresh(user)
     
-    return current_user
+    return user
 
 
 @router.post("/certification", response_model=CertificationResponse, summary="提交实名认证")
 async def submit_certification(
     request: CertificationRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     提交实名认证申请
@@ -76,10 +81,12 @@ async def submit_certification(
         )
     
     # 检查是否有待审核的认证
-    existing_cert = db.query(UserCertification).filter(
-        UserCertification.user_id == current_user.id,
-        UserCertification.status == "pending"
-    ).first()
+    existing_cert = (await db.execute(
+        select(UserCertification).where(
+            UserCertification.user_id == current_user.id,
+            UserCertification.status == "pending"
+        ).limit(1)
+    )).scalar_one_or_none()
     
     if existing_cert:
         raise HTTPException(
@@ -105,12 +112,13 @@ async def submit_certification(
     )
     
     # 更新用户表的真实姓名和身份证
-    current_user.real_name = request.real_name
-    current_user.id_card = request.id_card
+    user = await db.get(User, current_user.id)
+    user.real_name = request.real_name
+    user.id_card = request.id_card
     
     db.add(certification)
-    db.commit()
-    db.refresh(certification)
+    await db.commit()
+    await db.refresh(certification)
     
     return certification
 
@@ -118,12 +126,14 @@ async def submit_certification(
 @router.get("/certification", summary="获取认证信息")
 async def get_certification(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取当前用户的认证信息"""
-    certification = db.query(UserCertification).filter(
-        UserCertification.user_id == current_user.id
-    ).order_by(UserCertification.created_at.desc()).first()
+    certification = (await db.execute(
+        select(UserCertification).where(
+            UserCertification.user_id == current_user.id
+        ).order_by(UserCertification.created_at.desc()).limit(1)
+    )).scalar_one_or_none()
     
     if not certification:
         # 返回空数据而不是404错误
@@ -176,7 +186,7 @@ async def get_users_list(
     page_size: int = 20,
     search: str = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取用户列表（仅管理员可用）
@@ -186,21 +196,23 @@ async def get_users_list(
     - search: 搜索关键词（手机号、昵称）
     """
     # 构建查询
-    query = db.query(User)
+    query = select(User)
     
     # 搜索过滤
     if search:
-        query = query.filter(
+        query = query.where(
             (User.phone.like(f"%{search}%")) | 
             (User.nickname.like(f"%{search}%"))
         )
     
     # 总数
-    total = query.count()
+    total = (await db.execute(select(func.count()).select_from(query.subquery()))).scalar()
     
     # 分页
     offset = (page - 1) * page_size
-    users = query.order_by(User.created_at.desc()).offset(offset).limit(page_size).all()
+    users = (await db.execute(
+        query.order_by(User.created_at.desc()).offset(offset).limit(page_size)
+    )).scalars().all()
     
     # 转换为字典
     users_data = []
@@ -238,10 +250,10 @@ async def get_users_list(
 async def get_user_detail(
     user_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取指定用户的详细信息（仅管理员可用）"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
     
     if not user:
         raise HTTPException(
@@ -281,14 +293,14 @@ async def update_user_status(
     user_id: int,
     status: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     更新用户状态（仅管理员可用）
     
     - status: active（激活）/ inactive（未激活）/ banned（禁用）
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    user = (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
     
     if not user:
         raise HTTPException(
@@ -310,7 +322,8 @@ async def update_user_status(
             detail="无效的状态值"
         )
     
-    db.commit()
+    await db.commit()
+    auth_cache.invalidate_user(user_id)
     
     return Response.success(message="状态更新成功")
 
@@ -0,0 +1,97 @@
+"""
+进程内缓存
+带过期时间（TTL）和LRU淘汰的线程安全缓存
+"""
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """
+    TTL + LRU 缓存
+
+    - 每个条目写入后 ttl 秒过期
+    - 超过 max_entries 时淘汰最久未访问的条目
+    - 记录命中/未命中次数，便于观察缓存效果
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 1024, name: str = "cache"):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.name = name
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """获取缓存值，不存在或已过期返回None"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+
+            expire_at, value = item
+            if expire_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """写入缓存值"""
+        expire_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expire_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_set(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """获取缓存值，未命中时调用 loader 加载并写入"""
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            self.set(key, value)
+        return value
+
+    async def get_or_set_async(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """获取缓存值，未命中时等待异步 loader 加载并写入"""
+        value = self.get(key)
+        if value is None:
+            value = await loader()
+            self.set(key, value)
+        return value
+
+    def delete(self, key: Hashable):
+        """删除单个缓存条目"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计信息"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0
+            }
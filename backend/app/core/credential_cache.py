@@ -0,0 +1,219 @@
+"""
+凭证缓存
+缓存第三方接口的凭证（access_token、session_key等），按凭证自身的有效期提前刷新
+
+- 配置Redis后凭证存放在Redis，多进程共享；否则使用进程内存
+- 单飞（single-flight）：同一凭证同时只有一个刷新请求，并发请求等待同一个结果；
+  使用Redis时通过分布式锁保证多个进程也只刷新一次
+- 异步方法中的Redis读写在线程池中执行，不阻塞事件循环
+"""
+import json
+import time
+import uuid
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.cache import TTLCache
+from app.core.redis import get_redis, redis_configured
+
+logger = logging.getLogger(__name__)
+
+# 刷新函数：返回 (凭证, 有效期秒数)，有效期为0或None时不缓存（如接口返回错误）
+Fetcher = Callable[[], Awaitable[Tuple[Any, Optional[float]]]]
+
+# 只删除自己持有的锁：锁超时后可能已被其他进程重新获取
+_RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class CredentialCache:
+    """
+    凭证缓存
+
+    Args:
+        name: 缓存名称，同时作为Redis键前缀
+        refresh_margin: 提前刷新的秒数，避免使用即将过期的凭证
+        max_entries: 进程内存实现的最大条目数
+        lock_timeout: 分布式刷新锁的超时时间（秒），也是其他进程等待刷新结果的最长时间
+    """
+
+    def __init__(
+        self,
+        name: str,
+        refresh_margin: float = 300,
+        max_entries: int = 10000,
+        lock_timeout: float = 10
+    ):
+        self.name = name
+        self.refresh_margin = refresh_margin
+        self.lock_timeout = lock_timeout
+        self._memory = TTLCache(ttl=0, max_entries=max_entries, name=name)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.refreshes = 0
+        self.shared = 0
+
+    def _redis_key(self, key: str) -> str:
+        return f"credential:{self.name}:{key}"
+
+    @staticmethod
+    async def _run(func: Callable, *args) -> Any:
+        """配置Redis时在线程池中执行同步方法，否则直接执行"""
+        if not redis_configured():
+            return func(*args)
+        return await asyncio.get_event_loop().run_in_executor(None, func, *args)
+
+    def peek(self, key: str) -> Optional[Any]:
+        """读取缓存的凭证，不存在或即将过期返回None"""
+        redis_client = get_redis()
+        if redis_client is None:
+            return self._memory.get(key)
+        try:
+            raw = redis_client.get(self._redis_key(key))
+            return json.loads(raw) if raw else None
+        except Exception as e:
+            logger.warning(f"读取凭证缓存失败: {str(e)}")
+            return self._memory.get(key)
+
+    def set(self, key: str, value: Any, expires_in: float):
+        """写入凭证，有效期扣除提前刷新时间"""
+        ttl = expires_in - self.refresh_margin if expires_in > self.refresh_margin * 2 else expires_in / 2
+        if ttl <= 0:
+            return
+
+        redis_client = get_redis()
+        if redis_client is not None:
+            try:
+                redis_client.set(self._redis_key(key), json.dumps(value), ex=max(int(ttl), 1))
+                return
+            except Exception as e:
+                logger.warning(f"写入凭证缓存失败: {str(e)}")
+        self._memory.set(key, value, ttl=ttl)
+
+    def invalidate(self, key: str):
+        """删除凭证（如接口提示凭证已失效）"""
+        self._memory.delete(key)
+        redis_client = get_redis()
+        if redis_client is not None:
+            try:
+                redis_client.delete(self._redis_key(key))
+            except Exception as e:
+                logger.warning(f"删除凭证缓存失败: {str(e)}")
+
+    async def get(self, key: str, fetcher: Fetcher, force_refresh: bool = False) -> Any:
+        """
+        获取凭证，缓存缺失或即将过期时调用 fetcher 刷新
+
+        Args:
+            key: 凭证键
+            fetcher: 刷新函数
+            force_refresh: 忽略缓存强制刷新（并发的刷新请求仍会合并）
+
+        Returns:
+            凭证值；刷新失败时为 fetcher 返回的结果（不缓存）
+        """
+        if not force_refresh:
+            value = await self._run(self.peek, key)
+            if value is not None:
+                return value
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._refresh(key, fetcher, force_refresh))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.shared += 1
+
+        # 单个调用方被取消时不影响其他等待者
+        return await asyncio.shield(task)
+
+    def _acquire_lock(self, lock_key: str, token: str) -> bool:
+        """获取分布式刷新锁（同步）；Redis不可用时视为获得锁，由本进程直接刷新"""
+        redis_client = get_redis()
+        if redis_client is None:
+            return True
+        try:
+            return bool(redis_client.set(lock_key, token, nx=True, ex=int(self.lock_timeout)))
+        except Exception as e:
+            logger.warning(f"获取凭证刷新锁失败: {str(e)}")
+            return True
+
+    def _release_lock(self, lock_key: str, token: str):
+        """释放分布式刷新锁（同步），值与 token 相同时才删除"""
+        redis_client = get_redis()
+        if redis_client is None:
+            return
+        try:
+            redis_client.eval(_RELEASE_LOCK_LUA, 1, lock_key, token)
+        except Exception as e:
+            logger.warning(f"释放凭证刷新锁失败: {str(e)}")
+
+    async def single_flight(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        合并同一键的并发调用（只在进程内合并，结果不缓存）
+
+        用于一次性的凭证（如登录code）：客户端重复提交时共享一次上游调用，调用结束后即遗忘
+        """
+        inflight_key = f"once:{key}"
+        task = self._inflight.get(inflight_key)
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self._inflight[inflight_key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(inflight_key, None))
+        else:
+            self.shared += 1
+
+        # 单个调用方被取消时不影响其他等待者
+        return await asyncio.shield(task)
+
+    async def _refresh(self, key: str, fetcher: Fetcher, force_refresh: bool = False) -> Any:
+        """刷新凭证（同一进程内同一键只会同时执行一次）"""
+        if force_refresh:
+            await self._run(self.invalidate, key)
+
+        lock_key = f"{self._redis_key(key)}:lock"
+        token = uuid.uuid4().hex
+        locked = await self._run(self._acquire_lock, lock_key, token)
+
+        if not locked:
+            # 其他进程正在刷新，等待其写入结果
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+                value = await self._run(self.peek, key)
+                if value is not None:
+                    self.shared += 1
+                    return value
+            logger.warning(f"等待凭证刷新超时，直接请求: {self.name}")
+
+        try:
+            if locked:
+                # 获得锁前其他进程可能刚完成刷新
+                value = await self._run(self.peek, key)
+                if value is not None:
+                    return value
+
+            self.refreshes += 1
+            value, expires_in = await fetcher()
+            if expires_in:
+                await self._run(self.set, key, value, expires_in)
+            return value
+        finally:
+            if locked:
+                await self._run(self._release_lock, lock_key, token)
+
+    def stats(self) -> Dict[str, Any]:
+        """刷新统计"""
+        return {
+            "name": self.name,
+            "backend": "redis" if get_redis() is not None else "memory",
+            "refreshes": self.refreshes,
+            "shared": self.shared,
+            "inflight": len(self._inflight),
+            "memory": self._memory.stats()
+        }
@@ -3,9 +3,10 @@
 SQLAlchemy配置和会话管理
 """
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from typing import Generator
+from typing import AsyncGenerator, Generator
 
 from app.core.config import settings
 
@@ -27,6 +28,25 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+# 创建异步数据库引擎（aiomysql），查询期间不阻塞事件循环
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL or settings.DATABASE_URL.replace("mysql+pymysql://", "mysql+aiomysql://", 1),
+    pool_size=settings.DATABASE_POOL_SIZE,
+    max_overflow=settings.DATABASE_MAX_OVERFLOW,
+    pool_pre_ping=True,
+    pool_recycle=3600,
+    echo=settings.DEBUG,
+)
+
+# 创建异步会话工厂
+# 提交后不过期对象属性，避免在异步上下文中触发隐式加载
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # 创建基类
 Base = declarative_base()
 
@@ -43,3 +63,13 @@ def get_db() -> Generator:
     finally:
         db.close()
 
+
+
+# 异步数据库会话依赖
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    获取异步数据库会话
+    用于 async def 路由，查询通过 await 执行
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,152 @@
+"""
+出站HTTP客户端
+全局共享的 httpx.AsyncClient，复用到微信/支付宝等第三方接口的连接，避免每次请求重新进行DNS、TCP和TLS握手
+
+- 连接池保持长连接，安装 h2 时启用HTTP/2
+- 按主机限制并发连接数，单个第三方接口变慢不会占满整个连接池
+- 统一超时设置，连接失败、超时和5xx响应按指数退避重试
+"""
+import asyncio
+import random
+import logging
+import importlib.util
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 可重试的响应状态码
+RETRY_STATUS_CODES = {502, 503, 504}
+
+# 幂等方法：读超时和5xx响应也可以安全重试
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+# 请求尚未发出的错误，任何方法都可以安全重试
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class HTTPClientManager:
+    """
+    出站HTTP客户端管理器
+
+    应用启动时在 lifespan 中调用 start()，关闭时调用 stop()；
+    未启动时（脚本、测试）首次请求会自动创建客户端
+    """
+
+    def __init__(self):
+        self.retries = settings.HTTP_CLIENT_RETRIES
+        self.backoff = settings.HTTP_CLIENT_RETRY_BACKOFF_SECONDS
+        self.max_per_host = settings.HTTP_CLIENT_MAX_PER_HOST
+        self.http2 = settings.HTTP_CLIENT_HTTP2 and importlib.util.find_spec("h2") is not None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _create_client(self) -> httpx.AsyncClient:
+        """创建带连接池的客户端"""
+        return httpx.AsyncClient(
+            http2=self.http2,
+            timeout=httpx.Timeout(
+                settings.HTTP_CLIENT_TIMEOUT_SECONDS,
+                connect=settings.HTTP_CLIENT_CONNECT_TIMEOUT_SECONDS
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_CLIENT_MAX_KEEPALIVE,
+                keepalive_expiry=settings.HTTP_CLIENT_KEEPALIVE_EXPIRY_SECONDS
+            )
+        )
+
+    async def start(self):
+        """创建共享客户端"""
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()
+            logger.info(f"出站HTTP客户端已创建（HTTP/2: {'启用' if self.http2 else '未启用'}）")
+
+    async def stop(self):
+        """关闭共享客户端，释放所有连接"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._host_semaphores.clear()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """共享客户端（未启动时自动创建）"""
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()
+        return self._client
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        """按主机限制并发连接数"""
+        host = urlsplit(url).netloc
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._host_semaphores[host] = asyncio.Semaphore(self.max_per_host)
+        return semaphore
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        retries: Optional[int] = None,
+        idempotent: Optional[bool] = None,
+        **kwargs
+    ) -> httpx.Response:
+        """
+        发送请求（失败时按指数退避重试）
+
+        Args:
+            method: 请求方法
+            url: 请求地址
+            retries: 最大重试次数，默认 HTTP_CLIENT_RETRIES
+            idempotent: 请求是否可重复提交，默认按请求方法判断；
+                非幂等请求只在请求未发出（连接失败）时重试
+            **kwargs: 透传给 httpx 的参数（params、content、headers、timeout等）
+
+        Returns:
+            httpx.Response: 最后一次请求的响应
+        """
+        method = method.upper()
+        if retries is None:
+            retries = self.retries
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+
+        attempt = 0
+        while True:
+            try:
+                async with self._host_semaphore(url):
+                    response = await self.client.request(method, url, **kwargs)
+                if not (idempotent and response.status_code in RETRY_STATUS_CODES and attempt < retries):
+                    return response
+                reason = f"状态码 {response.status_code}"
+            except httpx.TransportError as e:
+                retryable = isinstance(e, _NOT_SENT_ERRORS) or (
+                    idempotent and isinstance(e, (httpx.TimeoutException, httpx.RemoteProtocolError))
+                )
+                if not retryable or attempt >= retries:
+                    raise
+                reason = f"{type(e).__name__}: {str(e)}"
+
+            # 指数退避加随机抖动
+            delay = self.backoff * (2 ** attempt) * (1 + random.random())
+            attempt += 1
+            logger.warning(f"请求 {method} {url} 失败（{reason}），{delay:.2f}s 后第 {attempt} 次重试")
+            await asyncio.sleep(delay)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        """发送GET请求"""
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        """发送POST请求"""
+        return await self.request("POST", url, **kwargs)
+
+
+# 创建全局实例
+http_client = HTTPClientManager()
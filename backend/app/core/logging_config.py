@@ -0,0 +1,176 @@
+"""
+日志配置
+结构化（JSON）日志，通过队列异步输出，业务代码写日志不再阻塞在终端/文件I/O上
+
+- 调用方线程只把日志记录放入队列，格式化、脱敏和输出由后台线程完成
+- 支持按模块设置日志级别（LOG_LEVELS）
+- 支持按模块对 INFO 及以下级别的日志采样（LOG_SAMPLE_RATES），WARNING 及以上始终输出
+- 输出前脱敏签名、密钥、令牌等敏感字段
+"""
+import re
+import copy
+import json
+import queue
+import random
+import logging
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+# 需要脱敏的字段名（小写）
+SENSITIVE_KEYS = {
+    "sign", "paysign", "key", "api_key", "secret", "app_secret", "session_key",
+    "access_token", "password", "private_key", "authorization", "js_code"
+}
+
+_REDACTED = "***"
+
+# key=value、"key": "value"、<key>value</key> 三种形式的敏感字段
+_KEYS_PATTERN = "|".join(sorted((re.escape(k) for k in SENSITIVE_KEYS), key=len, reverse=True))
+_REDACT_PATTERNS = (
+    re.compile(rf"(?i)\b({_KEYS_PATTERN})=([^&\s,'\"]+)"),
+    re.compile(rf"(?i)(['\"]({_KEYS_PATTERN})['\"]\s*:\s*)(['\"])(.*?)\3"),
+    re.compile(rf"(?i)(<({_KEYS_PATTERN})>)(.*?)(</\2>)"),
+)
+
+# LogRecord 自带的属性，其余属性视为通过 extra 传入的结构化字段
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+_listener: Optional[QueueListener] = None
+
+
+def _secret_values() -> list:
+    """配置中的密钥值，出现在日志任意位置都会被替换"""
+    values = [
+        settings.WECHAT_PAY_KEY, settings.WECHAT_SECRET, settings.ALIPAY_PRIVATE_KEY,
+        settings.JWT_SECRET_KEY, settings.SECRET_KEY, settings.SMS_SECRET_KEY,
+        settings.ALIYUN_OSS_ACCESS_KEY_SECRET
+    ]
+    return [v for v in values if v and len(v) >= 8]
+
+
+def redact(text: str, secrets: Optional[list] = None) -> str:
+    """脱敏文本中的敏感字段"""
+    text = _REDACT_PATTERNS[0].sub(lambda m: f"{m.group(1)}={_REDACTED}", text)
+    text = _REDACT_PATTERNS[1].sub(lambda m: f"{m.group(1)}{m.group(3)}{_REDACTED}{m.group(3)}", text)
+    text = _REDACT_PATTERNS[2].sub(lambda m: f"{m.group(1)}{_REDACTED}{m.group(4)}", text)
+    for secret in secrets or ():
+        text = text.replace(secret, _REDACTED)
+    return text
+
+
+def _redact_value(key: str, value, secrets: list):
+    """脱敏结构化字段"""
+    if key.lower() in SENSITIVE_KEYS:
+        return _REDACTED
+    if isinstance(value, str):
+        return redact(value, secrets)
+    if isinstance(value, dict):
+        return {k: _redact_value(str(k), v, secrets) for k, v in value.items()}
+    return value
+
+
+class JSONFormatter(logging.Formatter):
+    """JSON日志格式，extra 传入的字段作为顶层字段输出"""
+
+    def __init__(self):
+        super().__init__()
+        self.secrets = _secret_values()
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": redact(record.getMessage(), self.secrets),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                data[key] = _redact_value(key, value, self.secrets)
+        if record.exc_text:
+            data["exc_info"] = redact(record.exc_text, self.secrets)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """文本日志格式（本地开发使用），同样进行脱敏"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s [%(name)s] %(message)s")
+        self.secrets = _secret_values()
+
+    def format(self, record: logging.LogRecord) -> str:
+        return redact(super().format(record), self.secrets)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    按模块采样
+
+    rates 为 {logger名称前缀: 采样率}，匹配最长前缀；只对 INFO 及以下级别生效
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        for prefix, rate in self.rates:
+            if record.name == prefix or record.name.startswith(prefix + "."):
+                return rate >= 1 or random.random() < rate
+        return True
+
+
+class _AsyncQueueHandler(QueueHandler):
+    """只在调用方线程合并日志参数，序列化和脱敏交给后台线程"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging():
+    """
+    初始化日志（应用启动时调用一次）
+
+    根日志器只挂一个队列处理器，由后台 QueueListener 线程输出到标准输出
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler()
+    output.setFormatter(JSONFormatter() if settings.LOG_FORMAT == "json" else TextFormatter())
+
+    log_queue: "queue.Queue" = queue.Queue(-1)
+    handler = _AsyncQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATES))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+
+    for name, level in settings.LOG_LEVELS.items():
+        logging.getLogger(name).setLevel(level.upper())
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    """停止后台输出线程，输出队列中剩余的日志"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
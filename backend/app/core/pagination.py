@@ -0,0 +1,275 @@
+"""
+分页工具
+基于 (created_at, id) 的游标分页（keyset），兼容原有 page/page_size 分页；
+多个来源按时间归并分页（k 路归并），每个来源只读取一页所需的行
+"""
+import json
+import heapq
+import base64
+import logging
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query, Session
+
+logger = logging.getLogger(__name__)
+
+# 总数统计方式
+COUNT_EXACT = "exact"        # COUNT(*) 精确总数
+COUNT_ESTIMATE = "estimate"  # 根据执行计划估算的总数（大表使用）
+COUNT_NONE = "none"          # 不统计总数
+COUNT_MODES = (COUNT_EXACT, COUNT_ESTIMATE, COUNT_NONE)
+COUNT_PATTERN = "^(exact|estimate|none)$"
+
+
+def encode_cursor(created_at: Optional[datetime], id_value: int) -> str:
+    """生成不透明游标"""
+    payload = json.dumps(
+        [created_at.isoformat() if created_at else None, id_value],
+        separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """解析游标，返回 (created_at, id)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, id_value = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (datetime.fromisoformat(created_at) if created_at else None, int(id_value))
+    except Exception:
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+
+
+class CursorPage:
+    """分页结果"""
+
+    def __init__(
+        self,
+        items: List[Any],
+        total: Optional[int],
+        page: int,
+        page_size: int,
+        next_cursor: Optional[str],
+        has_more: bool
+    ):
+        self.items = items
+        self.total = total
+        self.page = page
+        self.page_size = page_size
+        self.next_cursor = next_cursor
+        self.has_more = has_more
+
+    def meta(self) -> Dict[str, Any]:
+        """分页信息（与原有的 total/page/page_size 字段兼容）"""
+        return {
+            "total": self.total,
+            "page": self.page,
+            "page_size": self.page_size,
+            "next_cursor": self.next_cursor,
+            "has_more": self.has_more
+        }
+
+
+def _estimate_count(db: Session, query: Query) -> int:
+    """
+    估算查询结果数量
+
+    使用 EXPLAIN 的 rows * filtered 估算值，不扫描数据；估算失败时退回精确统计
+    """
+    try:
+        statement = query.order_by(None).statement
+        compiled = statement.compile(
+            dialect=db.bind.dialect,
+            compile_kwargs={"render_postcompile": True}
+        )
+        rows = db.connection().exec_driver_sql(
+            f"EXPLAIN {compiled}", compiled.params
+        ).mappings().all()
+        if rows:
+            first = rows[0]
+            estimate = int(first.get("rows") or 0)
+            filtered = first.get("filtered")
+            if filtered is not None:
+                estimate = int(estimate * float(filtered) / 100)
+            return estimate
+    except Exception as e:
+        logger.warning(f"估算总数失败，使用精确统计: {str(e)}")
+    return query.order_by(None).count()
+
+
+def paginate(
+    db: Session,
+    query: Query,
+    created_column,
+    id_column,
+    page: int = 1,
+    page_size: int = 20,
+    cursor: Optional[str] = None,
+    count: Optional[str] = None
+) -> CursorPage:
+    """
+    按 (created_at, id) 倒序分页
+
+    Args:
+        db: 数据库会话
+        query: 已添加筛选条件的查询
+        created_column: 创建时间列
+        id_column: 主键列
+        page: 页码（未传游标时使用，兼容旧客户端）
+        page_size: 每页数量
+        cursor: 上一页返回的 next_cursor，传入后忽略 page
+        count: 总数统计方式 exact/estimate/none，默认页码分页为 exact、游标分页为 none
+
+    Returns:
+        CursorPage: 分页结果
+    """
+    if count is None:
+        count = COUNT_NONE if cursor else COUNT_EXACT
+
+    if count == COUNT_EXACT:
+        total = query.order_by(None).count()
+    elif count == COUNT_ESTIMATE:
+        total = _estimate_count(db, query)
+    else:
+        total = None
+
+    ordered = query.order_by(None).order_by(created_column.desc(), id_column.desc())
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        ordered = ordered.filter(
+            or_(
+                created_column < created_at,
+                and_(created_column == created_at, id_column < last_id)
+            )
+        )
+    else:
+        ordered = ordered.offset((page - 1) * page_size)
+
+    # 多取一条判断是否还有下一页
+    rows = ordered.limit(page_size + 1).all()
+    has_more = len(rows) > page_size
+    items = rows[:page_size]
+
+    next_cursor = None
+    if has_more and items:
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, created_column.key), getattr(last, id_column.key))
+
+    return CursorPage(
+        items=items,
+        total=total,
+        page=page,
+        page_size=page_size,
+        next_cursor=next_cursor,
+        has_more=has_more
+    )
+
+
+def encode_merge_cursor(time_value: Optional[datetime], source: int, id_value: int) -> str:
+    """生成归并分页游标"""
+    payload = json.dumps(
+        [time_value.isoformat() if time_value else None, source, id_value],
+        separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_merge_cursor(cursor: str) -> tuple:
+    """解析归并分页游标，返回 (time, source, id)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        time_value, source, id_value = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (datetime.fromisoformat(time_value), int(source), int(id_value))
+    except Exception:
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+
+
+def merge_paginate(
+    db: Session,
+    sources: Sequence[Tuple[Query, Any, Any]],
+    page: int = 1,
+    page_size: int = 20,
+    cursor: Optional[str] = None,
+    count: Optional[str] = None
+) -> CursorPage:
+    """
+    多个来源按 (time, 来源序号, id) 倒序归并分页
+
+    每个来源各自按索引顺序读取至多 offset + page_size + 1 行，再做 k 路归并；
+    游标分页时 offset 为0，读取量只与 page_size 有关。时间为空的行不参与分页。
+
+    Args:
+        db: 数据库会话
+        sources: [(已添加筛选条件的查询, 时间列, 主键列), ...]，来源序号即下标
+        page: 页码（未传游标时使用，兼容旧客户端）
+        page_size: 每页数量
+        cursor: 上一页返回的 next_cursor，传入后忽略 page
+        count: 总数统计方式 exact/estimate/none，默认页码分页为 exact、游标分页为 none
+
+    Returns:
+        CursorPage: items 为 (来源序号, 行) 列表
+    """
+    if count is None:
+        count = COUNT_NONE if cursor else COUNT_EXACT
+
+    # 时间为空的行不参与分页，统计总数时同样排除，total 与可翻到的行数一致
+    sources = [
+        (query.order_by(None).filter(time_column.isnot(None)), time_column, id_column)
+        for query, time_column, id_column in sources
+    ]
+
+    if count == COUNT_EXACT:
+        total = sum(query.count() for query, _, _ in sources)
+    elif count == COUNT_ESTIMATE:
+        total = sum(_estimate_count(db, query) for query, _, _ in sources)
+    else:
+        total = None
+
+    after = decode_merge_cursor(cursor) if cursor else None
+    offset = 0 if after else (page - 1) * page_size
+    limit = offset + page_size + 1
+
+    streams = []
+    for source, (query, time_column, id_column) in enumerate(sources):
+        ordered = query
+        if after:
+            after_time, after_source, after_id = after
+            # (time, source, id) < 游标：来源序号固定，同一时间下按来源序号决定是否包含
+            if source < after_source:
+                ordered = ordered.filter(time_column <= after_time)
+            elif source > after_source:
+                ordered = ordered.filter(time_column < after_time)
+            else:
+                ordered = ordered.filter(
+                    or_(
+                        time_column < after_time,
+                        and_(time_column == after_time, id_column < after_id)
+                    )
+                )
+        rows = ordered.order_by(time_column.desc(), id_column.desc()).limit(limit).all()
+        streams.append([
+            ((getattr(row, time_column.key), source, getattr(row, id_column.key)), row)
+            for row in rows
+        ])
+
+    merged = heapq.merge(*streams, key=lambda item: item[0], reverse=True)
+    window = list(islice(merged, offset, limit))
+    has_more = len(window) > page_size
+    window = window[:page_size]
+
+    next_cursor = None
+    if has_more and window:
+        next_cursor = encode_merge_cursor(*window[-1][0])
+
+    return CursorPage(
+        items=[(key[1], row) for key, row in window],
+        total=total,
+        page=page,
+        page_size=page_size,
+        next_cursor=next_cursor,
+        has_more=has_more
+    )
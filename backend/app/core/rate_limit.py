@@ -0,0 +1,202 @@
+"""
+接口限流
+令牌桶算法：桶容量为规则中的次数，令牌按 次数/秒数 的速度匀速补充，允许瞬时用完整桶
+
+- 配置Redis后桶状态存放在Redis（Lua脚本原子更新，使用Redis服务器时间），多进程、多机共享；
+  否则或Redis异常时使用进程内存
+- 规则格式 "次数/秒数"，例如 "1/60" 表示每60秒1次；留空或次数为0表示不限制
+"""
+import math
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.redis import get_redis, redis_configured
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1]: 桶键；ARGV: 容量, 补满整桶的毫秒数
+# 返回 {是否允许, 剩余令牌数, 需等待的毫秒数}
+_TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local period_ms = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil or ts == nil then
+    tokens = capacity
+    ts = now
+end
+tokens = math.min(capacity, tokens + math.max(now - ts, 0) * capacity / period_ms)
+local allowed = 0
+local retry_ms = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry_ms = math.ceil((1 - tokens) * period_ms / capacity)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], period_ms)
+return {allowed, math.floor(tokens), retry_ms}
+"""
+
+
+class RateLimitRule:
+    """限流规则：period 秒内最多 capacity 次"""
+
+    __slots__ = ("capacity", "period")
+
+    def __init__(self, capacity: int, period: float):
+        self.capacity = capacity
+        self.period = period
+
+    @classmethod
+    def parse(cls, rule: str) -> Optional["RateLimitRule"]:
+        """解析 "次数/秒数"，留空或次数为0返回 None（不限制）"""
+        if not rule:
+            return None
+        try:
+            capacity, period = rule.split("/", 1)
+            capacity, period = int(capacity), float(period)
+        except ValueError:
+            raise ValueError(f"限流规则格式错误: {rule}，应为 次数/秒数")
+        if capacity <= 0:
+            return None
+        if period <= 0:
+            raise ValueError(f"限流规则格式错误: {rule}，秒数必须大于0")
+        return cls(capacity, period)
+
+    def __repr__(self) -> str:
+        return f"{self.capacity}/{self.period:g}"
+
+
+class RateLimitResult:
+    """一次限流判断的结果"""
+
+    __slots__ = ("allowed", "remaining", "retry_after")
+
+    def __init__(self, allowed: bool, remaining: int, retry_after: float):
+        self.allowed = allowed
+        self.remaining = remaining
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """
+    令牌桶限流器
+
+    Args:
+        max_entries: 进程内存实现最多保存的桶数（超出时淘汰最久未使用的桶，相当于重置其限流）
+    """
+
+    def __init__(self, max_entries: int = settings.RATE_LIMIT_MEMORY_MAX_ENTRIES):
+        # 桶状态 (令牌数, 更新时间)，补满整桶后过期
+        self._buckets = TTLCache(ttl=0, max_entries=max_entries, name="rate_limit")
+        self._lock = threading.Lock()
+        self._script = None
+        self._script_client = None
+        self.allowed: Dict[str, int] = {}
+        self.rejected: Dict[str, int] = {}
+
+    @staticmethod
+    def _key(scope: str, key: str) -> str:
+        return f"ratelimit:{scope}:{key}"
+
+    def _hit_memory(self, bucket_key: str, rule: RateLimitRule) -> RateLimitResult:
+        now = time.monotonic()
+        rate = rule.capacity / rule.period
+        with self._lock:
+            state = self._buckets.get(bucket_key)
+            if state is None:
+                tokens = float(rule.capacity)
+            else:
+                tokens, updated_at = state
+                tokens = min(rule.capacity, tokens + (now - updated_at) * rate)
+
+            if tokens >= 1:
+                tokens -= 1
+                result = RateLimitResult(True, int(tokens), 0)
+            else:
+                result = RateLimitResult(False, 0, (1 - tokens) / rate)
+            self._buckets.set(bucket_key, (tokens, now), ttl=rule.period)
+        return result
+
+    def _hit_redis(self, redis_client, bucket_key: str, rule: RateLimitRule) -> RateLimitResult:
+        if self._script is None or self._script_client is not redis_client:
+            self._script = redis_client.register_script(_TOKEN_BUCKET_LUA)
+            self._script_client = redis_client
+        allowed, remaining, retry_ms = self._script(
+            keys=[bucket_key], args=[rule.capacity, int(math.ceil(rule.period * 1000))]
+        )
+        return RateLimitResult(bool(allowed), int(remaining), int(retry_ms) / 1000)
+
+    def hit(self, scope: str, key: str, rule: Optional[RateLimitRule]) -> RateLimitResult:
+        """
+        消耗一个令牌
+
+        Args:
+            scope: 限流场景（如 sms_phone），不同场景的桶互不影响
+            key: 限流对象（手机号、用户ID、IP）
+            rule: 限流规则，None 表示不限制
+        """
+        if rule is None:
+            return RateLimitResult(True, 0, 0)
+
+        bucket_key = self._key(scope, key)
+        result = None
+        redis_client = get_redis()
+        if redis_client is not None:
+            try:
+                result = self._hit_redis(redis_client, bucket_key, rule)
+            except Exception as e:
+                logger.warning(f"Redis限流失败，使用进程内存: {str(e)}")
+        if result is None:
+            result = self._hit_memory(bucket_key, rule)
+
+        counter = self.allowed if result.allowed else self.rejected
+        counter[scope] = counter.get(scope, 0) + 1
+        if not result.allowed:
+            logger.info("请求被限流", extra={"scope": scope, "retry_after": round(result.retry_after, 1)})
+        return result
+
+    async def hit_async(self, scope: str, key: str, rule: Optional[RateLimitRule]) -> RateLimitResult:
+        """
+        消耗一个令牌（异步接口使用）
+
+        配置Redis时在线程池中执行 Lua 脚本，不阻塞事件循环；进程内存实现直接执行
+        """
+        if rule is None or not redis_configured():
+            return self.hit(scope, key, rule)
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self.hit, scope, key, rule)
+
+    def reset(self, scope: str, key: str):
+        """清除某个对象的限流状态（如人工解封）"""
+        bucket_key = self._key(scope, key)
+        self._buckets.delete(bucket_key)
+        redis_client = get_redis()
+        if redis_client is not None:
+            try:
+                redis_client.delete(bucket_key)
+            except Exception as e:
+                logger.warning(f"清除限流状态失败: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """各场景的放行/拒绝次数"""
+        return {
+            "backend": "redis" if get_redis() is not None else "memory",
+            "allowed": dict(self.allowed),
+            "rejected": dict(self.rejected),
+            "memory": self._buckets.stats()
+        }
+
+
+# 创建全局实例
+rate_limiter = RateLimiter()
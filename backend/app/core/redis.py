@@ -0,0 +1,68 @@
+"""
+Redis客户端
+配置 REDIS_URL，或未配置 REDIS_URL 时配置 REDIS_HOST/REDIS_PORT/REDIS_DB/REDIS_PASSWORD 后启用；
+未配置或连接失败时返回None，由调用方回退到进程内存实现，连接失败后每 REDIS_RETRY_SECONDS 秒重试
+"""
+import time
+import logging
+import threading
+from typing import Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_retry_at = 0.0
+_lock = threading.Lock()
+
+
+def redis_configured() -> bool:
+    """是否配置了Redis（REDIS_URL 和 REDIS_HOST 都留空表示不使用Redis）"""
+    return bool(settings.REDIS_URL or settings.REDIS_HOST)
+
+
+def _connect():
+    """按配置创建客户端并检查连接"""
+    import redis
+
+    options = dict(
+        password=settings.REDIS_PASSWORD or None,
+        decode_responses=True,
+        socket_timeout=1.0,
+        socket_connect_timeout=1.0,
+    )
+    if settings.REDIS_URL:
+        client = redis.Redis.from_url(settings.REDIS_URL, **options)
+    else:
+        client = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=settings.REDIS_DB, **options)
+    client.ping()
+    return client
+
+
+def get_redis() -> Optional["redis.Redis"]:
+    """
+    获取全局Redis客户端（懒加载）
+
+    Returns:
+        Redis客户端，未配置或不可用时返回None（连接失败不会一直返回None，到重试时间后重新连接）
+    """
+    global _client, _retry_at
+
+    if _client is not None or not redis_configured():
+        return _client
+
+    with _lock:
+        if _client is not None:
+            return _client
+        if time.monotonic() < _retry_at:
+            return None
+
+        try:
+            _client = _connect()
+            logger.info("Redis连接成功")
+        except Exception as e:
+            _retry_at = time.monotonic() + settings.REDIS_RETRY_SECONDS
+            logger.warning(f"Redis不可用，{settings.REDIS_RETRY_SECONDS:g}秒后重试，期间使用进程内存实现: {str(e)}")
+
+    return _client
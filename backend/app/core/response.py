@@ -1,68 +1,86 @@
 """
 统一响应格式
+响应体由 orjson 直接序列化：Decimal、datetime 等类型原生处理，不经过 jsonable_encoder
 """
-from typing import Any, Optional
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.encoders import jsonable_encoder, decimal_encoder
 from fastapi.responses import JSONResponse
 
 
+def _orjson_default(obj: Any) -> Any:
+    """
+    orjson 不支持的类型：Decimal 与 jsonable_encoder 规则一致（整数值输出整数，否则输出浮点数），
+    其余类型（pydantic 模型、set 等）交给 jsonable_encoder
+    """
+    if isinstance(obj, Decimal):
+        return decimal_encoder(obj)
+    return jsonable_encoder(obj)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    orjson 序列化的 JSON 响应（应用默认响应类）
+
+    - datetime/date 输出 ISO 8601（与 isoformat() 相同），Decimal 输出数字，Enum、UUID 原生支持
+    - 字典的整数键转为字符串
+    - 直接返回本类实例时 FastAPI 不再调用 jsonable_encoder 遍历响应体
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _payload(code: int, message: str, data: Any) -> FastJSONResponse:
+    return FastJSONResponse(content={
+        "code": code,
+        "message": message,
+        "data": data
+    })
+
+
 class Response:
     """统一响应格式"""
     
     @staticmethod
-    def success(data: Any = None, message: str = "操作成功", code: int = 200) -> dict:
+    def success(data: Any = None, message: str = "操作成功", code: int = 200) -> FastJSONResponse:
         """成功响应"""
-        return {
-            "code": code,
-            "message": message,
-            "data": data
-        }
+        return _payload(code, message, data)
     
     @staticmethod
-    def error(message: str = "操作失败", code: int = 400, data: Any = None) -> dict:
+    def error(message: str = "操作失败", code: int = 400, data: Any = None) -> FastJSONResponse:
         """错误响应"""
-        return {
-            "code": code,
-            "message": message,
-            "data": data
-        }
+        return _payload(code, message, data)
     
     @staticmethod
-    def unauthorized(message: str = "未授权") -> dict:
+    def unauthorized(message: str = "未授权") -> FastJSONResponse:
         """未授权响应"""
-        return {
-            "code": 401,
-            "message": message,
-            "data": None
-        }
+        return _payload(401, message, None)
     
     @staticmethod
-    def forbidden(message: str = "禁止访问") -> dict:
+    def forbidden(message: str = "禁止访问") -> FastJSONResponse:
         """禁止访问响应"""
-        return {
-            "code": 403,
-            "message": message,
-            "data": None
-        }
+        return _payload(403, message, None)
     
     @staticmethod
-    def not_found(message: str = "资源不存在") -> dict:
+    def not_found(message: str = "资源不存在") -> FastJSONResponse:
         """资源不存在响应"""
-        return {
-            "code": 404,
-            "message": message,
-            "data": None
-        }
+        return _payload(404, message, None)
 
 
 # 兼容性：为旧代码提供别名
-class SuccessResponse(dict):
+class SuccessResponse(FastJSONResponse):
     """成功响应（兼容性）"""
     def __init__(self, data: Any = None, message: str = "操作成功", code: int = 200):
-        super().__init__(code=code, message=message, data=data)
+        super().__init__(content={"code": code, "message": message, "data": data})
 
 
-class ErrorResponse(dict):
+class ErrorResponse(FastJSONResponse):
     """错误响应（兼容性）"""
     def __init__(self, message: str = "操作失败", code: int = 400, data: Any = None):
-        super().__init__(code=code, message=message, data=data)
+        super().__init__(content={"code": code, "message": message, "data": data})
 
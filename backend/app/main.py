@@ -4,14 +4,26 @@ FastAPI Application
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 from pathlib import Path
+import logging
 
 from app.core.config import settings
-from app.core.database import engine, Base
+from app.core.database import engine, async_engine, Base
+from app.core.http_client import http_client
+from app.core.logging_config import setup_logging, shutdown_logging
+from app.core.response import FastJSONResponse
 from app.api import router
+from app.services.view_counter import view_counter
+from app.services.auth_cache import auth_cache
+from app.services.project_search import project_search
+from app.services.stats_service import stats_service
+from app.services.points_ledger import points_ledger
+from app.services.alipay_service import alipay_service
+
+setup_logging()
+logger = logging.getLogger(__name__)
 
 
 # 应用生命周期管理
@@ -19,9 +31,13 @@ from app.api import router
 async def lifespan(app: FastAPI):
     """应用启动和关闭时的生命周期管理"""
     # 启动时
-    print("🚀 科研检测服务平台启动中...")
-    print(f"📝 环境: {'开发' if settings.DEBUG else '生产'}")
-    print(f"🔗 数据库: {settings.DATABASE_URL.split('@')[-1]}")
+    logger.info(
+        "科研检测服务平台启动中",
+        extra={
+            "env": "开发" if settings.DEBUG else "生产",
+            "database": settings.DATABASE_URL.split('@')[-1]
+        }
+    )
     
     # 导入所有模型（确保SQLAlchemy能创建所有表）
     import app.models  # noqa: F401
@@ -29,12 +45,39 @@ async def lifespan(app: FastAPI):
     # 创建数据库表（生产环境使用Alembic迁移）
     if settings.DEBUG:
         Base.metadata.create_all(bind=engine)
-        print("✅ 数据库表创建完成")
+        logger.info("数据库表创建完成")
+    
+    # 创建出站HTTP连接池
+    await http_client.start()
+    
+    # 启动浏览量定时写回任务
+    view_counter.start()
+    
+    # 启动积分定时对账任务
+    points_ledger.start()
+    
+    # 启动用户变更检查任务（其他进程修改用户后使本进程的认证快照失效）
+    auth_cache.start()
+    
+    # 构建项目搜索索引并启动定时重建任务
+    await project_search.start()
+    
+    # 启动仪表盘每日统计定时刷新任务
+    stats_service.start()
     
     yield
     
     # 关闭时
-    print("👋 科研检测服务平台关闭")
+    await stats_service.stop()
+    await project_search.stop()
+    await auth_cache.stop()
+    await points_ledger.stop()
+    await view_counter.stop()
+    await http_client.stop()
+    alipay_service.gateway.shutdown()
+    await async_engine.dispose()
+    logger.info("科研检测服务平台关闭")
+    shutdown_logging()
 
 
 # 创建FastAPI应用
@@ -43,6 +86,7 @@ app = FastAPI(
     version=settings.APP_VERSION,
     description="科研检测服务平台API - 对标eceshi.com",
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,
     docs_url="/api/docs" if settings.DEBUG else None,
     redoc_url="/api/redoc" if settings.DEBUG else None,
 )
@@ -62,7 +106,7 @@ app.add_middleware(
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """全局异常处理器"""
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=500,
         content={
             "code": 500,
@@ -5,13 +5,18 @@ from app.models.user import User, UserCertification, UserStatus, MembershipLevel
 from app.models.sms_code import SMSCode
 from app.models.order import Order, OrderSample, OrderFee, OrderStatusHistory, Payment, UserAddress
 from app.models.project import ProjectCategory, Project, ProjectReview
-from app.models.coupon import Coupon, UserCoupon, CouponType, CouponStatus, UserCouponStatus
+from app.models.coupon import Coupon, UserCoupon, CouponClaim, CouponType, CouponStatus, UserCouponStatus
 from app.models.recharge import RechargeRecord, RechargeStatus, RechargeMethod
 from app.models.points import PointsGoods, PointsRecord, PointsExchangeRecord
 from app.models.group import UserGroup, GroupMember, GroupRole, GroupStatus
 from app.models.invite import InviteRecord, WithdrawRecord, InviteConfig, InviteStatus, WithdrawStatus
 from app.models.invoice import Invoice, InvoiceType, InvoiceStatus
-from app.models.lottery import LotteryPrize, LotteryRecord, LotteryChance, PrizeType, PrizeStatus
+from app.models.lottery import LotteryPrize, LotteryPrizeDailyStock, LotteryRecord, LotteryChance, PrizeType, PrizeStatus
+from app.models.stats import DailyStats
+from app.models.wallet import WalletTransaction
+from app.models.review import OrderReview, ProjectRatingStats
+from app.models.upload import UploadBlob, UploadRef
+from app.models.snowflake import SnowflakeWorker
 
 __all__ = [
     "User",
@@ -30,6 +35,7 @@ __all__ = [
     "ProjectReview",
     "Coupon",
     "UserCoupon",
+    "CouponClaim",
     "CouponType",
     "CouponStatus",
     "UserCouponStatus",
@@ -52,9 +58,17 @@ __all__ = [
     "InvoiceType",
     "InvoiceStatus",
     "LotteryPrize",
+    "LotteryPrizeDailyStock",
     "LotteryRecord",
     "LotteryChance",
     "PrizeType",
-    "PrizeStatus"
+    "PrizeStatus",
+    "DailyStats",
+    "WalletTransaction",
+    "OrderReview",
+    "ProjectRatingStats",
+    "UploadBlob",
+    "UploadRef",
+    "SnowflakeWorker"
 ]
 
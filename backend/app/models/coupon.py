@@ -1,7 +1,7 @@
 """
 优惠券模型
 """
-from sqlalchemy import Column, Integer, String, DateTime, Enum, Numeric, Boolean, Text
+from sqlalchemy import Column, Integer, String, DateTime, Enum, Numeric, Boolean, Text, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -98,3 +98,20 @@ class UserCoupon(Base):
     
     def __repr__(self):
         return f"<UserCoupon user_id={self.user_id} coupon_id={self.coupon_id}>"
+
+
+class CouponClaim(Base):
+    """优惠券领取记录表（每个用户每种券一行，指向当前持有的券；该券未使用时不能再次领取）"""
+    __tablename__ = "coupon_claims"
+    __table_args__ = (
+        UniqueConstraint("coupon_id", "user_id", name="uk_coupon_user"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True, comment="ID")
+    coupon_id = Column(Integer, nullable=False, comment="优惠券ID")
+    user_id = Column(Integer, nullable=False, index=True, comment="用户ID")
+    user_coupon_id = Column(Integer, comment="当前持有的用户优惠券ID")
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="领取时间")
+    
+    def __repr__(self):
+        return f"<CouponClaim user_id={self.user_id} coupon_id={self.coupon_id}>"
@@ -1,7 +1,7 @@
 """
 抽奖系统模型
 """
-from sqlalchemy import Column, Integer, String, DateTime, Enum, Numeric, Text, BigInteger, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Date, Enum, Numeric, Text, BigInteger, Boolean, UniqueConstraint
 from sqlalchemy.sql import func
 import enum
 
@@ -58,6 +58,22 @@ class LotteryPrize(Base):
         return f"<LotteryPrize {self.name}>"
 
 
+class LotteryPrizeDailyStock(Base):
+    """奖品每日发放计数表（用于 daily_limit 的原子扣减）"""
+    __tablename__ = "lottery_prize_daily_stock"
+    __table_args__ = (
+        UniqueConstraint("prize_id", "stat_date", name="uk_prize_date"),
+    )
+    
+    id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
+    prize_id = Column(BigInteger, nullable=False, comment="奖品ID")
+    stat_date = Column(Date, nullable=False, comment="日期")
+    issued_count = Column(Integer, default=0, nullable=False, comment="当日已发放数量")
+    
+    def __repr__(self):
+        return f"<LotteryPrizeDailyStock prize_id={self.prize_id} date={self.stat_date}>"
+
+
 class LotteryRecord(Base):
     """抽奖记录表"""
     __tablename__ = "lottery_records"
@@ -43,8 +43,8 @@ class Order(Base):
     payment_time = Column(DateTime, comment="支付时间")
     
     # 时间信息
-    created_at = Column(DateTime, server_default=func.now(), comment="创建时间")
-    paid_at = Column(DateTime, comment="支付时间")
+    created_at = Column(DateTime, server_default=func.now(), index=True, comment="创建时间")
+    paid_at = Column(DateTime, index=True, comment="支付时间")
     confirmed_at = Column(DateTime, comment="确认时间")
     started_at = Column(DateTime, comment="开始实验时间")
     completed_at = Column(DateTime, comment="完成时间")
@@ -0,0 +1,64 @@
+"""
+订单评价模型
+"""
+from sqlalchemy import Column, BigInteger, Integer, String, Text, DateTime, Boolean
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class OrderReview(Base):
+    """订单评价表"""
+    __tablename__ = "order_reviews"
+
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, nullable=False, index=True, comment="订单ID")
+    user_id = Column(Integer, nullable=False, index=True, comment="用户ID")
+    project_id = Column(Integer, nullable=False, index=True, comment="项目ID")
+
+    # 评分（1-5星）
+    service_rating = Column(Integer, default=5, comment="服务质量评分")
+    quality_rating = Column(Integer, default=5, comment="检测效果评分")
+    logistics_rating = Column(Integer, default=5, comment="物流配送评分")
+
+    # 评价内容
+    content = Column(Text, comment="评价内容")
+    images = Column(Text, comment="评价图片（JSON数组）")
+    tags = Column(String(500), comment="评价标签（逗号分隔）")
+
+    # 其他信息
+    is_anonymous = Column(Boolean, default=False, comment="是否匿名")
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="评价时间")
+
+
+class ProjectRatingStats(Base):
+    """项目评分汇总表（创建评价时同步累加）"""
+    __tablename__ = "project_rating_stats"
+
+    project_id = Column(BigInteger, primary_key=True, autoincrement=False, comment="项目ID")
+    review_count = Column(Integer, nullable=False, default=0, comment="评价数")
+
+    # 评分总和（平均分 = 总和 / 评价数）
+    service_rating_sum = Column(Integer, nullable=False, default=0, comment="服务质量评分总和")
+    quality_rating_sum = Column(Integer, nullable=False, default=0, comment="检测效果评分总和")
+    logistics_rating_sum = Column(Integer, nullable=False, default=0, comment="物流配送评分总和")
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), comment="更新时间")
+
+    def averages(self) -> dict:
+        """评价数和各项平均分"""
+        count = self.review_count or 0
+
+        def avg(total):
+            return round(total / count, 2) if count else 0
+
+        service = avg(self.service_rating_sum or 0)
+        quality = avg(self.quality_rating_sum or 0)
+        logistics = avg(self.logistics_rating_sum or 0)
+        return {
+            "review_count": count,
+            "avg_service_rating": service,
+            "avg_quality_rating": quality,
+            "avg_logistics_rating": logistics,
+            "avg_rating": round((service + quality + logistics) / 3, 2) if count else 0
+        }
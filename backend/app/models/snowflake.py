@@ -0,0 +1,18 @@
+"""
+分布式ID机器号租约模型
+"""
+from sqlalchemy import Column, Integer, String, DateTime
+
+from app.core.database import Base
+
+
+class SnowflakeWorker(Base):
+    """机器号租约表（未配置Redis时由ID生成器使用，过期的机器号可被其他进程占用）"""
+    __tablename__ = "snowflake_workers"
+
+    worker_id = Column(Integer, primary_key=True, autoincrement=False, comment="机器号 0-1023")
+    token = Column(String(32), nullable=False, comment="持有者令牌（每个进程随机生成）")
+    expires_at = Column(DateTime, nullable=False, index=True, comment="租约到期时间")
+
+    def __repr__(self):
+        return f"<SnowflakeWorker {self.worker_id} expires={self.expires_at}>"
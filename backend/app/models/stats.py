@@ -0,0 +1,46 @@
+"""
+统计汇总模型
+"""
+from sqlalchemy import Column, Integer, Date, DateTime, Numeric, Boolean, JSON
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class DailyStats(Base):
+    """每日统计汇总表（仪表盘使用，历史日期计算完成后冻结）"""
+    __tablename__ = "daily_stats"
+
+    id = Column(Integer, primary_key=True, index=True, comment="ID")
+    stat_date = Column(Date, unique=True, nullable=False, index=True, comment="统计日期")
+
+    # 用户
+    new_users = Column(Integer, default=0, comment="新增用户数")
+
+    # 订单
+    order_count = Column(Integer, default=0, comment="新增订单数")
+    paid_order_count = Column(Integer, default=0, comment="当日支付订单数")
+    revenue = Column(Numeric(12, 2), default=0, comment="当日收入（按支付时间）")
+
+    # 充值
+    recharge_count = Column(Integer, default=0, comment="成功充值笔数")
+    recharge_amount = Column(Numeric(12, 2), default=0, comment="成功充值金额")
+
+    # 全量合计快照（后台刷新时写入当日行，仪表盘读取最近一行）
+    total_users = Column(Integer, comment="用户总数")
+    total_orders = Column(Integer, comment="订单总数")
+    total_revenue = Column(Numeric(14, 2), comment="累计收入（当前为已支付状态的订单）")
+    total_recharge = Column(Numeric(14, 2), comment="累计成功充值金额")
+    total_projects = Column(Integer, comment="项目总数")
+    active_projects = Column(Integer, comment="上架项目数")
+    pending_recharge_count = Column(Integer, comment="待处理充值笔数")
+    order_status_counts = Column(JSON, comment="订单状态分布 {状态: 数量}")
+
+    # 冻结标记：日期过去后重新计算一次并冻结，之后不再重算
+    is_final = Column(Boolean, default=False, comment="是否已冻结")
+
+    created_at = Column(DateTime, server_default=func.now(), comment="创建时间")
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), comment="更新时间")
+
+    def __repr__(self):
+        return f"<DailyStats {self.stat_date}>"
@@ -0,0 +1,38 @@
+"""
+上传文件模型
+"""
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class UploadBlob(Base):
+    """上传文件内容表（按内容摘要去重，同一内容只保存一份）"""
+    __tablename__ = "upload_blobs"
+
+    digest = Column(String(64), primary_key=True, comment="内容SHA-256摘要")
+    url = Column(String(255), nullable=False, comment="访问URL")
+    size = Column(BigInteger, nullable=False, comment="文件大小（字节）")
+    ref_count = Column(Integer, nullable=False, default=0, comment="引用次数（所有用户的引用之和）")
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="首次上传时间")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), comment="更新时间")
+
+    def __repr__(self):
+        return f"<UploadBlob {self.digest} refs={self.ref_count}>"
+
+
+class UploadRef(Base):
+    """上传文件引用表（每个上传者对每份内容一行，只能删除自己持有的引用）"""
+    __tablename__ = "upload_refs"
+
+    digest = Column(String(64), primary_key=True, comment="内容SHA-256摘要")
+    user_id = Column(Integer, primary_key=True, index=True, comment="上传用户ID")
+    ref_count = Column(Integer, nullable=False, default=0, comment="该用户的引用次数（每次上传+1，每次删除-1）")
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="首次上传时间")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), comment="更新时间")
+
+    def __repr__(self):
+        return f"<UploadRef {self.digest} user={self.user_id} refs={self.ref_count}>"
@@ -73,8 +73,8 @@ class User(Base):
     )
     
     # 时间戳
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="创建时间")
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), comment="更新时间")
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True, comment="创建时间")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True, comment="更新时间")
     last_login_at = Column(DateTime(timezone=True), comment="最后登录时间")
     
     # 关系
@@ -0,0 +1,33 @@
+"""
+钱包流水模型
+"""
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, Numeric, UniqueConstraint
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class WalletTransaction(Base):
+    """钱包余额流水表（只追加，不修改）"""
+    __tablename__ = "wallet_transactions"
+    __table_args__ = (
+        UniqueConstraint("user_id", "idempotency_key", name="uk_user_idempotency_key"),
+    )
+    
+    id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False, index=True, comment="用户ID")
+    
+    # 变动信息
+    amount = Column(Numeric(10, 2), nullable=False, comment="变动金额（正数为入账，负数为扣款）")
+    balance_after = Column(Numeric(10, 2), nullable=False, comment="变动后余额")
+    biz_type = Column(String(20), nullable=False, comment="业务类型: order_pay/recharge/refund/prize/adjust")
+    biz_no = Column(String(64), comment="业务单号（支付单号、充值单号等）")
+    remark = Column(String(200), comment="备注")
+    
+    # 幂等键：客户端重试同一请求时返回原结果
+    idempotency_key = Column(String(64), comment="幂等键")
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="创建时间")
+    
+    def __repr__(self):
+        return f"<WalletTransaction user_id={self.user_id} amount={self.amount}>"
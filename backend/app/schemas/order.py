@@ -1,7 +1,7 @@
 """
 订单相关Schema
 """
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Dict
 from datetime import datetime
 from decimal import Decimal
 from pydantic import BaseModel, Field
@@ -75,6 +75,14 @@ class OrderCalculateResponse(BaseModel):
     discount_amount: Decimal = Field(0, description="优惠金额")
     total_fee: Decimal = Field(..., description="总金额")
     fee_details: List[OrderFeeDetail] = Field([], description="费用明细")
+    
+    # 优惠明细
+    coupon_id: Optional[int] = Field(None, description="使用的用户优惠券ID")
+    coupon_discount: Decimal = Field(0, description="优惠券优惠金额")
+    points_used: int = Field(0, description="使用积分")
+    points_discount: Decimal = Field(0, description="积分抵扣金额")
+    best_coupon_id: Optional[int] = Field(None, description="推荐使用的用户优惠券ID（优惠最多）")
+    available_coupons: List[Dict[str, Any]] = Field([], description="本订单可用的优惠券")
 
 
 # ==================== 订单信息 ====================
@@ -152,8 +160,10 @@ class OrderListItem(BaseModel):
 
 class OrderListResponse(BaseModel):
     """订单列表响应"""
-    total: int = Field(..., description="总数")
+    total: Optional[int] = Field(None, description="总数")
     list: List[OrderListItem] = Field(..., description="订单列表")
+    next_cursor: Optional[str] = Field(None, description="下一页游标")
+    has_more: bool = Field(False, description="是否还有下一页")
 
 
 # ==================== 订单操作 ====================
@@ -220,6 +230,7 @@ class PaymentCreate(BaseModel):
     order_id: int = Field(..., description="订单ID")
     payment_method: str = Field(..., description="支付方式: balance|alipay|wechat")
     payment_password: Optional[str] = Field(None, description="支付密码（余额支付时必填）")
+    idempotency_key: Optional[str] = Field(None, max_length=64, description="幂等键（余额支付重试时返回原结果）")
 
 
 class PaymentInDB(BaseModel):
@@ -8,11 +8,26 @@ from alipay.aop.api.request.AlipayTradePagePayRequest import AlipayTradePagePayR
 from alipay.aop.api.request.AlipayTradeQueryRequest import AlipayTradeQueryRequest
 from alipay.aop.api.request.AlipayTradeCloseRequest import AlipayTradeCloseRequest
 from alipay.aop.api.request.AlipayTradeRefundRequest import AlipayTradeRefundRequest
-from alipay.aop.api.util.SignatureUtils import verify_with_rsa
-from sqlalchemy.orm import Session
-from typing import Dict, Any, Optional
+from alipay.aop.api.constant.CommonConstants import THREAD_LOCAL
+from alipay.aop.api.constant.ParamConstants import P_BIZ_CONTENT, P_METHOD, P_SIGN, P_TIMESTAMP
+from alipay.aop.api.exception.Exception import RequestException
+from alipay.aop.api.util.EncryptUtils import encrypt_content
+from alipay.aop.api.util.SignatureUtils import (
+    get_sign_content,
+    sign_with_rsa,
+    fill_private_key_marker,
+    fill_public_key_marker
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Any, Optional, Callable
 from decimal import Decimal
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+import rsa
 import json
+import base64
+import asyncio
+import threading
 from datetime import datetime
 import logging
 
@@ -22,12 +37,142 @@ from app.models.order import Order, Payment
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=4)
+def _load_private_key(private_key: str) -> rsa.PrivateKey:
+    """解析应用私钥（缓存解析结果，SDK默认每次签名都重新解析PEM）"""
+    return rsa.PrivateKey.load_pkcs1(fill_private_key_marker(private_key), format='PEM')
+
+
+@lru_cache(maxsize=4)
+def _load_public_key(public_key: str) -> rsa.PublicKey:
+    """解析支付宝公钥（缓存解析结果）"""
+    return rsa.PublicKey.load_pkcs1_openssl_pem(fill_public_key_marker(public_key))
+
+
+def _sign_with_rsa2(private_key: str, sign_content: str, charset: str) -> str:
+    """RSA2签名，与SDK的 sign_with_rsa2 结果一致，使用缓存的私钥"""
+    signature = rsa.sign(sign_content.encode(charset), _load_private_key(private_key), 'SHA-256')
+    return str(base64.b64encode(signature), encoding=charset)
+
+
+class CachedKeyAlipayClient(DefaultAlipayClient):
+    """
+    使用缓存私钥签名的支付宝客户端
+
+    SDK在私有方法 __prepare_request_params 中签名，每次都重新解析PEM私钥；子类覆盖这一步，
+    execute/page_execute/sdk_execute 均使用缓存的私钥。只影响本服务创建的客户端，不修改SDK模块；
+    SDK不再有该方法时覆盖不生效，退回SDK自身的签名
+    """
+
+    def __init__(self, alipay_client_config, logger=None):
+        super().__init__(alipay_client_config, logger)
+        self._config = alipay_client_config
+        self._logger = logger
+
+    def _DefaultAlipayClient__prepare_request_params(self, request):
+        """构造公共参数和业务参数并签名（与SDK的实现一致，签名使用缓存的私钥）"""
+        config = self._config
+        THREAD_LOCAL.logger = self._logger
+        params = request.get_params()
+        if P_BIZ_CONTENT in params:
+            if config.encrypt_type and config.encrypt_key:
+                params[P_BIZ_CONTENT] = encrypt_content(
+                    params[P_BIZ_CONTENT], config.encrypt_type, config.encrypt_key, config.charset
+                )
+            elif request.need_encrypt:
+                raise RequestException("接口" + params[P_METHOD] + "必须使用encrypt_type、encrypt_key加密")
+        params[P_TIMESTAMP] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        common_params = self._DefaultAlipayClient__get_common_params(params)
+        sign_content = get_sign_content({**params, **common_params})
+        if not config.skip_sign:
+            try:
+                if config.sign_type == "RSA2":
+                    sign = _sign_with_rsa2(config.app_private_key, sign_content, config.charset)
+                else:
+                    sign = sign_with_rsa(config.app_private_key, sign_content, config.charset)
+            except Exception as e:
+                raise RequestException("[" + THREAD_LOCAL.uuid + "]request sign failed. " + str(e))
+            common_params[P_SIGN] = sign
+        self._DefaultAlipayClient__remove_common_params(params)
+        return common_params, params
+
+
+if not hasattr(DefaultAlipayClient, "_DefaultAlipayClient__prepare_request_params"):
+    logger.warning("支付宝SDK结构已变化，私钥缓存签名未生效，使用SDK自身的签名")
+
+
+class AlipayGatewayError(Exception):
+    """支付宝网关调用失败（繁忙或超时）"""
+    pass
+
+
+class AlipayGateway:
+    """
+    支付宝网关执行器
+
+    SDK的请求和RSA签名都是同步阻塞的，统一放到专用线程池执行，不阻塞事件循环：
+    - 线程池大小 ALIPAY_EXECUTOR_WORKERS，排队+执行中的调用数不超过 ALIPAY_EXECUTOR_MAX_PENDING，
+      超出时立即失败，避免支付宝变慢时请求无限堆积
+    - 每次调用等待不超过 ALIPAY_CALL_TIMEOUT_SECONDS；退款等有副作用的调用不设等待超时，
+      否则调用方已返回失败而线程中的请求仍可能在支付宝侧成功，结果无法记录
+    """
+
+    def __init__(self):
+        self.timeout = settings.ALIPAY_CALL_TIMEOUT_SECONDS
+        self.max_pending = settings.ALIPAY_EXECUTOR_MAX_PENDING
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.ALIPAY_EXECUTOR_WORKERS,
+            thread_name_prefix="alipay"
+        )
+        # 线程中的调用真正结束（而不是调用方超时）时才释放名额
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+
+    async def call(
+        self,
+        fn: Callable,
+        *args,
+        timeout: Optional[float] = None,
+        wait_forever: bool = False
+    ) -> Any:
+        """
+        在线程池中执行SDK调用
+
+        Args:
+            timeout: 等待超时（秒），默认 ALIPAY_CALL_TIMEOUT_SECONDS
+            wait_forever: 等待调用真正结束（仍受SDK自身的网络超时限制），用于退款等有副作用的调用
+
+        Raises:
+            AlipayGatewayError: 排队已满或调用超时
+        """
+        if not self._slots.acquire(blocking=False):
+            raise AlipayGatewayError("支付宝服务繁忙，请稍后重试")
+
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+
+        if wait_forever:
+            return await asyncio.wrap_future(future)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            raise AlipayGatewayError("支付宝接口调用超时")
+
+    def shutdown(self):
+        """关闭线程池（不等待进行中的调用）"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
 class AlipayService:
     """支付宝支付服务"""
     
     def __init__(self):
         """初始化支付宝客户端"""
         self.alipay_client = None
+        self.gateway = AlipayGateway()
         if settings.ALIPAY_APP_ID and settings.ALIPAY_PRIVATE_KEY:
             self._init_client()
         else:
@@ -43,15 +188,19 @@ class AlipayService:
             alipay_config.app_private_key = settings.ALIPAY_PRIVATE_KEY
             alipay_config.alipay_public_key = settings.ALIPAY_PUBLIC_KEY
             alipay_config.sign_type = "RSA2"
+            alipay_config.timeout = settings.ALIPAY_CALL_TIMEOUT_SECONDS
             
-            self.alipay_client = DefaultAlipayClient(alipay_config)
+            # 启动时解析密钥，配置错误尽早暴露
+            _load_private_key(settings.ALIPAY_PRIVATE_KEY)
+            
+            self.alipay_client = CachedKeyAlipayClient(alipay_config)
             logger.info("支付宝客户端初始化成功")
         except Exception as e:
             logger.error(f"支付宝客户端初始化失败: {str(e)}")
 
     async def create_h5_payment(
         self,
-        db: Session,
+        db: AsyncSession,
         order_id: int,
         user_id: int,
         return_url: str = None,
@@ -74,7 +223,7 @@ class AlipayService:
             raise ValueError("支付宝服务未配置")
         
         # 获取订单信息
-        order = db.query(Order).filter(Order.id == order_id).first()
+        order = await db.get(Order, order_id)
         if not order:
             raise ValueError("订单不存在")
             
@@ -103,8 +252,8 @@ class AlipayService:
         )
         
         db.add(payment)
-        db.commit()
-        db.refresh(payment)
+        await db.commit()
+        await db.refresh(payment)
         
         # 构建网页支付请求
         request = AlipayTradePagePayRequest()
@@ -128,7 +277,7 @@ class AlipayService:
             request.notify_url = f"https://your-domain.com/api/v1/payments/{payment.id}/alipay/notify"
         
         # 执行请求，获取支付表单HTML
-        response = self.alipay_client.page_execute(request, "GET")
+        response = await self.gateway.call(self.alipay_client.page_execute, request, "GET")
         
         logger.info(f"创建支付宝支付：订单ID={order_id}, 支付ID={payment.id}")
         
@@ -136,7 +285,7 @@ class AlipayService:
 
     async def create_app_payment(
         self,
-        db: Session,
+        db: AsyncSession,
         order_id: int,
         user_id: int,
         notify_url: str = None
@@ -157,7 +306,7 @@ class AlipayService:
             raise ValueError("支付宝服务未配置")
         
         # 获取订单信息
-        order = db.query(Order).filter(Order.id == order_id).first()
+        order = await db.get(Order, order_id)
         if not order:
             raise ValueError("订单不存在")
             
@@ -186,8 +335,8 @@ class AlipayService:
         )
         
         db.add(payment)
-        db.commit()
-        db.refresh(payment)
+        await db.commit()
+        await db.refresh(payment)
         
         # 构建App支付请求
         request = AlipayTradeAppPayRequest()
@@ -208,7 +357,7 @@ class AlipayService:
             request.notify_url = f"https://your-domain.com/api/v1/payments/{payment.id}/alipay/notify"
         
         # 执行请求
-        order_string = self.alipay_client.sdk_execute(request)
+        order_string = await self.gateway.call(self.alipay_client.sdk_execute, request)
         
         logger.info(f"创建支付宝App支付：订单ID={order_id}, 支付ID={payment.id}")
         
@@ -241,12 +390,15 @@ class AlipayService:
             verify_data = {k: v for k, v in notify_data.items() 
                           if k not in ["sign", "sign_type"]}
             
-            # 验证签名
-            is_valid = verify_with_rsa(
-                settings.ALIPAY_PUBLIC_KEY, 
-                verify_data, 
-                sign
-            )
+            # 验证签名（使用缓存的支付宝公钥）
+            try:
+                is_valid = bool(rsa.verify(
+                    get_sign_content(verify_data).encode("utf-8"),
+                    base64.b64decode(sign),
+                    _load_public_key(settings.ALIPAY_PUBLIC_KEY)
+                ))
+            except rsa.VerificationError:
+                is_valid = False
             
             if not is_valid:
                 logger.warning("支付宝回调签名验证失败")
@@ -259,7 +411,7 @@ class AlipayService:
 
     async def handle_notify(
         self,
-        db: Session,
+        db: AsyncSession,
         payment_id: int,
         notify_data: Dict[str, Any]
     ) -> bool:
@@ -280,7 +432,7 @@ class AlipayService:
                 logger.error("支付宝通知签名验证失败")
                 return False
                 
-            payment = db.query(Payment).filter(Payment.id == payment_id).first()
+            payment = await db.get(Payment, payment_id)
             if not payment:
                 logger.error(f"支付记录不存在: {payment_id}")
                 return False
@@ -300,19 +452,19 @@ class AlipayService:
                 payment.paid_at = datetime.utcnow()
                 
                 # 更新订单状态
-                order = db.query(Order).filter(Order.id == payment.order_id).first()
+                order = await db.get(Order, payment.order_id)
                 if order:
                     order.status = "paid"
                     order.paid_at = datetime.utcnow()
                 
-                db.commit()
+                await db.commit()
                 logger.info(f"支付成功：支付ID={payment_id}, 订单ID={payment.order_id}")
                 return True
                 
             elif trade_status == "TRADE_CLOSED":
                 # 交易关闭
                 payment.status = "failed"
-                db.commit()
+                await db.commit()
                 logger.info(f"交易关闭：支付ID={payment_id}")
                 return True
                 
@@ -320,7 +472,7 @@ class AlipayService:
             
         except Exception as e:
             logger.error(f"处理支付宝通知失败: {str(e)}")
-            db.rollback()
+            await db.rollback()
             return False
 
     async def query_payment(self, out_trade_no: str) -> Dict[str, Any]:
@@ -341,7 +493,7 @@ class AlipayService:
             biz_content = {"out_trade_no": out_trade_no}
             request.biz_content = biz_content
             
-            response = self.alipay_client.execute(request)
+            response = await self.gateway.call(self.alipay_client.execute, request)
             return json.loads(response) if response else {}
             
         except Exception as e:
@@ -366,7 +518,7 @@ class AlipayService:
             biz_content = {"out_trade_no": out_trade_no}
             request.biz_content = biz_content
             
-            response = self.alipay_client.execute(request)
+            response = await self.gateway.call(self.alipay_client.execute, request)
             result = json.loads(response) if response else {}
             return result.get("code") == "10000"
             
@@ -376,7 +528,7 @@ class AlipayService:
 
     async def refund(
         self,
-        db: Session,
+        db: AsyncSession,
         payment_id: int,
         refund_amount: Decimal = None,
         refund_reason: str = "用户申请退款"
@@ -397,7 +549,7 @@ class AlipayService:
             raise ValueError("支付宝服务未配置")
             
         try:
-            payment = db.query(Payment).filter(Payment.id == payment_id).first()
+            payment = await db.get(Payment, payment_id)
             if not payment:
                 raise ValueError("支付记录不存在")
                 
@@ -421,7 +573,8 @@ class AlipayService:
             }
             request.biz_content = biz_content
             
-            response = self.alipay_client.execute(request)
+            # 不设等待超时：超时返回后退款仍可能在支付宝侧成功，而退款记录不会写入
+            response = await self.gateway.call(self.alipay_client.execute, request, wait_forever=True)
             result = json.loads(response) if response else {}
             
             if result.get("code") == "10000":
@@ -436,7 +589,7 @@ class AlipayService:
                 )
                 
                 db.add(refund_payment)
-                db.commit()
+                await db.commit()
                 
                 logger.info(f"退款成功：支付ID={payment_id}, 退款金额={refund_amount}")
                 
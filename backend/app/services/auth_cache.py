@@ -0,0 +1,195 @@
+"""
+认证缓存服务
+缓存JWT解码结果和用户快照，已登录请求的身份校验不再查询数据库
+"""
+import asyncio
+import time
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, inspect, select, func, text
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.security import decode_access_token
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# 会话中待提交后失效的用户ID（ORM 修改和 update(User) 都先登记，提交后才失效）
+_PENDING_INVALIDATION_KEY = "auth_cache_pending_users"
+
+# 快照包含的用户字段
+USER_FIELDS = tuple(attr.key for attr in inspect(User).column_attrs)
+
+
+class AuthCache:
+    """
+    认证缓存
+
+    - 令牌缓存：token -> payload，LRU淘汰，按令牌自身的过期时间失效
+    - 用户快照：user_id -> 用户字段，短TTL，本进程提交用户变更后立即失效
+    - 其他进程的变更：后台任务每 AUTH_USER_CHANGE_POLL_SECONDS 秒按 users.updated_at
+      查询一次最近变更的用户并使其快照失效，请求路径上不做任何网络IO
+    """
+
+    def __init__(self):
+        self.user_ttl = settings.AUTH_USER_CACHE_TTL_SECONDS
+        self.poll_interval = settings.AUTH_USER_CHANGE_POLL_SECONDS
+        # 每次检查回看的时间窗口：覆盖快照TTL，提交较晚的事务也能被看到
+        self.poll_window = self.user_ttl + max(int(self.poll_interval), 1) * 2
+        # 窗口内已处理过的 user_id -> updated_at，同一次变更只失效一次
+        self._seen: Dict[int, datetime] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._tokens = TTLCache(
+            ttl=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+            max_entries=settings.AUTH_TOKEN_CACHE_MAX_ENTRIES,
+            name="auth_token"
+        )
+        self._users = TTLCache(
+            ttl=self.user_ttl,
+            max_entries=settings.AUTH_USER_CACHE_MAX_ENTRIES,
+            name="auth_user"
+        )
+
+    def decode_token(self, token: str) -> Optional[dict]:
+        """解码JWT令牌（带缓存），无效令牌返回None"""
+        payload = self._tokens.get(token)
+        if payload is not None:
+            if payload.get("exp", 0) > time.time():
+                return payload
+            self._tokens.delete(token)
+
+        payload = decode_access_token(token)
+        if payload:
+            self._tokens.set(token, payload, ttl=max(payload.get("exp", 0) - time.time(), 0))
+        return payload
+
+    def get_user(self, user_id: int) -> Optional[User]:
+        """
+        获取用户快照
+
+        Returns:
+            User: 未绑定会话的用户对象（每次返回新对象，修改不会影响缓存），未命中返回None
+        """
+        item = self._users.get(user_id)
+        if item is None:
+            return None
+
+        return User(**item)
+
+    def set_user(self, user: User):
+        """写入用户快照"""
+        values = {field: getattr(user, field) for field in USER_FIELDS}
+        self._users.set(user.id, values)
+
+    def invalidate_user(self, user_id: int):
+        """用户信息变更（已提交）后使本进程的快照失效"""
+        self._users.delete(user_id)
+
+    def invalidate_on_commit(self, session: Session, user_id: int):
+        """
+        事务提交后使用户快照失效
+
+        用于 update(User) 等不经过ORM对象的写入；异步会话传入 db.sync_session
+        """
+        session.info.setdefault(_PENDING_INVALIDATION_KEY, set()).add(user_id)
+
+    def poll_changes(self) -> int:
+        """
+        使最近有变更的用户快照失效（同步，在线程池中执行）
+
+        update(User) 和 ORM 修改都会刷新 updated_at（列的 onupdate），
+        以数据库时钟回看 poll_window 秒，处理 updated_at 与上次看到的不同的行；
+        updated_at 只精确到秒，同一秒内的再次变更看不出差别，最近两个检查间隔内的行总是失效
+
+        Returns:
+            int: 本次失效的用户数量
+        """
+        db = SessionLocal()
+        try:
+            db_now = db.execute(select(func.now())).scalar()
+            since = func.now() - text(f"INTERVAL {self.poll_window} SECOND")
+            rows = db.execute(
+                select(User.id, User.updated_at).where(User.updated_at >= since)
+            ).all()
+        finally:
+            db.close()
+
+        fresh_since = db_now - timedelta(seconds=max(self.poll_interval, 1) * 2)
+        changed = 0
+        recent = {}
+        for user_id, updated_at in rows:
+            recent[user_id] = updated_at
+            if self._seen.get(user_id) != updated_at or updated_at >= fresh_since:
+                self._users.delete(user_id)
+                changed += 1
+        # 只保留窗口内的行，滑出窗口的变更不会再被查到
+        self._seen = recent
+        return changed
+
+    async def _run(self):
+        """后台定时检查任务"""
+        loop = asyncio.get_event_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.poll_changes)
+            except Exception as e:
+                logger.warning(f"检查用户变更失败: {str(e)}")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        """启动后台检查任务（在应用启动时调用）"""
+        if self._task is None:
+            self._task = asyncio.get_event_loop().create_task(self._run())
+
+    async def stop(self):
+        """停止后台检查任务（在应用关闭时调用）"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存命中统计"""
+        return {
+            "tokens": self._tokens.stats(),
+            "users": self._users.stats(),
+            "watched_changes": len(self._seen)
+        }
+
+
+# 创建全局实例
+auth_cache = AuthCache()
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_users(session, flush_context):
+    """
+    任何会话写入用户表后（含异步会话）登记对应用户
+
+    flush 时事务尚未提交，此时失效会让并发请求从数据库读回旧值重新缓存，
+    因此只登记，提交后再失效
+    """
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User) and obj.id is not None:
+            auth_cache.invalidate_on_commit(session, obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    """提交后使登记的用户快照失效"""
+    for user_id in session.info.pop(_PENDING_INVALIDATION_KEY, ()):
+        auth_cache.invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_users(session):
+    """回滚后用户数据未变化，无需失效"""
+    session.info.pop(_PENDING_INVALIDATION_KEY, None)
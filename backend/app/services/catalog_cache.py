@@ -0,0 +1,68 @@
+"""
+项目目录缓存服务
+缓存公开的项目列表和分类数据，后台修改项目/分类时主动失效
+"""
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogCache:
+    """
+    项目目录缓存
+
+    - 项目列表按 (category_id, keyword, page, page_size) 缓存
+    - 分类列表单独缓存
+    - 缓存为进程内缓存，多进程部署时其他进程依赖TTL过期
+    """
+
+    def __init__(self):
+        self._cache = TTLCache(
+            ttl=settings.CATALOG_CACHE_TTL_SECONDS,
+            max_entries=settings.CATALOG_CACHE_MAX_ENTRIES,
+            name="catalog"
+        )
+
+    @staticmethod
+    def project_list_key(
+        category_id: Optional[int],
+        keyword: Optional[str],
+        page: int,
+        page_size: int
+    ) -> tuple:
+        """项目列表缓存键"""
+        keyword = (keyword or "").strip() or None
+        return ("projects", category_id or None, keyword, page, page_size)
+
+    async def get_project_list(
+        self,
+        category_id: Optional[int],
+        keyword: Optional[str],
+        page: int,
+        page_size: int,
+        loader: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """获取项目列表，未命中时调用 loader 从数据库加载"""
+        key = self.project_list_key(category_id, keyword, page, page_size)
+        return await self._cache.get_or_set_async(key, loader)
+
+    async def get_categories(self, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """获取分类列表，未命中时调用 loader 从数据库加载"""
+        return await self._cache.get_or_set_async(("categories",), loader)
+
+    def invalidate(self):
+        """清空目录缓存（后台修改项目或分类后调用）"""
+        self._cache.clear()
+        logger.info("项目目录缓存已清空")
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存命中统计"""
+        return self._cache.stats()
+
+
+# 创建全局实例
+catalog_cache = CatalogCache()
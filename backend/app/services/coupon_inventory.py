@@ -0,0 +1,125 @@
+"""
+优惠券库存服务
+领券时通过单条条件 UPDATE 扣减库存，通过领取记录的唯一索引保证同一用户同时只持有一张未使用的券，高并发下不会超发
+"""
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import exists, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.coupon import Coupon, UserCoupon, CouponClaim, CouponStatus, UserCouponStatus
+
+logger = logging.getLogger(__name__)
+
+
+class CouponClaimError(Exception):
+    """领券失败（已领取或已领完）"""
+    pass
+
+
+class CouponInventory:
+    """
+    优惠券库存
+
+    领取规则与原实现一致：用户持有该券未使用的记录时不能再领，已使用或已过期后可以再次领取。
+    一次领取在同一个事务中完成：
+    1. 写入用户优惠券
+    2. 写入领取记录（每个用户每种券一行，指向当前持有的用户优惠券）；
+       唯一索引 (coupon_id, user_id) 冲突时，只有原记录指向的券已不是未使用状态才改为指向新券
+       （条件 UPDATE，并发领取只有一个成功）
+    3. 条件 UPDATE 扣减库存，影响行数为0说明已领完
+
+    库存扣减放在最后，持有优惠券行锁的时间只有 UPDATE 到提交之间
+    """
+
+    @staticmethod
+    def discount_value(coupon: Coupon):
+        """用户优惠券记录的优惠值"""
+        if coupon.type.value == "discount":
+            return coupon.discount_rate
+        elif coupon.type.value == "cash":
+            return coupon.cash_amount
+        elif coupon.type.value == "full_reduction":
+            return coupon.reduction_amount
+        return None
+
+    @staticmethod
+    def _hold(db: Session, coupon_id: int, user_id: int, user_coupon_id: int) -> bool:
+        """登记用户持有的领券中心优惠券，用户仍有未使用的该券时返回 False"""
+        try:
+            with db.begin_nested():
+                db.add(CouponClaim(coupon_id=coupon_id, user_id=user_id, user_coupon_id=user_coupon_id))
+                db.flush()
+            return True
+        except IntegrityError:
+            pass
+
+        # 已有领取记录：原券已使用或已过期时改为指向新券（UPDATE 中的子查询读取最新提交的数据）
+        still_unused = exists().where(
+            UserCoupon.id == CouponClaim.user_coupon_id,
+            UserCoupon.status == UserCouponStatus.UNUSED
+        )
+        result = db.execute(
+            update(CouponClaim).where(
+                CouponClaim.coupon_id == coupon_id,
+                CouponClaim.user_id == user_id,
+                ~still_unused
+            ).values(
+                user_coupon_id=user_coupon_id, created_at=datetime.now()
+            ).execution_options(synchronize_session=False)
+        )
+        return result.rowcount > 0
+
+    def claim(self, db: Session, coupon: Coupon, user_id: int) -> UserCoupon:
+        """
+        领取优惠券（调用方需先校验优惠券状态和有效时间）
+
+        Raises:
+            CouponClaimError: 仍持有未使用的该券或库存不足，事务已回滚
+        """
+        # 与原实现相同的检查：持有该券未使用的记录（包括抽奖发放的）时不能再领
+        holding = db.query(UserCoupon.id).filter(
+            UserCoupon.user_id == user_id,
+            UserCoupon.coupon_id == coupon.id,
+            UserCoupon.status == UserCouponStatus.UNUSED
+        ).first()
+        if holding:
+            raise CouponClaimError("您已领取过该优惠券")
+
+        user_coupon = UserCoupon(
+            user_id=user_id,
+            coupon_id=coupon.id,
+            coupon_name=coupon.name,
+            coupon_type=coupon.type.value,
+            discount_value=self.discount_value(coupon),
+            status=UserCouponStatus.UNUSED,
+            expire_at=datetime.now() + timedelta(days=coupon.valid_days)
+        )
+        db.add(user_coupon)
+        db.flush()
+
+        if not self._hold(db, coupon.id, user_id, user_coupon.id):
+            db.rollback()
+            raise CouponClaimError("您已领取过该优惠券")
+
+        taken = db.execute(
+            update(Coupon).where(
+                Coupon.id == coupon.id,
+                Coupon.status == CouponStatus.ACTIVE,
+                or_(Coupon.total_quantity == 0, Coupon.received_quantity < Coupon.total_quantity)
+            ).values(
+                received_quantity=Coupon.received_quantity + 1
+            ).execution_options(synchronize_session=False)
+        )
+        if taken.rowcount == 0:
+            db.rollback()
+            raise CouponClaimError("优惠券已被领完")
+
+        db.commit()
+        return user_coupon
+
+
+# 创建全局实例
+coupon_inventory = CouponInventory()
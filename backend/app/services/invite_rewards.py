@@ -0,0 +1,124 @@
+"""
+邀请奖励服务
+邀请统计和可提现金额通过 GROUP BY 聚合计算；提现申请锁定用户行，并发申请不会超过可提现金额
+"""
+import logging
+from decimal import Decimal
+from typing import Any, Dict
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+from app.models.invite import InviteRecord, WithdrawRecord, InviteStatus, WithdrawStatus
+
+logger = logging.getLogger(__name__)
+
+# 已提现（审核通过或已打款）
+WITHDRAWN_STATUSES = (WithdrawStatus.APPROVED, WithdrawStatus.COMPLETED)
+
+
+class WithdrawError(Exception):
+    """提现申请失败"""
+    pass
+
+
+class InviteRewardService:
+    """
+    邀请奖励
+
+    - 邀请数和奖励金额：一条 GROUP BY status 查询
+    - 提现金额：一条 GROUP BY status 查询；待审核的提现申请占用可提现金额
+    - 提现申请：SELECT ... FOR UPDATE 锁定用户行后，用加锁读（LOCK IN SHARE MODE）重新计算可提现金额，
+      同一用户的申请串行执行；加锁读总是读取最新提交的数据，不受事务中此前普通读建立的快照影响
+    """
+
+    def summary(self, db: Session, user_id: int, locking: bool = False) -> Dict[str, Any]:
+        """
+        邀请数、奖励金额、已提现和可提现金额
+
+        Args:
+            locking: 使用加锁读（提现申请时使用），读取最新提交的数据
+        """
+        invite_query = db.query(
+            InviteRecord.status,
+            func.count(InviteRecord.id),
+            func.sum(InviteRecord.reward_amount)
+        ).filter(
+            InviteRecord.inviter_id == user_id
+        ).group_by(InviteRecord.status)
+        withdraw_query = db.query(
+            WithdrawRecord.status,
+            func.sum(WithdrawRecord.amount)
+        ).filter(
+            WithdrawRecord.user_id == user_id
+        ).group_by(WithdrawRecord.status)
+        if locking:
+            invite_query = invite_query.with_for_update(read=True)
+            withdraw_query = withdraw_query.with_for_update(read=True)
+
+        invites = {
+            status: (count, amount or Decimal("0"))
+            for status, count, amount in invite_query.all()
+        }
+        withdraws = {
+            status: amount or Decimal("0")
+            for status, amount in withdraw_query.all()
+        }
+
+        total_reward = invites.get(InviteStatus.COMPLETED, (0, Decimal("0")))[1]
+        withdrawn = sum((withdraws.get(s, Decimal("0")) for s in WITHDRAWN_STATUSES), Decimal("0"))
+        pending_withdraw = withdraws.get(WithdrawStatus.PENDING, Decimal("0"))
+
+        return {
+            "total_invites": sum(count for count, _ in invites.values()),
+            "completed_invites": invites.get(InviteStatus.COMPLETED, (0, None))[0],
+            "pending_invites": invites.get(InviteStatus.PENDING, (0, None))[0],
+            "total_reward": total_reward,
+            "withdrawn": withdrawn,
+            "pending_withdraw": pending_withdraw,
+            "withdrawable": total_reward - withdrawn - pending_withdraw
+        }
+
+    def apply_withdraw(
+        self,
+        db: Session,
+        user_id: int,
+        amount: Decimal,
+        account_type: str,
+        account_name: str,
+        account_number: str
+    ) -> WithdrawRecord:
+        """
+        创建提现申请并提交
+
+        Raises:
+            WithdrawError: 可提现金额不足（事务已回滚）
+        """
+        # 锁定用户行，同一用户的并发申请在此排队
+        db.query(User.id).filter(User.id == user_id).with_for_update().scalar()
+
+        # 调用方可能已在本事务中做过普通读（REPEATABLE READ 快照已建立），
+        # 这里必须用加锁读才能看到排队期间其他申请已提交的提现记录
+        available = self.summary(db, user_id, locking=True)["withdrawable"]
+        if amount > available:
+            db.rollback()
+            raise WithdrawError(f"可提现金额不足，当前可提现：{available}元")
+
+        withdraw = WithdrawRecord(
+            user_id=user_id,
+            amount=amount,
+            withdraw_type="invite_reward",
+            account_type=account_type,
+            account_name=account_name,
+            account_number=account_number,
+            status=WithdrawStatus.PENDING
+        )
+        db.add(withdraw)
+        db.commit()
+        db.refresh(withdraw)
+        return withdraw
+
+
+# 创建全局实例
+invite_reward_service = InviteRewardService()
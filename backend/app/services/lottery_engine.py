@@ -0,0 +1,290 @@
+"""
+抽奖引擎
+按奖品配置预先构建 Walker 别名表，每次抽奖 O(1) 采样；库存通过条件 UPDATE 原子扣减
+"""
+import time
+import random
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.lottery import LotteryPrize, LotteryRecord, LotteryChance, PrizeType, PrizeStatus
+
+logger = logging.getLogger(__name__)
+
+# 概率为万分比，总和不足一万的部分归入最后一个奖品（通常是谢谢参与）
+PROBABILITY_BASE = 10000
+
+# 抽奖机会被并发占用时的重试次数
+CHANCE_CLAIM_RETRIES = 3
+
+_TAKE_TOTAL_SQL = text(
+    "UPDATE lottery_prizes SET issued_count = issued_count + 1 "
+    "WHERE id = :prize_id AND (total_limit = 0 OR issued_count < total_limit)"
+)
+_INIT_DAILY_SQL = text(
+    "INSERT IGNORE INTO lottery_prize_daily_stock (prize_id, stat_date, issued_count) "
+    "VALUES (:prize_id, :stat_date, 0)"
+)
+_TAKE_DAILY_SQL = text(
+    "UPDATE lottery_prize_daily_stock SET issued_count = issued_count + 1 "
+    "WHERE prize_id = :prize_id AND stat_date = :stat_date AND issued_count < :daily_limit"
+)
+
+
+class PrizeSnapshot:
+    """奖品配置快照（不绑定数据库会话）"""
+
+    __slots__ = ("id", "name", "prize_type", "icon", "value", "probability", "daily_limit", "total_limit")
+
+    def __init__(self, prize: LotteryPrize):
+        self.id = prize.id
+        self.name = prize.name
+        self.prize_type = prize.prize_type
+        self.icon = prize.icon
+        self.value = prize.value
+        self.probability = prize.probability or 0
+        self.daily_limit = prize.daily_limit or 0
+        self.total_limit = prize.total_limit or 0
+
+    def version(self) -> tuple:
+        """参与别名表构建的配置字段"""
+        return (self.id, self.probability, self.daily_limit, self.total_limit, self.prize_type)
+
+
+class AliasTable:
+    """
+    Walker 别名表（Vose 构建算法）
+
+    构建 O(n)，每次采样只需一次均匀随机下标和一次比较
+    """
+
+    def __init__(self, weights: List[float]):
+        n = len(weights)
+        total = float(sum(weights))
+        scaled = [w * n / total for w in weights]
+        self.prob = [0.0] * n
+        self.alias = [0] * n
+
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+
+        # 浮点误差导致的剩余项概率视为1
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def sample(self) -> int:
+        i = random.randrange(len(self.prob))
+        return i if random.random() < self.prob[i] else self.alias[i]
+
+
+class LotteryEngine:
+    """
+    抽奖引擎
+
+    - 奖品配置每 LOTTERY_PRIZE_REFRESH_SECONDS 秒读取一次，配置变化时重建别名表
+    - 抽中有限量的奖品时，总限量和每日限量都通过条件 UPDATE 扣减，扣减失败改为谢谢参与；
+      已抽完的奖品仍按原概率留在别名表中，其概率不会转移给其他奖品（与原实现一致）
+    - 抽奖机会的占用、库存扣减、中奖记录写入在同一个事务中，只提交一次
+    """
+
+    def __init__(self):
+        self.refresh_interval = settings.LOTTERY_PRIZE_REFRESH_SECONDS
+        self._prizes: List[PrizeSnapshot] = []
+        self._table: Optional[AliasTable] = None
+        self._empty_prize: Optional[PrizeSnapshot] = None
+        self._version: Optional[tuple] = None
+        self._loaded_at: Optional[float] = None
+        # 当日已抽完/总量已抽完的奖品（只用于跳过无效的扣减，以数据库为准；总量集合每次重新加载配置时清空）
+        self._daily_exhausted: Tuple[Optional[date], set] = (None, set())
+        self._total_exhausted: set = set()
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """奖品配置修改后调用，下一次抽奖时重新加载"""
+        self._loaded_at = None
+
+    def _load(self, db: Session):
+        """读取奖品配置，版本变化时重建别名表"""
+        rows = db.query(LotteryPrize).filter(
+            LotteryPrize.is_active == True
+        ).order_by(LotteryPrize.sort_order, LotteryPrize.id).all()
+
+        prizes = [PrizeSnapshot(row) for row in rows]
+        total_exhausted = {
+            row.id for row in rows if row.total_limit and (row.issued_count or 0) >= row.total_limit
+        }
+        empty_prize = next((PrizeSnapshot(row) for row in rows if row.prize_type == PrizeType.EMPTY), None)
+        version = tuple(p.version() for p in prizes)
+
+        with self._lock:
+            self._loaded_at = time.monotonic()
+            self._empty_prize = empty_prize
+            self._total_exhausted = total_exhausted
+            if version == self._version:
+                return
+            self._version = version
+            self._prizes = prizes
+            self._table = self._build_table(prizes)
+
+        logger.info(f"抽奖别名表已重建: {len(prizes)} 个奖品")
+
+    def _build_table(self, prizes: List[PrizeSnapshot]) -> Optional[AliasTable]:
+        """
+        按万分比概率构建别名表
+
+        与原累积概率算法一致：累计超过一万的部分无效，不足一万的部分归入最后一个奖品
+        """
+        if not prizes or sum(p.probability for p in prizes) <= 0:
+            return None
+
+        weights = []
+        cumulative = 0
+        for prize in prizes:
+            start = min(cumulative, PROBABILITY_BASE)
+            cumulative += max(prize.probability, 0)
+            weights.append(min(cumulative, PROBABILITY_BASE) - start)
+        weights[-1] += PROBABILITY_BASE - min(cumulative, PROBABILITY_BASE)
+        return AliasTable(weights)
+
+    def _ensure_loaded(self, db: Session):
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > self.refresh_interval:
+            self._load(db)
+
+    def pick(self, db: Session) -> PrizeSnapshot:
+        """按概率选出奖品（不扣减库存）"""
+        self._ensure_loaded(db)
+        with self._lock:
+            prizes, table = self._prizes, self._table
+        if not prizes:
+            raise ValueError("暂无可抽取的奖品")
+        if table is None:
+            raise ValueError("奖品概率配置错误")
+        return prizes[table.sample()]
+
+    def _is_daily_exhausted(self, prize_id: int, today: date) -> bool:
+        day, exhausted = self._daily_exhausted
+        return day == today and prize_id in exhausted
+
+    def _mark_daily_exhausted(self, prize_id: int, today: date):
+        with self._lock:
+            day, exhausted = self._daily_exhausted
+            if day != today:
+                self._daily_exhausted = (today, {prize_id})
+            else:
+                exhausted.add(prize_id)
+
+    def _take_stock(self, db: Session, prize: PrizeSnapshot, today: date) -> bool:
+        """
+        原子扣减库存
+
+        在保存点中依次扣减每日限量和总限量，任一失败回滚保存点；不限量的谢谢参与不计数，避免热点行锁
+        """
+        if prize.prize_type == PrizeType.EMPTY and not prize.total_limit and not prize.daily_limit:
+            return True
+        if prize.daily_limit and self._is_daily_exhausted(prize.id, today):
+            return False
+        if prize.total_limit and prize.id in self._total_exhausted:
+            return False
+
+        savepoint = db.begin_nested()
+        try:
+            if prize.daily_limit:
+                params = {"prize_id": prize.id, "stat_date": today, "daily_limit": prize.daily_limit}
+                db.execute(_INIT_DAILY_SQL, params)
+                if db.execute(_TAKE_DAILY_SQL, params).rowcount == 0:
+                    savepoint.rollback()
+                    self._mark_daily_exhausted(prize.id, today)
+                    return False
+
+            if db.execute(_TAKE_TOTAL_SQL, {"prize_id": prize.id}).rowcount == 0:
+                savepoint.rollback()
+                # 总量已抽完：奖品仍留在别名表中，之后抽中时直接改为谢谢参与
+                with self._lock:
+                    self._total_exhausted.add(prize.id)
+                return False
+
+            savepoint.commit()
+            return True
+        except Exception:
+            savepoint.rollback()
+            raise
+
+    def _claim_chance(self, db: Session, user_id: int, now: datetime) -> int:
+        """占用一次抽奖机会（条件 UPDATE，防止并发请求重复使用同一次机会）"""
+        for _ in range(CHANCE_CLAIM_RETRIES):
+            chance_id = db.query(LotteryChance.id).filter(
+                LotteryChance.user_id == user_id,
+                LotteryChance.is_used == False,
+                (LotteryChance.expire_at == None) | (LotteryChance.expire_at > now)
+            ).order_by(LotteryChance.id).limit(1).scalar()
+            if chance_id is None:
+                break
+
+            claimed = db.query(LotteryChance).filter(
+                LotteryChance.id == chance_id,
+                LotteryChance.is_used == False
+            ).update({"is_used": True, "used_at": now}, synchronize_session=False)
+            if claimed:
+                return chance_id
+
+        raise ValueError("暂无抽奖次数")
+
+    def draw(self, db: Session, user_id: int) -> Tuple[LotteryRecord, PrizeSnapshot]:
+        """
+        抽奖一次
+
+        Returns:
+            (中奖记录, 奖品快照)
+
+        Raises:
+            ValueError: 无抽奖次数或奖品配置错误（调用方回滚事务）
+        """
+        now = datetime.utcnow()
+        today = date.today()
+
+        chance_id = self._claim_chance(db, user_id, now)
+
+        prize = self.pick(db)
+        if not self._take_stock(db, prize, today):
+            # 库存不足，改为谢谢参与
+            empty_prize = self._empty_prize
+            if empty_prize is None or not self._take_stock(db, empty_prize, today):
+                raise ValueError("奖品已抽完")
+            prize = empty_prize
+
+        record = LotteryRecord(
+            user_id=user_id,
+            prize_id=prize.id,
+            prize_name=prize.name,
+            prize_type=prize.prize_type.value if prize.prize_type else None,
+            prize_value=prize.value,
+            prize_icon=prize.icon,
+            status=PrizeStatus.UNCLAIMED if prize.prize_type != PrizeType.EMPTY else PrizeStatus.CLAIMED,
+            expire_at=now + timedelta(days=7)  # 7天内领取
+        )
+        db.add(record)
+        db.flush()
+
+        db.query(LotteryChance).filter(LotteryChance.id == chance_id).update(
+            {"record_id": record.id}, synchronize_session=False
+        )
+        db.commit()
+
+        return record, prize
+
+
+# 创建全局实例
+lottery_engine = LotteryEngine()
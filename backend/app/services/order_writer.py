@@ -0,0 +1,124 @@
+"""
+订单写入
+下单时订单主表、样品、费用明细和状态记录用批量 INSERT 写入，
+不经过 ORM 的逐行插入和提交后的 refresh，往返次数与样品数量无关
+"""
+import logging
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.order import Order, OrderSample, OrderFee, OrderStatusHistory
+
+logger = logging.getLogger(__name__)
+
+# 样品表批量写入时每条 INSERT 的最大行数
+SAMPLE_BATCH_SIZE = 500
+
+_SAMPLE_FIELDS = (
+    "sample_name", "sample_type", "sample_desc", "quantity",
+    "photos", "test_params", "special_requirements"
+)
+
+
+class OrderWriter:
+    """
+    订单写入器
+
+    - 订单主表一条 INSERT，主键直接取自本条语句的返回（不需要 flush + refresh）
+    - 样品、费用明细各一条多行 INSERT（样品超过 SAMPLE_BATCH_SIZE 时分批），状态记录一条 INSERT
+    - 只写入不提交：优惠券核销、积分扣减由调用方在同一事务中完成后统一提交
+    """
+
+    def __init__(self, batch_size: int = SAMPLE_BATCH_SIZE):
+        self.batch_size = batch_size
+
+    @staticmethod
+    def _sample_row(order_id: int, sample: Any) -> Dict[str, Any]:
+        """样品（schema 对象或字典）转为插入行，每行字段相同"""
+        get = sample.get if isinstance(sample, dict) else lambda field: getattr(sample, field, None)
+        row = {field: get(field) for field in _SAMPLE_FIELDS}
+        row["order_id"] = order_id
+        if row["quantity"] is None:
+            row["quantity"] = 1
+        return row
+
+    async def insert_order(self, db: AsyncSession, values: Dict[str, Any]) -> int:
+        """写入订单主表，返回订单ID"""
+        result = await db.execute(insert(Order).values(**values))
+        return result.inserted_primary_key[0]
+
+    async def insert_samples(self, db: AsyncSession, order_id: int, samples: Sequence[Any]) -> int:
+        """批量写入样品，返回写入行数"""
+        rows = [self._sample_row(order_id, sample) for sample in samples]
+        for start in range(0, len(rows), self.batch_size):
+            await db.execute(insert(OrderSample).values(rows[start:start + self.batch_size]))
+        return len(rows)
+
+    async def insert_fees(
+        self,
+        db: AsyncSession,
+        order_id: int,
+        fees: Iterable[Tuple[str, str, Decimal]]
+    ) -> int:
+        """批量写入费用明细 [(类型, 名称, 金额)]，返回写入行数"""
+        rows = [
+            {"order_id": order_id, "fee_type": fee_type, "fee_name": fee_name, "amount": amount, "remark": None}
+            for fee_type, fee_name, amount in fees
+        ]
+        if rows:
+            await db.execute(insert(OrderFee).values(rows))
+        return len(rows)
+
+    async def insert_history(
+        self,
+        db: AsyncSession,
+        order_id: int,
+        to_status: str,
+        from_status: Optional[str] = None,
+        operator_id: Optional[int] = None,
+        operator_type: Optional[str] = None,
+        remark: Optional[str] = None
+    ):
+        """写入一条状态流转记录"""
+        await db.execute(insert(OrderStatusHistory).values(
+            order_id=order_id,
+            from_status=from_status,
+            to_status=to_status,
+            operator_id=operator_id,
+            operator_type=operator_type,
+            remark=remark
+        ))
+
+    async def create(
+        self,
+        db: AsyncSession,
+        order_values: Dict[str, Any],
+        samples: Sequence[Any],
+        fees: Iterable[Tuple[str, str, Decimal]],
+        operator_id: Optional[int] = None
+    ) -> int:
+        """
+        写入新订单（主表、样品、费用明细、创建记录），返回订单ID
+
+        固定 4 条语句（样品超过 SAMPLE_BATCH_SIZE 时每批多一条），不提交事务
+        """
+        order_id = await self.insert_order(db, order_values)
+        sample_count = await self.insert_samples(db, order_id, samples)
+        await self.insert_fees(db, order_id, fees)
+        await self.insert_history(
+            db,
+            order_id,
+            to_status=order_values.get("status", "pending_payment"),
+            operator_id=operator_id,
+            operator_type="user",
+            remark="创建订单"
+        )
+        logger.debug("订单已写入", extra={"order_id": order_id, "sample_count": sample_count})
+        return order_id
+
+
+# 创建全局实例
+order_writer = OrderWriter()
@@ -0,0 +1,222 @@
+"""
+积分账本
+积分变动时在同一个事务中写入积分记录并更新用户表上的积分余额/累计获得/累计使用，
+余额查询直接读用户表；定时对账任务用积分记录校验用户表上的汇总值
+"""
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, case, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.user import User
+from app.models.points import PointsRecord
+from app.services.auth_cache import auth_cache
+
+logger = logging.getLogger(__name__)
+
+
+class InsufficientPointsError(Exception):
+    """积分不足"""
+    pass
+
+
+class PointsLedger:
+    """
+    积分账本
+
+    - 积分变动：条件 UPDATE users（扣减时要求 points_balance >= 扣减值）+ 写入 PointsRecord，
+      只 flush 不提交，由调用方与业务数据一起提交
+    - 对账：按用户ID分批汇总 points_records，与用户表上的汇总值比较，不一致时记录日志（可选自动修正）
+    """
+
+    def __init__(self):
+        self.reconcile_interval = settings.POINTS_RECONCILE_INTERVAL_SECONDS
+        self.batch_size = settings.POINTS_RECONCILE_BATCH_SIZE
+        self.auto_fix = settings.POINTS_RECONCILE_AUTO_FIX
+        self._task: Optional[asyncio.Task] = None
+
+    def record(
+        self,
+        db: Session,
+        user_id: int,
+        points: int,
+        type: str,
+        related_id: Optional[int] = None,
+        description: Optional[str] = None
+    ) -> PointsRecord:
+        """
+        记录一次积分变动（正数为增加，负数为减少）
+
+        Raises:
+            InsufficientPointsError: 扣减时积分不足（未做任何修改）
+        """
+        if points >= 0:
+            values = {
+                "points_balance": func.coalesce(User.points_balance, 0) + points,
+                "total_points_earned": func.coalesce(User.total_points_earned, 0) + points,
+            }
+            condition = User.id == user_id
+        else:
+            values = {
+                "points_balance": User.points_balance + points,
+                "total_points_used": func.coalesce(User.total_points_used, 0) - points,
+            }
+            condition = and_(User.id == user_id, User.points_balance >= -points)
+
+        result = db.execute(
+            update(User).where(condition).values(**values).execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            raise InsufficientPointsError("积分不足")
+
+        auth_cache.invalidate_on_commit(db, user_id)
+        record = PointsRecord(
+            user_id=user_id,
+            points=points,
+            type=type,
+            related_id=related_id,
+            description=description
+        )
+        db.add(record)
+        db.flush()
+        return record
+
+    def get_balance(self, db: Session, user_id: int) -> Dict[str, int]:
+        """积分余额和累计获得/使用（单行主键查询）"""
+        row = db.query(
+            User.points_balance, User.total_points_earned, User.total_points_used
+        ).filter(User.id == user_id).first()
+        if not row:
+            return {"balance": 0, "earned": 0, "spent": 0}
+        return {
+            "balance": row.points_balance or 0,
+            "earned": row.total_points_earned or 0,
+            "spent": row.total_points_used or 0
+        }
+
+    def _find_mismatches(self, db: Session, start_id: int, end_id: int) -> List:
+        """汇总 [start_id, end_id) 范围内用户的积分记录，返回与用户表不一致的行"""
+        history = select(
+            PointsRecord.user_id,
+            func.sum(PointsRecord.points).label("balance"),
+            func.sum(case((PointsRecord.points > 0, PointsRecord.points), else_=0)).label("earned"),
+            func.sum(case((PointsRecord.points < 0, -PointsRecord.points), else_=0)).label("used"),
+        ).where(
+            PointsRecord.user_id >= start_id,
+            PointsRecord.user_id < end_id
+        ).group_by(PointsRecord.user_id).subquery()
+
+        balance = func.coalesce(history.c.balance, 0)
+        earned = func.coalesce(history.c.earned, 0)
+        used = func.coalesce(history.c.used, 0)
+        return db.execute(
+            select(
+                User.id, User.points_balance, User.total_points_earned, User.total_points_used,
+                balance.label("expected_balance"), earned.label("expected_earned"), used.label("expected_used")
+            ).outerjoin(history, history.c.user_id == User.id).where(
+                User.id >= start_id,
+                User.id < end_id,
+                or_(
+                    func.coalesce(User.points_balance, 0) != balance,
+                    func.coalesce(User.total_points_earned, 0) != earned,
+                    func.coalesce(User.total_points_used, 0) != used
+                )
+            )
+        ).all()
+
+    def _fix(self, db: Session, row) -> bool:
+        """按积分记录修正用户表（用户表在对账读取后又有变动时跳过，留给下一轮对账）"""
+        result = db.execute(
+            update(User).where(
+                User.id == row.id,
+                func.coalesce(User.points_balance, 0) == (row.points_balance or 0),
+                func.coalesce(User.total_points_earned, 0) == (row.total_points_earned or 0),
+                func.coalesce(User.total_points_used, 0) == (row.total_points_used or 0)
+            ).values(
+                points_balance=int(row.expected_balance),
+                total_points_earned=int(row.expected_earned),
+                total_points_used=int(row.expected_used)
+            ).execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            auth_cache.invalidate_on_commit(db, row.id)
+        return bool(result.rowcount)
+
+    def reconcile(self, db: Session, fix: Optional[bool] = None) -> Dict[str, int]:
+        """
+        对账
+
+        每批一个查询，同一条语句读取的用户表和积分记录来自同一快照
+
+        Returns:
+            {"checked": 检查的用户数上限, "mismatched": 不一致的用户数, "fixed": 已修正的用户数}
+        """
+        fix = self.auto_fix if fix is None else fix
+        max_id = db.query(func.max(User.id)).scalar() or 0
+        mismatched = fixed = 0
+
+        for start_id in range(0, max_id + 1, self.batch_size):
+            rows = self._find_mismatches(db, start_id, start_id + self.batch_size)
+            for row in rows:
+                mismatched += 1
+                logger.warning(
+                    "积分汇总与积分记录不一致",
+                    extra={
+                        "user_id": row.id,
+                        "points_balance": row.points_balance,
+                        "expected_balance": int(row.expected_balance),
+                        "total_points_earned": row.total_points_earned,
+                        "expected_earned": int(row.expected_earned),
+                        "total_points_used": row.total_points_used,
+                        "expected_used": int(row.expected_used)
+                    }
+                )
+                if fix and self._fix(db, row):
+                    fixed += 1
+            db.commit()
+
+        logger.info("积分对账完成", extra={"max_user_id": max_id, "mismatched": mismatched, "fixed": fixed})
+        return {"checked": max_id, "mismatched": mismatched, "fixed": fixed}
+
+    def _reconcile_once(self):
+        db = SessionLocal()
+        try:
+            self.reconcile(db)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def _run(self):
+        """后台定时对账任务"""
+        loop = asyncio.get_event_loop()
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            try:
+                await loop.run_in_executor(None, self._reconcile_once)
+            except Exception as e:
+                logger.error(f"积分对账任务异常: {str(e)}")
+
+    def start(self):
+        """启动定时对账任务（在应用启动时调用，间隔为0时不启动）"""
+        if self._task is None and self.reconcile_interval > 0:
+            self._task = asyncio.get_event_loop().create_task(self._run())
+
+    async def stop(self):
+        """停止定时对账任务（在应用关闭时调用）"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# 创建全局实例
+points_ledger = PointsLedger()
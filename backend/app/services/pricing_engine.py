@@ -0,0 +1,295 @@
+"""
+订单计价引擎
+订单试算和下单共用同一套计价逻辑：费用规则来自配置，项目价格进程内缓存，
+用户可用优惠券一次查询加载，一次遍历同时求出最优的优惠券 + 积分组合
+"""
+import json
+import logging
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.coupon import Coupon, UserCoupon, CouponType, UserCouponStatus
+from app.models.project import Project
+
+logger = logging.getLogger(__name__)
+
+CENT = Decimal("0.01")
+ZERO = Decimal("0")
+
+
+def _money(value) -> Decimal:
+    return Decimal(str(value or 0)).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+class PricingError(Exception):
+    """计价失败（优惠券不可用等），消息可直接返回给用户"""
+    pass
+
+
+class ProjectNotFoundError(PricingError):
+    """项目不存在"""
+    pass
+
+
+class ProjectPrice:
+    """项目价格快照（不绑定数据库会话）"""
+
+    __slots__ = ("id", "name", "category_id", "lab_id", "lab_name", "current_price", "updated_at")
+
+    def __init__(self, project: Project):
+        self.id = project.id
+        self.name = project.name
+        self.category_id = project.category_id
+        self.lab_id = project.lab_id if project.lab_id else 1
+        self.lab_name = getattr(project, "lab_name", None) or "平台实验室"
+        self.current_price = _money(project.current_price)
+        self.updated_at = project.updated_at
+
+
+class CouponOption:
+    """一张可用于计价的用户优惠券"""
+
+    __slots__ = ("user_coupon_id", "name", "coupon_type", "value", "min_amount", "full_amount",
+                 "max_discount", "project_ids", "category_ids")
+
+    def __init__(self, user_coupon: UserCoupon, coupon: Coupon):
+        self.user_coupon_id = user_coupon.id
+        self.name = user_coupon.coupon_name or coupon.name
+        self.coupon_type = coupon.type
+        self.value = coupon.discount_rate if coupon.type == CouponType.DISCOUNT else (
+            coupon.cash_amount if coupon.type == CouponType.CASH else coupon.reduction_amount
+        )
+        if self.value is None:
+            self.value = user_coupon.discount_value
+        self.min_amount = _money(coupon.min_order_amount)
+        self.full_amount = _money(coupon.full_amount)
+        self.max_discount = _money(coupon.max_discount_amount) if coupon.max_discount_amount else None
+        self.project_ids = self._id_set(coupon.applicable_projects)
+        self.category_ids = self._id_set(coupon.applicable_categories)
+
+    @staticmethod
+    def _id_set(raw: Optional[str]) -> Optional[set]:
+        """适用范围（JSON数组），未设置表示不限"""
+        if not raw:
+            return None
+        try:
+            ids = json.loads(raw)
+        except (TypeError, ValueError):
+            return None
+        return {int(i) for i in ids} if ids else None
+
+    def discount(self, project: ProjectPrice, subtotal: Decimal) -> Optional[Decimal]:
+        """本券在该订单上的优惠金额，不满足使用条件返回 None"""
+        if self.project_ids is not None and project.id not in self.project_ids:
+            return None
+        if self.category_ids is not None and project.category_id not in self.category_ids:
+            return None
+        if subtotal < self.min_amount:
+            return None
+
+        value = Decimal(str(self.value or 0))
+        if self.coupon_type == CouponType.DISCOUNT:
+            if not 0 < value < 1:
+                return None
+            amount = subtotal * (1 - value)
+        elif self.coupon_type == CouponType.FULL_REDUCTION:
+            if subtotal < self.full_amount:
+                return None
+            amount = value
+        else:
+            amount = value
+
+        if self.max_discount is not None:
+            amount = min(amount, self.max_discount)
+        return _money(min(amount, subtotal))
+
+
+class Quote:
+    """计价结果"""
+
+    def __init__(self, project: ProjectPrice, sample_count: int):
+        self.project = project
+        self.sample_count = sample_count
+        self.project_fee = ZERO
+        self.urgent_fee = ZERO
+        self.shipping_fee = ZERO
+        self.coupon: Optional[CouponOption] = None
+        self.coupon_discount = ZERO
+        self.points_used = 0
+        self.points_discount = ZERO
+        self.best_coupon_id: Optional[int] = None
+        self.available_coupons: List[Dict[str, Any]] = []
+
+    @property
+    def subtotal(self) -> Decimal:
+        return self.project_fee + self.urgent_fee + self.shipping_fee
+
+    @property
+    def discount_amount(self) -> Decimal:
+        return self.coupon_discount + self.points_discount
+
+    @property
+    def total_fee(self) -> Decimal:
+        return self.subtotal - self.discount_amount
+
+    def fee_details(self) -> List[Tuple[str, str, Decimal]]:
+        """费用明细 [(类型, 名称, 金额)]，优惠为负数"""
+        items = [("project", "检测费用", self.project_fee)]
+        if self.urgent_fee > 0:
+            items.append(("urgent", "加急费用", self.urgent_fee))
+        if self.shipping_fee > 0:
+            items.append(("shipping", "运费", self.shipping_fee))
+        if self.coupon_discount > 0:
+            items.append(("coupon", f"优惠券：{self.coupon.name}", -self.coupon_discount))
+        if self.points_discount > 0:
+            items.append(("points", f"积分抵扣（{self.points_used}积分）", -self.points_discount))
+        return items
+
+
+class PricingEngine:
+    """
+    订单计价引擎
+
+    - 费用规则：加急费 ORDER_URGENT_FEE，运费 ORDER_SHIPPING_FEES，
+      积分 POINTS_PER_YUAN 积分抵1元、最多抵扣费用合计的 POINTS_MAX_DISCOUNT_RATE
+    - 项目价格按项目ID缓存（PRICING_PROJECT_CACHE_TTL_SECONDS），下单时重新读取项目，
+      updated_at 变化时更新缓存；后台修改项目后调用 invalidate_project
+    - 试算只需一次查询：用户未使用且未过期的优惠券（关联优惠券模板）
+    - 指定 coupon_id 时使用该券（不可用则报错），否则不使用优惠券，但返回最优的券供前端推荐
+    """
+
+    def __init__(self):
+        self._prices = TTLCache(
+            ttl=settings.PRICING_PROJECT_CACHE_TTL_SECONDS,
+            max_entries=settings.PRICING_PROJECT_CACHE_MAX_ENTRIES,
+            name="project_prices"
+        )
+        self.urgent_fee = _money(settings.ORDER_URGENT_FEE)
+        self.shipping_fees = {method: _money(fee) for method, fee in settings.ORDER_SHIPPING_FEES.items()}
+        self.points_per_yuan = settings.POINTS_PER_YUAN
+        self.points_max_rate = Decimal(str(settings.POINTS_MAX_DISCOUNT_RATE))
+
+    def invalidate_project(self, project_id: Optional[int] = None):
+        """项目价格变化后调用（不传ID清空全部）"""
+        if project_id is None:
+            self._prices.clear()
+        else:
+            self._prices.delete(project_id)
+
+    async def _load_project(self, db: AsyncSession, project_id: int, fresh: bool) -> ProjectPrice:
+        """项目价格；fresh=True 时从数据库读取并在 updated_at 变化时刷新缓存"""
+        cached = None if fresh else self._prices.get(project_id)
+        if cached is not None:
+            return cached
+
+        project = await db.get(Project, project_id)
+        if not project:
+            raise ProjectNotFoundError("项目不存在")
+
+        price = ProjectPrice(project)
+        previous = self._prices.get(project_id) if fresh else None
+        if previous is None or previous.updated_at != price.updated_at:
+            self._prices.set(project_id, price)
+        return price
+
+    async def _load_coupons(self, db: AsyncSession, user_id: int) -> List[CouponOption]:
+        """用户未使用且未过期的优惠券（一次查询）"""
+        rows = (await db.execute(
+            select(UserCoupon, Coupon).join(
+                Coupon, Coupon.id == UserCoupon.coupon_id
+            ).where(
+                UserCoupon.user_id == user_id,
+                UserCoupon.status == UserCouponStatus.UNUSED,
+                UserCoupon.expire_at > datetime.now()
+            )
+        )).all()
+        return [CouponOption(user_coupon, coupon) for user_coupon, coupon in rows]
+
+    def _points_discount(self, subtotal: Decimal, after_coupon: Decimal, points: int) -> Tuple[int, Decimal]:
+        """积分抵扣：(使用积分, 抵扣金额)，按整分计算"""
+        if points <= 0 or self.points_per_yuan <= 0:
+            return 0, ZERO
+        cap = min(subtotal * self.points_max_rate, after_coupon)
+        cents = min(points * 100 // self.points_per_yuan, int(cap * 100))
+        if cents <= 0:
+            return 0, ZERO
+        used = -(-cents * self.points_per_yuan // 100)
+        return used, Decimal(cents) / 100
+
+    async def quote(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        project_id: int,
+        sample_count: int,
+        is_urgent: bool,
+        shipping_method: str,
+        coupon_id: Optional[int] = None,
+        use_points: int = 0,
+        points_balance: Optional[int] = None,
+        fresh: bool = False
+    ) -> Quote:
+        """
+        计算订单费用
+
+        Args:
+            points_balance: 用户积分余额（传入时使用积分不超过余额；下单时由积分扣减再次校验）
+            fresh: 是否从数据库读取项目价格（下单时使用）
+
+        Raises:
+            ProjectNotFoundError: 项目不存在
+            PricingError: 指定的优惠券不存在或不满足使用条件
+        """
+        project = await self._load_project(db, project_id, fresh)
+        result = Quote(project, sample_count)
+        result.project_fee = project.current_price * sample_count
+        result.urgent_fee = self.urgent_fee if is_urgent else ZERO
+        result.shipping_fee = self.shipping_fees.get(shipping_method, ZERO)
+
+        subtotal = result.subtotal
+        points = max(use_points or 0, 0)
+        if points_balance is not None:
+            points = min(points, max(points_balance, 0))
+
+        # 一次遍历：每张券的优惠 + 剩余金额可用的积分抵扣，记录总优惠最大的组合
+        best_total = None
+        chosen = None
+        for option in await self._load_coupons(db, user_id):
+            discount = option.discount(project, subtotal)
+            if discount is None:
+                continue
+            _, points_value = self._points_discount(subtotal, subtotal - discount, points)
+            result.available_coupons.append({
+                "user_coupon_id": option.user_coupon_id,
+                "name": option.name,
+                "discount": discount
+            })
+            if best_total is None or discount + points_value > best_total:
+                best_total = discount + points_value
+                result.best_coupon_id = option.user_coupon_id
+            if option.user_coupon_id == coupon_id:
+                chosen = (option, discount)
+
+        if coupon_id:
+            if chosen is None:
+                raise PricingError("优惠券不可用")
+            result.coupon, result.coupon_discount = chosen
+
+        result.points_used, result.points_discount = self._points_discount(
+            subtotal, subtotal - result.coupon_discount, points
+        )
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """项目价格缓存命中统计"""
+        return self._prices.stats()
+
+
+# 创建全局实例
+pricing_engine = PricingEngine()
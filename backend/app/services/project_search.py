@@ -0,0 +1,331 @@
+"""
+项目搜索服务
+关键词搜索返回按相关度排序的项目ID，替代对 name/project_no/introduction 的 LIKE '%kw%' 全表扫描
+
+- memory：进程内倒排索引（中文按二元组切分），默认
+- mysql：MySQL FULLTEXT 索引（ngram 分词器），需先执行 migrations/add_project_fulltext_index.sql
+"""
+import re
+import time
+import asyncio
+import logging
+import threading
+from collections import namedtuple
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.project import Project
+
+logger = logging.getLogger(__name__)
+
+# 字段权重：名称命中 > 编号命中 > 介绍命中
+FIELD_WEIGHTS = (
+    ('name', 3.0),
+    ('project_no', 2.0),
+    ('introduction', 1.0),
+)
+
+# 索引需要的项目字段（增量更新时从ORM对象复制，避免持有会话中的对象）
+_DocRow = namedtuple("_DocRow", "id name project_no introduction status category_id")
+
+# 连续的字母、数字、汉字视为一段，其余字符作为分隔符
+_SEGMENT_RE = re.compile(r"[0-9a-z\u4e00-\u9fff]+")
+
+
+def tokenize(value: Optional[str]) -> List[str]:
+    """
+    二元组分词
+
+    与 MySQL ngram 分词器（ngram_token_size=2）一致：每段文本切分为相邻两个字符的组合，
+    只有一个字符的段保留单字
+    """
+    tokens = []
+    for segment in _SEGMENT_RE.findall((value or "").lower()):
+        if len(segment) == 1:
+            tokens.append(segment)
+        else:
+            tokens.extend(segment[i:i + 2] for i in range(len(segment) - 1))
+    return tokens
+
+
+class InMemoryProjectSearch:
+    """
+    进程内倒排索引
+
+    - 应用启动时从 projects 表构建，后台增删改项目时增量更新
+    - 后台任务每 PROJECT_SEARCH_REBUILD_SECONDS 秒在线程池中全量重建，建好后整体替换，
+      多进程部署时其他进程的修改由此同步；请求只读索引，不会触发重建
+    - 查询的所有二元组都需命中（AND），按字段权重累加词频排序
+    """
+
+    def __init__(self):
+        self.rebuild_interval = settings.PROJECT_SEARCH_REBUILD_SECONDS
+        # token -> {project_id: 权重得分}
+        self._postings: Dict[str, Dict[int, float]] = {}
+        # project_id -> 该项目的全部token（用于增量删除）
+        self._doc_tokens: Dict[int, Set[str]] = {}
+        # project_id -> (status, category_id, 名称+编号小写文本)
+        self._doc_meta: Dict[int, tuple] = {}
+        self._built_at: Optional[float] = None
+        # 重建期间的增量更新（project_id -> _DocRow，None 表示删除），替换索引后重放
+        self._changes: Optional[Dict[int, Optional[_DocRow]]] = None
+        self._lock = threading.RLock()
+        self._task: Optional[asyncio.Task] = None
+
+    def _add(self, postings: Dict, doc_tokens: Dict, doc_meta: Dict, row):
+        """把单个项目写入索引结构"""
+        scores: Dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS:
+            for token in tokenize(getattr(row, field)):
+                scores[token] = scores.get(token, 0.0) + weight
+
+        for token, score in scores.items():
+            postings.setdefault(token, {})[row.id] = score
+        doc_tokens[row.id] = set(scores)
+        doc_meta[row.id] = (
+            row.status,
+            row.category_id,
+            f"{row.name or ''} {row.project_no or ''}".lower()
+        )
+
+    def _remove(self, project_id: int):
+        """从索引中移除单个项目"""
+        for token in self._doc_tokens.pop(project_id, ()):
+            posting = self._postings.get(token)
+            if posting is not None:
+                posting.pop(project_id, None)
+                if not posting:
+                    del self._postings[token]
+        self._doc_meta.pop(project_id, None)
+
+    def rebuild(self, db: Session):
+        """从数据库全量重建索引（在新结构上构建，完成后整体替换）"""
+        started = time.monotonic()
+        with self._lock:
+            self._changes = {}
+        postings: Dict[str, Dict[int, float]] = {}
+        doc_tokens: Dict[int, Set[str]] = {}
+        doc_meta: Dict[int, tuple] = {}
+
+        rows = db.query(
+            Project.id,
+            Project.name,
+            Project.project_no,
+            Project.introduction,
+            Project.status,
+            Project.category_id
+        ).yield_per(1000)
+        try:
+            for row in rows:
+                self._add(postings, doc_tokens, doc_meta, row)
+        except Exception:
+            with self._lock:
+                self._changes = None
+            raise
+
+        with self._lock:
+            changes, self._changes = self._changes, None
+            self._postings, self._doc_tokens, self._doc_meta = postings, doc_tokens, doc_meta
+            self._built_at = time.monotonic()
+            # 读取期间提交的修改可能不在新索引中，按顺序重放
+            for project_id, row in changes.items():
+                self._remove(project_id)
+                if row is not None:
+                    self._add(self._postings, self._doc_tokens, self._doc_meta, row)
+
+        logger.info(
+            f"项目搜索索引重建完成: {len(doc_meta)} 个项目, {len(postings)} 个词, "
+            f"耗时 {(time.monotonic() - started) * 1000:.0f}ms"
+        )
+
+    def _rebuild_from_db(self):
+        """使用独立会话全量重建（同步，在线程池中执行）"""
+        db = SessionLocal()
+        try:
+            self.rebuild(db)
+        finally:
+            db.close()
+
+    def index_project(self, project: Project):
+        """新增或更新单个项目的索引（后台写入提交后调用）"""
+        row = _DocRow(*(getattr(project, field) for field in _DocRow._fields))
+        with self._lock:
+            if self._changes is not None:
+                self._changes[row.id] = row
+            if self._built_at is None:
+                return
+            self._remove(row.id)
+            self._add(self._postings, self._doc_tokens, self._doc_meta, row)
+
+    def remove_project(self, project_id: int):
+        """删除单个项目的索引"""
+        with self._lock:
+            if self._changes is not None:
+                self._changes[project_id] = None
+            self._remove(project_id)
+
+    async def _run(self):
+        """后台定时重建任务"""
+        loop = asyncio.get_event_loop()
+        while True:
+            await asyncio.sleep(self.rebuild_interval)
+            try:
+                await loop.run_in_executor(None, self._rebuild_from_db)
+            except Exception as e:
+                logger.error(f"项目搜索索引重建失败: {str(e)}")
+
+    async def start(self):
+        """构建初始索引并启动后台重建任务（在应用启动时调用）"""
+        if self._task is not None:
+            return
+        try:
+            await asyncio.get_event_loop().run_in_executor(None, self._rebuild_from_db)
+        except Exception as e:
+            logger.error(f"项目搜索索引构建失败，将在下个周期重试: {str(e)}")
+        self._task = asyncio.get_event_loop().create_task(self._run())
+
+    async def stop(self):
+        """停止后台重建任务（在应用关闭时调用）"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def search(
+        self,
+        db: Session,
+        keyword: str,
+        status: Optional[str] = None,
+        category_id: Optional[int] = None
+    ) -> List[int]:
+        """
+        关键词搜索（只读索引，不访问数据库）
+
+        Returns:
+            List[int]: 按相关度从高到低排序的项目ID
+        """
+        tokens = set(tokenize(keyword))
+        if not tokens:
+            return []
+
+        with self._lock:
+            if len(tokens) == 1 and len(next(iter(tokens))) == 1:
+                # 单字查询：二元组索引无法覆盖，直接匹配名称和编号
+                char = next(iter(tokens))
+                scores = {
+                    doc_id: 1.0 for doc_id, meta in self._doc_meta.items()
+                    if char in meta[2]
+                }
+            else:
+                # 从最短的倒排表开始求交集
+                postings = sorted(
+                    (self._postings.get(token, {}) for token in tokens),
+                    key=len
+                )
+                scores = dict(postings[0])
+                for posting in postings[1:]:
+                    if not scores:
+                        break
+                    scores = {
+                        doc_id: score + posting[doc_id]
+                        for doc_id, score in scores.items()
+                        if doc_id in posting
+                    }
+
+            if status is not None or category_id:
+                doc_meta = self._doc_meta
+                scores = {
+                    doc_id: score for doc_id, score in scores.items()
+                    if (status is None or doc_meta[doc_id][0] == status)
+                    and (not category_id or doc_meta[doc_id][1] == category_id)
+                }
+
+        # 得分相同时新项目在前
+        return sorted(scores, key=lambda doc_id: (-scores[doc_id], -doc_id))
+
+
+class MySQLProjectSearch:
+    """
+    MySQL FULLTEXT 搜索
+
+    使用 ngram 分词器的全文索引，短语模式匹配（相当于要求所有二元组命中），按 MATCH 得分排序；
+    索引由MySQL维护，无需增量更新
+    """
+
+    _SQL = (
+        "SELECT id FROM projects "
+        "WHERE MATCH(name, project_no, introduction) AGAINST(:phrase IN BOOLEAN MODE) "
+        "{filters}"
+        "ORDER BY MATCH(name, project_no, introduction) AGAINST(:phrase IN BOOLEAN MODE) DESC, id DESC"
+    )
+
+    def index_project(self, project: Project):
+        pass
+
+    def remove_project(self, project_id: int):
+        pass
+
+    def rebuild(self, db: Session):
+        pass
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def search(
+        self,
+        db: Session,
+        keyword: str,
+        status: Optional[str] = None,
+        category_id: Optional[int] = None
+    ) -> List[int]:
+        """
+        关键词搜索
+
+        Returns:
+            List[int]: 按相关度从高到低排序的项目ID
+        """
+        # 去掉布尔模式的运算符，整体作为短语查询
+        phrase = re.sub(r'["+\-<>()~*@]', " ", keyword or "").strip()
+        if not phrase:
+            return []
+
+        filters = ""
+        params = {"phrase": f'"{phrase}"'}
+        if status is not None:
+            filters += "AND status = :status "
+            params["status"] = status
+        if category_id:
+            filters += "AND category_id = :category_id "
+            params["category_id"] = category_id
+
+        rows = db.execute(text(self._SQL.format(filters=filters)), params).fetchall()
+        return [row[0] for row in rows]
+
+
+def paginate_ids(ids: List[int], page: int, page_size: int) -> List[int]:
+    """截取当前页的项目ID"""
+    offset = (page - 1) * page_size
+    return ids[offset:offset + page_size]
+
+
+def order_by_ids(items: list, ids: List[int]) -> list:
+    """按搜索结果的ID顺序排列数据库查询结果"""
+    position = {project_id: i for i, project_id in enumerate(ids)}
+    return sorted(items, key=lambda item: position.get(item.id, len(position)))
+
+
+# 创建全局实例
+if settings.PROJECT_SEARCH_BACKEND == "mysql":
+    project_search = MySQLProjectSearch()
+else:
+    project_search = InMemoryProjectSearch()
@@ -0,0 +1,120 @@
+"""
+评价服务
+项目评价列表的评价人信息批量加载（一次 IN 查询 + 进程内缓存），项目评分汇总的维护与读取
+"""
+import logging
+from typing import Any, Dict, Iterable
+
+from sqlalchemy import func, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.user import User
+from app.models.review import OrderReview, ProjectRatingStats
+
+logger = logging.getLogger(__name__)
+
+# 创建评价时累加项目评分汇总（汇总行不存在时插入）
+_ADD_RATING_SQL = text(
+    "INSERT INTO project_rating_stats "
+    "(project_id, review_count, service_rating_sum, quality_rating_sum, logistics_rating_sum) "
+    "VALUES (:project_id, 1, :service, :quality, :logistics) "
+    "ON DUPLICATE KEY UPDATE review_count = review_count + 1, "
+    "service_rating_sum = service_rating_sum + VALUES(service_rating_sum), "
+    "quality_rating_sum = quality_rating_sum + VALUES(quality_rating_sum), "
+    "logistics_rating_sum = logistics_rating_sum + VALUES(logistics_rating_sum)"
+)
+
+ANONYMOUS_CARD = {"nickname": "匿名用户", "avatar": None}
+MISSING_CARD = {"nickname": "用户", "avatar": None}
+
+
+class ReviewService:
+    """
+    评价服务
+
+    - 评价人名片只包含昵称和头像，按用户ID缓存；一页评价的评价人通过一次 IN 查询加载
+    - 项目评分汇总保存评价数和各项评分总和，创建评价时在同一事务中累加
+    """
+
+    def __init__(self):
+        self._author_cards = TTLCache(
+            ttl=settings.REVIEW_AUTHOR_CACHE_TTL_SECONDS,
+            max_entries=settings.REVIEW_AUTHOR_CACHE_MAX_ENTRIES,
+            name="review_authors"
+        )
+
+    def load_author_cards(self, db: Session, user_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """批量获取评价人名片 {user_id: {"nickname", "avatar"}}"""
+        cards = {}
+        missing = []
+        for user_id in set(user_ids):
+            card = self._author_cards.get(user_id)
+            if card is None:
+                missing.append(user_id)
+            else:
+                cards[user_id] = card
+
+        if missing:
+            rows = db.query(User.id, User.nickname, User.avatar).filter(User.id.in_(missing)).all()
+            for row in rows:
+                card = {"nickname": row.nickname or MISSING_CARD["nickname"], "avatar": row.avatar}
+                self._author_cards.set(row.id, card)
+                cards[row.id] = card
+
+        return cards
+
+    def author_card(self, review: OrderReview, cards: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
+        """评价展示的评价人信息（匿名评价不展示）"""
+        if review.is_anonymous:
+            return ANONYMOUS_CARD
+        return cards.get(review.user_id, MISSING_CARD)
+
+    def add_rating(self, db: Session, review: OrderReview):
+        """累加项目评分汇总（不提交，与评价一起提交）"""
+        db.execute(_ADD_RATING_SQL, {
+            "project_id": review.project_id,
+            "service": review.service_rating,
+            "quality": review.quality_rating,
+            "logistics": review.logistics_rating
+        })
+
+    def get_rating_stats(self, db: Session, project_id: int) -> Dict[str, Any]:
+        """项目评分汇总（主键查询），没有汇总行时按评价表重算"""
+        stats = db.get(ProjectRatingStats, project_id)
+        if stats is None:
+            stats = self.refresh_rating_stats(db, project_id)
+        return stats.averages()
+
+    def refresh_rating_stats(self, db: Session, project_id: int) -> ProjectRatingStats:
+        """按评价表重算项目评分汇总"""
+        row = db.query(
+            func.count(OrderReview.id),
+            func.coalesce(func.sum(OrderReview.service_rating), 0),
+            func.coalesce(func.sum(OrderReview.quality_rating), 0),
+            func.coalesce(func.sum(OrderReview.logistics_rating), 0)
+        ).filter(OrderReview.project_id == project_id).one()
+
+        stats = db.get(ProjectRatingStats, project_id) or ProjectRatingStats(project_id=project_id)
+        stats.review_count = int(row[0])
+        stats.service_rating_sum = int(row[1])
+        stats.quality_rating_sum = int(row[2])
+        stats.logistics_rating_sum = int(row[3])
+        if row[0]:
+            try:
+                db.merge(stats)
+                db.commit()
+            except IntegrityError:
+                # 并发请求已写入汇总行
+                db.rollback()
+        return stats
+
+    def stats(self) -> Dict[str, Any]:
+        """评价人缓存命中统计"""
+        return self._author_cards.stats()
+
+
+# 创建全局实例
+review_service = ReviewService()
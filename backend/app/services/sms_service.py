@@ -9,7 +9,8 @@ import random
 import asyncio
 from typing import Optional
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import settings
 from app.models.sms_code import SMSCode
 import logging
@@ -40,7 +41,7 @@ class SMSService:
     async def send_verification_code(
         self, 
         phone: str, 
-        db: Session,
+        db: AsyncSession,
         scene: str = "login"
     ) -> dict:
         """
@@ -110,7 +111,7 @@ class SMSService:
         self, 
         phone: str, 
         code: str, 
-        db: Session,
+        db: AsyncSession,
         scene: str = None
     ) -> bool:
         """
@@ -127,7 +128,7 @@ class SMSService:
         """
         try:
             # 查询条件
-            query = db.query(SMSCode).filter(
+            query = select(SMSCode).where(
                 SMSCode.phone == phone,
                 SMSCode.code == code,
                 SMSCode.is_used == False,
@@ -136,9 +137,9 @@ class SMSService:
             
             # 如果指定了场景，添加场景过滤
             if scene:
-                query = query.filter(SMSCode.scene == scene)
+                query = query.where(SMSCode.scene == scene)
             
-            sms_code = query.first()
+            sms_code = (await db.execute(query.limit(1))).scalar_one_or_none()
             
             if not sms_code:
                 logger.warning(f"验证码验证失败：手机号 {phone}, 验证码 {code}")
@@ -146,21 +147,21 @@ class SMSService:
             
             # 标记为已使用
             sms_code.is_used = True
-            db.commit()
+            await db.commit()
             
             logger.info(f"验证码验证成功：手机号 {phone}")
             return True
             
         except Exception as e:
             logger.error(f"验证短信验证码失败: {str(e)}")
-            db.rollback()
+            await db.rollback()
             return False
     
     async def _store_verification_code(
         self, 
         phone: str, 
         code: str, 
-        db: Session,
+        db: AsyncSession,
         scene: str = "login"
     ):
         """
@@ -174,10 +175,12 @@ class SMSService:
         """
         try:
             # 先删除该手机号的旧验证码
-            db.query(SMSCode).filter(
-                SMSCode.phone == phone,
-                SMSCode.scene == scene
-            ).delete()
+            await db.execute(
+                delete(SMSCode).where(
+                    SMSCode.phone == phone,
+                    SMSCode.scene == scene
+                )
+            )
             
             # 创建新的验证码记录，5分钟后过期
             expires_at = datetime.utcnow() + timedelta(minutes=5)
@@ -189,13 +192,13 @@ class SMSService:
             )
             
             db.add(sms_code)
-            db.commit()
+            await db.commit()
             
             logger.info(f"验证码已存储：手机号 {phone}, 场景 {scene}")
             
         except Exception as e:
             logger.error(f"存储验证码失败: {str(e)}")
-            db.rollback()
+            await db.rollback()
             raise
 
 
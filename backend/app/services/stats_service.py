@@ -0,0 +1,384 @@
+"""
+仪表盘统计服务
+基于 daily_stats 汇总表的增量统计：仪表盘展示窗口（本月及最近7天）之前的日期冻结，
+窗口内的日期由后台任务定时重算；全量合计和订单状态分布由同一任务写入当日汇总行，
+仪表盘接口只读取汇总表
+"""
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Optional
+
+from sqlalchemy import func, case
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.user import User
+from app.models.order import Order
+from app.models.project import Project
+from app.models.recharge import RechargeRecord, RechargeStatus
+from app.models.stats import DailyStats
+
+logger = logging.getLogger(__name__)
+
+# 计入收入的订单状态
+PAID_ORDER_STATUSES = ['paid', 'confirmed', 'testing', 'completed']
+
+# 仪表盘展示的订单状态分布
+DASHBOARD_ORDER_STATUSES = ['unpaid', 'paid', 'confirmed', 'testing', 'completed', 'cancelled']
+
+# 待处理订单状态
+PENDING_ORDER_STATUSES = ['unpaid', 'paid', 'confirmed']
+
+# 汇总表中的统计字段
+STAT_FIELDS = ('new_users', 'order_count', 'paid_order_count', 'revenue', 'recharge_count', 'recharge_amount')
+
+# 全量合计字段（只写入当日汇总行，刷新时的快照）
+TOTAL_FIELDS = (
+    'total_users', 'total_orders', 'total_revenue', 'total_recharge',
+    'total_projects', 'active_projects', 'pending_recharge_count', 'order_status_counts'
+)
+
+
+def _day_start(day: date) -> datetime:
+    """日期当天零点"""
+    return datetime.combine(day, datetime.min.time())
+
+
+def _window_start(today: date) -> date:
+    """仪表盘展示的最早日期（本月1日和7天前中较早的一天）"""
+    return min(today.replace(day=1), today - timedelta(days=6))
+
+
+def _to_date(value) -> Optional[date]:
+    """将 DATE() 查询结果统一转换为 date（不同驱动可能返回字符串或 datetime）"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+class StatsService:
+    """
+    仪表盘统计服务
+
+    - 订单取消、退款会改变已过去日期的数据，展示窗口内的日期每次刷新都重新聚合，
+      窗口之前的日期才冻结
+    - 全量合计按状态分组聚合（走 (status, 金额) 覆盖索引），结果写入当日汇总行
+    - 刷新由后台任务每 DASHBOARD_STATS_REFRESH_SECONDS 秒在线程池中执行，仪表盘接口只读汇总表
+    """
+
+    def __init__(self):
+        self.refresh_interval = settings.DASHBOARD_STATS_REFRESH_SECONDS
+        self._task: Optional[asyncio.Task] = None
+
+    def _aggregate(self, db: Session, start: datetime, end: datetime) -> Dict[date, Dict]:
+        """
+        按天聚合 [start, end) 区间内的原始数据
+
+        使用时间范围条件（可走索引），每个来源表只做一次 GROUP BY
+        """
+        buckets: Dict[date, Dict] = {}
+
+        def bucket(day) -> Dict:
+            day = _to_date(day)
+            if day not in buckets:
+                buckets[day] = {field: 0 for field in STAT_FIELDS}
+            return buckets[day]
+
+        # 新增用户
+        user_day = func.date(User.created_at)
+        for day, count in db.query(user_day, func.count(User.id)).filter(
+            User.created_at >= start,
+            User.created_at < end
+        ).group_by(user_day).all():
+            bucket(day)['new_users'] = count or 0
+
+        # 新增订单
+        order_day = func.date(Order.created_at)
+        for day, count in db.query(order_day, func.count(Order.id)).filter(
+            Order.created_at >= start,
+            Order.created_at < end
+        ).group_by(order_day).all():
+            bucket(day)['order_count'] = count or 0
+
+        # 收入（按支付时间）
+        paid_day = func.date(Order.paid_at)
+        for day, count, amount in db.query(paid_day, func.count(Order.id), func.sum(Order.total_fee)).filter(
+            Order.paid_at >= start,
+            Order.paid_at < end,
+            Order.status.in_(PAID_ORDER_STATUSES)
+        ).group_by(paid_day).all():
+            stats = bucket(day)
+            stats['paid_order_count'] = count or 0
+            stats['revenue'] = amount or Decimal("0")
+
+        # 成功充值（按创建时间）
+        recharge_day = func.date(RechargeRecord.created_at)
+        for day, count, amount in db.query(
+            recharge_day, func.count(RechargeRecord.id), func.sum(RechargeRecord.amount)
+        ).filter(
+            RechargeRecord.created_at >= start,
+            RechargeRecord.created_at < end,
+            RechargeRecord.status == RechargeStatus.SUCCESS
+        ).group_by(recharge_day).all():
+            stats = bucket(day)
+            stats['recharge_count'] = count or 0
+            stats['recharge_amount'] = amount or Decimal("0")
+
+        return buckets
+
+    def _earliest_date(self, db: Session) -> Optional[date]:
+        """获取原始数据中最早的日期（首次回填使用）"""
+        candidates = [
+            db.query(func.min(User.created_at)).scalar(),
+            db.query(func.min(Order.created_at)).scalar(),
+            db.query(func.min(RechargeRecord.created_at)).scalar(),
+        ]
+        dates = [_to_date(d) for d in candidates if d is not None]
+        return min(dates) if dates else None
+
+    def _save_buckets(
+        self,
+        db: Session,
+        start_day: date,
+        end_day: date,
+        buckets: Dict[date, Dict],
+        is_final: bool
+    ) -> Dict[date, DailyStats]:
+        """写入 [start_day, end_day) 区间的汇总行（无数据的日期写入0），返回各日期的行"""
+        existing = {
+            row.stat_date: row
+            for row in db.query(DailyStats).filter(
+                DailyStats.stat_date >= start_day,
+                DailyStats.stat_date < end_day
+            ).all()
+        }
+
+        saved = {}
+        day = start_day
+        while day < end_day:
+            values = buckets.get(day) or {field: 0 for field in STAT_FIELDS}
+            row = existing.get(day)
+            if row is None:
+                row = DailyStats(stat_date=day)
+                db.add(row)
+            for field in STAT_FIELDS:
+                setattr(row, field, values[field])
+            row.is_final = is_final
+            saved[day] = row
+            day += timedelta(days=1)
+        return saved
+
+    def _totals(self, db: Session) -> Dict:
+        """
+        全量合计快照
+
+        订单和充值各一条按状态分组的聚合：已取消、退款的订单按当前状态计入，
+        没有支付时间的已支付订单也计入收入
+        """
+        status_counts = {}
+        total_orders = 0
+        total_revenue = Decimal("0")
+        for order_status, count, amount in db.query(
+            Order.status, func.count(Order.id), func.sum(Order.total_fee)
+        ).group_by(Order.status).all():
+            status_counts[order_status] = count
+            total_orders += count
+            if order_status in PAID_ORDER_STATUSES:
+                total_revenue += amount or 0
+
+        total_recharge = Decimal("0")
+        pending_recharge = 0
+        for recharge_status, count, amount in db.query(
+            RechargeRecord.status, func.count(RechargeRecord.id), func.sum(RechargeRecord.amount)
+        ).group_by(RechargeRecord.status).all():
+            if recharge_status == RechargeStatus.SUCCESS:
+                total_recharge += amount or 0
+            elif recharge_status == RechargeStatus.PENDING:
+                pending_recharge = count
+
+        total_projects, active_projects = db.query(
+            func.count(Project.id),
+            func.sum(case((Project.status == 'active', 1), else_=0))
+        ).one()
+
+        return {
+            'total_users': db.query(func.count(User.id)).scalar() or 0,
+            'total_orders': total_orders,
+            'total_revenue': total_revenue,
+            'total_recharge': total_recharge,
+            'total_projects': total_projects or 0,
+            'active_projects': int(active_projects or 0),
+            'pending_recharge_count': pending_recharge,
+            'order_status_counts': status_counts
+        }
+
+    def refresh(self, db: Session):
+        """
+        增量刷新汇总表
+
+        1. 上次冻结日期之后、展示窗口之前的日期：聚合一次后冻结
+        2. 展示窗口内的日期（含今天）：每次刷新都重新聚合
+        3. 全量合计：每次刷新写入当日汇总行
+        """
+        today = date.today()
+        tomorrow = today + timedelta(days=1)
+        window_start = _window_start(today)
+
+        try:
+            last_final = db.query(func.max(DailyStats.stat_date)).filter(
+                DailyStats.is_final == True
+            ).scalar()
+
+            if last_final is not None:
+                start_day = _to_date(last_final) + timedelta(days=1)
+            else:
+                start_day = self._earliest_date(db) or today
+
+            # 冻结展示窗口之前的日期
+            if start_day < window_start:
+                buckets = self._aggregate(db, _day_start(start_day), _day_start(window_start))
+                self._save_buckets(db, start_day, window_start, buckets, is_final=True)
+
+            # 重算展示窗口内的日期
+            buckets = self._aggregate(db, _day_start(window_start), _day_start(tomorrow))
+            rows = self._save_buckets(db, window_start, tomorrow, buckets, is_final=False)
+
+            # 全量合计快照
+            for field, value in self._totals(db).items():
+                setattr(rows[today], field, value)
+
+            db.commit()
+        except IntegrityError:
+            # 多个进程同时写入同一天的汇总行，以先提交的为准
+            db.rollback()
+            logger.info("每日统计已被其他进程刷新")
+
+    def _refresh_from_db(self):
+        """使用独立会话刷新汇总表（同步，在线程池中执行）"""
+        db = SessionLocal()
+        try:
+            self.refresh(db)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def _run(self):
+        """后台定时刷新任务"""
+        loop = asyncio.get_event_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self._refresh_from_db)
+            except Exception as e:
+                logger.error(f"每日统计刷新失败: {str(e)}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self):
+        """启动后台刷新任务（在应用启动时调用）"""
+        if self._task is None:
+            self._task = asyncio.get_event_loop().create_task(self._run())
+
+    async def stop(self):
+        """停止后台刷新任务（在应用关闭时调用）"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_dashboard_stats(self, db: Session) -> Dict:
+        """
+        获取仪表盘统计数据
+
+        只读取汇总表（一条按日期范围的查询）：当日、本月及7天趋势来自各日期的行，
+        全量合计、订单状态分布来自最近一次刷新写入的快照（由后台任务刷新，本接口不写入）
+        """
+        today = date.today()
+        yesterday = today - timedelta(days=1)
+        this_month_start = today.replace(day=1)
+        window_start = _window_start(today)
+
+        # 本月及最近7天明细
+        rows = {
+            _to_date(row.stat_date): row
+            for row in db.query(DailyStats).filter(DailyStats.stat_date >= window_start).all()
+        }
+
+        def day_value(day: date, field: str):
+            row = rows.get(day)
+            return (getattr(row, field) or 0) if row else 0
+
+        def month_sum(field: str):
+            return sum(
+                (getattr(row, field) or 0) for day, row in rows.items()
+                if day >= this_month_start
+            )
+
+        # 最近一次刷新的全量合计（零点后当日行写入前沿用前一天的快照）
+        snapshots = [row for day, row in sorted(rows.items()) if row.total_users is not None]
+        snapshot = snapshots[-1] if snapshots else DailyStats()
+
+        def total(field: str):
+            return getattr(snapshot, field) or 0
+
+        status_counts = snapshot.order_status_counts or {}
+
+        trend_days = [today - timedelta(days=i) for i in range(6, -1, -1)]
+
+        return {
+            "users": {
+                "total": int(total('total_users')),
+                "today": day_value(today, 'new_users'),
+                "yesterday": day_value(yesterday, 'new_users'),
+                "this_month": month_sum('new_users')
+            },
+            "orders": {
+                "total": int(total('total_orders')),
+                "today": day_value(today, 'order_count'),
+                "yesterday": day_value(yesterday, 'order_count'),
+                "this_month": month_sum('order_count'),
+                "pending": sum(status_counts.get(s, 0) for s in PENDING_ORDER_STATUSES)
+            },
+            "revenue": {
+                "total": float(total('total_revenue')),
+                "today": float(day_value(today, 'revenue')),
+                "this_month": float(month_sum('revenue'))
+            },
+            "projects": {
+                "total": int(total('total_projects')),
+                "active": int(total('active_projects'))
+            },
+            "recharge": {
+                "total": float(total('total_recharge')),
+                "pending_count": int(total('pending_recharge_count'))
+            },
+            "trends": {
+                "orders": [
+                    {"date": day.strftime("%m-%d"), "count": day_value(day, 'order_count')}
+                    for day in trend_days
+                ],
+                "revenue": [
+                    {"date": day.strftime("%m-%d"), "amount": float(day_value(day, 'revenue'))}
+                    for day in trend_days
+                ]
+            },
+            "order_status_distribution": [
+                {"status": s, "count": status_counts.get(s, 0)}
+                for s in DASHBOARD_ORDER_STATUSES
+            ]
+        }
+
+
+# 创建全局实例
+stats_service = StatsService()
@@ -0,0 +1,255 @@
+"""
+上传文件存储
+按块流式读取上传文件并写入磁盘：超过大小限制立即中止，文件写入在线程池中执行，不阻塞事件循环；
+文件按内容摘要保存，相同内容只保存一份，按上传者记录引用，引用全部删除后才删除文件
+"""
+import os
+import re
+import uuid
+import asyncio
+import hashlib
+import logging
+from functools import partial
+from pathlib import Path
+from typing import Optional
+
+from fastapi import UploadFile
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.upload import UploadBlob, UploadRef
+
+logger = logging.getLogger(__name__)
+
+# 内容寻址文件所在子目录
+CAS_DIR = "cas"
+_DIGEST_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+# 增加引用（内容首次出现时插入，URL 以首次上传为准）
+_ACQUIRE_SQL = text(
+    "INSERT INTO upload_blobs (digest, url, size, ref_count) VALUES (:digest, :url, :size, 1) "
+    "ON DUPLICATE KEY UPDATE ref_count = ref_count + 1"
+)
+
+# 增加上传者的引用
+_ACQUIRE_REF_SQL = text(
+    "INSERT INTO upload_refs (digest, user_id, ref_count) VALUES (:digest, :user_id, 1) "
+    "ON DUPLICATE KEY UPDATE ref_count = ref_count + 1"
+)
+
+
+class UploadTooLargeError(Exception):
+    """上传文件超过大小限制"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        super().__init__(f"文件过大。最大允许: {max_size / 1024 / 1024}MB")
+
+
+class UploadPermissionError(Exception):
+    """删除不属于自己的上传文件"""
+
+    def __init__(self):
+        super().__init__("无权删除该文件")
+
+
+class StoredFile:
+    """已保存的上传文件"""
+
+    __slots__ = ("url", "path", "size", "digest", "deduplicated")
+
+    def __init__(self, url: str, path: Path, size: int, digest: str, deduplicated: bool):
+        self.url = url
+        self.path = path
+        self.size = size
+        self.digest = digest
+        self.deduplicated = deduplicated
+
+
+class UploadStore:
+    """
+    上传文件存储
+
+    - 每次只读取 UPLOAD_CHUNK_SIZE 字节，边写临时文件边计算 SHA-256，累计大小超过 MAX_FILE_SIZE 时
+      中止并删除临时文件，单个上传占用的内存只有一个块
+    - 写完后按摘要保存到 cas/<摘要前两位>/<摘要><扩展名>；内容已存在时丢弃临时文件，返回已有URL
+    - upload_refs 表按 (摘要, 上传者) 记录引用次数，upload_blobs 表记录总引用次数：每次上传各 +1；
+      删除只能减少调用者自己持有的引用，没有引用的调用者不能删除，总引用归零时才删除文件
+    - 增加引用和删除文件都在持有 upload_blobs 行锁的事务中完成，并发的上传和删除不会删掉仍被引用的文件
+    - 同时写入的文件数受 UPLOAD_MAX_CONCURRENCY 限制（进程内所有请求共享）
+    """
+
+    def __init__(
+        self,
+        root: str = settings.UPLOAD_DIR,
+        url_prefix: str = "/static/uploads",
+        max_size: int = settings.MAX_FILE_SIZE,
+        chunk_size: int = settings.UPLOAD_CHUNK_SIZE,
+        concurrency: int = settings.UPLOAD_MAX_CONCURRENCY
+    ):
+        self.root = Path(root)
+        self.url_prefix = url_prefix.rstrip("/")
+        self.max_size = max_size
+        self.chunk_size = chunk_size
+        self._semaphore = asyncio.Semaphore(concurrency)
+        (self.root / CAS_DIR).mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    async def _run(fn, *args, **kwargs):
+        """在线程池中执行阻塞的文件/数据库操作"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(fn, *args, **kwargs))
+
+    @staticmethod
+    def _write_chunk(fh, hasher, chunk: bytes):
+        hasher.update(chunk)
+        fh.write(chunk)
+
+    def _blob_url(self, digest: str, ext: str) -> str:
+        return f"{self.url_prefix}/{CAS_DIR}/{digest[:2]}/{digest}{ext.lower()}"
+
+    async def save(self, file: UploadFile, user_id: int) -> StoredFile:
+        """
+        流式保存上传文件（内容相同的文件只保存一份），记录 user_id 的一次引用
+
+        Raises:
+            UploadTooLargeError: 文件超过大小限制（不会留下任何文件）
+        """
+        async with self._semaphore:
+            tmp_dir = self.root / CAS_DIR
+            tmp_path = tmp_dir / f".{uuid.uuid4().hex}.part"
+            fh = await self._run(open, tmp_path, "wb")
+            hasher = hashlib.sha256()
+            size = 0
+            try:
+                while True:
+                    chunk = await file.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > self.max_size:
+                        raise UploadTooLargeError(self.max_size)
+                    await self._run(self._write_chunk, fh, hasher, chunk)
+                await self._run(fh.close)
+            except BaseException:
+                fh.close()
+                tmp_path.unlink(missing_ok=True)
+                raise
+
+            digest = hasher.hexdigest()
+            url = self._blob_url(digest, Path(file.filename or "").suffix)
+            return await self._run(self._acquire, digest, url, size, tmp_path, user_id)
+
+    def _acquire(self, digest: str, url: str, size: int, tmp_path: Path, user_id: int) -> StoredFile:
+        """增加内容引用，内容首次出现时把临时文件移动到摘要路径"""
+        db = SessionLocal()
+        try:
+            # 插入或锁定该内容的行，与删除互斥（先锁 upload_blobs 再锁 upload_refs，与删除的加锁顺序一致）
+            db.execute(_ACQUIRE_SQL, {"digest": digest, "url": url, "size": size})
+            db.execute(_ACQUIRE_REF_SQL, {"digest": digest, "user_id": user_id})
+            url = db.query(UploadBlob.url).filter(UploadBlob.digest == digest).scalar()
+            path = self.path_for(url)
+
+            deduplicated = path.exists()
+            if deduplicated:
+                tmp_path.unlink(missing_ok=True)
+            else:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp_path, path)
+
+            db.commit()
+            return StoredFile(url=url, path=path, size=size, digest=digest, deduplicated=deduplicated)
+        except BaseException:
+            db.rollback()
+            tmp_path.unlink(missing_ok=True)
+            raise
+        finally:
+            db.close()
+
+    def path_for(self, url: str) -> Optional[Path]:
+        """URL 对应的本地路径，不属于上传目录时返回 None"""
+        if not url.startswith(self.url_prefix + "/"):
+            return None
+        path = (self.root / url[len(self.url_prefix) + 1:]).resolve()
+        if self.root.resolve() not in path.parents:
+            return None
+        return path
+
+    def _digest_for(self, path: Path) -> Optional[str]:
+        """内容寻址文件的摘要（按日期目录保存的旧文件返回 None）"""
+        if path.parent.parent != (self.root / CAS_DIR).resolve():
+            return None
+        return path.stem if _DIGEST_PATTERN.match(path.stem) else None
+
+    def _release(self, path: Path, digest: Optional[str], user_id: int) -> bool:
+        """
+        减少 user_id 持有的一次引用，最后一个引用删除时删除文件
+
+        Raises:
+            UploadPermissionError: 调用者没有该内容的引用（含未记录上传者的旧文件）
+        """
+        if digest is None:
+            # 按日期目录保存的旧文件没有上传者记录
+            if not path.exists():
+                return False
+            raise UploadPermissionError()
+
+        db = SessionLocal()
+        try:
+            blob = db.query(UploadBlob).filter(UploadBlob.digest == digest).with_for_update().first()
+            if blob is None:
+                return False
+
+            ref = db.query(UploadRef).filter(
+                UploadRef.digest == digest,
+                UploadRef.user_id == user_id
+            ).with_for_update().first()
+            if ref is None or ref.ref_count < 1:
+                raise UploadPermissionError()
+
+            if ref.ref_count > 1:
+                ref.ref_count -= 1
+            else:
+                db.delete(ref)
+
+            if blob.ref_count > 1:
+                blob.ref_count -= 1
+                db.commit()
+                return True
+
+            # 持有行锁时删除文件，并发上传会等待本事务提交后重新写入文件
+            db.delete(blob)
+            self._unlink(path)
+            db.commit()
+            logger.info("上传文件已删除", extra={"digest": digest})
+            return True
+        except BaseException:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    @staticmethod
+    def _unlink(path: Path) -> bool:
+        try:
+            path.unlink()
+            return True
+        except FileNotFoundError:
+            return False
+
+    async def delete(self, url: str, user_id: int) -> bool:
+        """
+        删除 user_id 的一次上传（总引用归零时删除文件），文件不存在时返回 False
+
+        Raises:
+            UploadPermissionError: 调用者没有上传过该文件
+        """
+        path = self.path_for(url)
+        if path is None:
+            raise ValueError("无效的图片URL")
+        return await self._run(self._release, path, self._digest_for(path), user_id)
+
+
+# 创建全局实例
+upload_store = UploadStore()
@@ -0,0 +1,160 @@
+"""
+项目浏览量计数服务
+浏览量先在内存（或Redis）中累加，定时批量写回数据库，
+避免详情接口每次访问都对 projects 表加行锁写入
+"""
+import asyncio
+import logging
+import threading
+import uuid
+from typing import Dict, Optional
+
+from sqlalchemy import update, case, func
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.redis import get_redis, redis_configured
+from app.models.project import Project
+
+logger = logging.getLogger(__name__)
+
+# Redis中的计数哈希（field为项目ID）
+REDIS_VIEWS_KEY = "project:views:pending"
+REDIS_FLUSHING_PREFIX = "project:views:flushing:"
+
+
+class ViewCounter:
+    """
+    浏览量缓冲计数器
+
+    - 未配置Redis时在进程内存中累加，进程崩溃最多丢失一个刷新周期的计数
+    - 配置Redis后计数写入Redis哈希，多进程共享，由任意进程刷新
+    - 每 VIEW_COUNT_FLUSH_SECONDS 秒用一条 UPDATE ... CASE 批量写回
+    """
+
+    def __init__(self):
+        self.flush_interval = settings.VIEW_COUNT_FLUSH_SECONDS
+        self._pending: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def incr(self, project_id: int, amount: int = 1) -> int:
+        """
+        记录一次浏览（同步，配置Redis时会访问网络，异步接口使用 record_view）
+
+        Returns:
+            int: 该项目尚未写回数据库的浏览量（含本次）
+        """
+        redis_client = get_redis()
+        if redis_client is not None:
+            try:
+                # HINCRBY 返回累加后的值，一次往返同时完成计数和读取
+                count = int(redis_client.hincrby(REDIS_VIEWS_KEY, project_id, amount))
+                with self._lock:
+                    return count + self._pending.get(project_id, 0)
+            except Exception as e:
+                logger.warning(f"Redis浏览量计数失败，改用内存计数: {str(e)}")
+
+        with self._lock:
+            self._pending[project_id] = self._pending.get(project_id, 0) + amount
+            return self._pending[project_id]
+
+    async def record_view(self, project_id: int) -> int:
+        """
+        记录一次浏览并返回尚未写回数据库的浏览量（用于详情页展示实时浏览量）
+
+        配置Redis时在线程池中执行，不阻塞事件循环
+        """
+        if not redis_configured():
+            return self.incr(project_id)
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self.incr, project_id)
+
+    def _drain(self) -> Dict[int, int]:
+        """取出所有待写回的计数（内存 + Redis）"""
+        with self._lock:
+            counts, self._pending = self._pending, {}
+
+        redis_client = get_redis()
+        if redis_client is not None:
+            try:
+                # RENAME是原子操作，之后的新计数写入新的哈希；
+                # 每次刷新使用独立的临时键，多进程同时刷新互不覆盖
+                flushing_key = f"{REDIS_FLUSHING_PREFIX}{uuid.uuid4().hex}"
+                if redis_client.exists(REDIS_VIEWS_KEY):
+                    redis_client.rename(REDIS_VIEWS_KEY, flushing_key)
+                    for project_id, count in redis_client.hgetall(flushing_key).items():
+                        counts[int(project_id)] = counts.get(int(project_id), 0) + int(count)
+                    redis_client.delete(flushing_key)
+            except Exception as e:
+                logger.warning(f"读取Redis浏览量失败: {str(e)}")
+
+        return counts
+
+    def _restore(self, counts: Dict[int, int]):
+        """写回失败时把计数放回内存缓冲，下个周期重试"""
+        with self._lock:
+            for project_id, count in counts.items():
+                self._pending[project_id] = self._pending.get(project_id, 0) + count
+
+    def flush(self) -> int:
+        """
+        把缓冲的浏览量写回数据库
+
+        Returns:
+            int: 本次更新的项目数量
+        """
+        counts = {pid: c for pid, c in self._drain().items() if c}
+        if not counts:
+            return 0
+
+        db = SessionLocal()
+        try:
+            # UPDATE projects SET view_count = view_count + CASE id WHEN .. THEN .. END WHERE id IN (..)
+            db.execute(
+                update(Project)
+                .where(Project.id.in_(list(counts.keys())))
+                .values(view_count=func.coalesce(Project.view_count, 0) + case(counts, value=Project.id, else_=0))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            return len(counts)
+        except Exception as e:
+            db.rollback()
+            self._restore(counts)
+            logger.error(f"浏览量写回失败: {str(e)}")
+            return 0
+        finally:
+            db.close()
+
+    async def _run(self):
+        """后台定时刷新任务"""
+        loop = asyncio.get_event_loop()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await loop.run_in_executor(None, self.flush)
+            except Exception as e:
+                logger.error(f"浏览量刷新任务异常: {str(e)}")
+
+    def start(self):
+        """启动后台刷新任务（在应用启动时调用）"""
+        if self._task is None:
+            self._task = asyncio.get_event_loop().create_task(self._run())
+
+    async def stop(self):
+        """停止后台刷新任务并写回剩余计数（在应用关闭时调用）"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, self.flush)
+
+
+# 创建全局实例
+view_counter = ViewCounter()
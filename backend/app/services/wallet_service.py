@@ -0,0 +1,179 @@
+"""
+钱包服务
+预付余额的扣款/入账：条件 UPDATE 原子修改余额，每次变动追加一条流水，支持幂等键
+"""
+import logging
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+from app.models.wallet import WalletTransaction
+from app.services.auth_cache import auth_cache
+
+logger = logging.getLogger(__name__)
+
+
+class InsufficientBalanceError(Exception):
+    """余额不足"""
+
+    def __init__(self, balance: Decimal, amount: Decimal):
+        self.balance = balance
+        self.amount = amount
+        super().__init__(f"余额不足，当前余额：¥{balance}，需要支付：¥{amount}")
+
+
+class WalletService:
+    """
+    钱包服务
+
+    - 扣款：UPDATE users SET prepaid_balance = prepaid_balance - :amount WHERE prepaid_balance >= :amount，
+      不需要先查询余额再写回，并发扣款不会透支
+    - 所有余额变动都经过 debit/credit（异步会话）或 debit_sync/credit_sync（同步会话），
+      不允许读出余额后在 Python 中修改再写回（会覆盖并发的条件扣款）
+    - 所有方法只 flush 不提交，由调用方与业务数据在同一个事务中提交；
+      扣款应放在事务的最后一步执行，缩短用户行锁的持有时间
+    - 幂等键写入流水表的唯一索引 (user_id, idempotency_key)，重复请求在插入流水时冲突
+    """
+
+    async def find_by_idempotency_key(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        idempotency_key: Optional[str]
+    ) -> Optional[WalletTransaction]:
+        """查询幂等键对应的流水（用于重试时返回原结果）"""
+        if not idempotency_key:
+            return None
+        return (await db.execute(
+            select(WalletTransaction).where(
+                WalletTransaction.user_id == user_id,
+                WalletTransaction.idempotency_key == idempotency_key
+            )
+        )).scalar_one_or_none()
+
+    @staticmethod
+    def _balance(db: Session, user_id: int) -> Decimal:
+        balance = db.execute(
+            select(User.prepaid_balance).where(User.id == user_id)
+        ).scalar_one_or_none()
+        return balance or Decimal("0")
+
+    async def debit(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        amount: Decimal,
+        biz_type: str,
+        biz_no: Optional[str] = None,
+        idempotency_key: Optional[str] = None,
+        remark: Optional[str] = None,
+        count_as_spending: bool = False
+    ) -> WalletTransaction:
+        """
+        扣款
+
+        Args:
+            count_as_spending: 是否计入用户累计消费金额和订单数
+
+        Raises:
+            InsufficientBalanceError: 余额不足（余额未变动）
+            IntegrityError: 幂等键重复（调用方回滚后按幂等键返回原结果）
+        """
+        return await db.run_sync(lambda session: self.debit_sync(
+            session, user_id, amount, biz_type, biz_no, idempotency_key, remark, count_as_spending
+        ))
+
+    def debit_sync(
+        self,
+        db: Session,
+        user_id: int,
+        amount: Decimal,
+        biz_type: str,
+        biz_no: Optional[str] = None,
+        idempotency_key: Optional[str] = None,
+        remark: Optional[str] = None,
+        count_as_spending: bool = False
+    ) -> WalletTransaction:
+        """扣款（同步会话）"""
+        values = {"prepaid_balance": User.prepaid_balance - amount}
+        if count_as_spending:
+            values["total_spent"] = func.coalesce(User.total_spent, 0) + amount
+            values["total_orders"] = func.coalesce(User.total_orders, 0) + 1
+
+        result = db.execute(
+            update(User)
+            .where(User.id == user_id, User.prepaid_balance >= amount)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            raise InsufficientBalanceError(self._balance(db, user_id), amount)
+
+        return self._append(db, user_id, -amount, biz_type, biz_no, idempotency_key, remark)
+
+    async def credit(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        amount: Decimal,
+        biz_type: str,
+        biz_no: Optional[str] = None,
+        idempotency_key: Optional[str] = None,
+        remark: Optional[str] = None
+    ) -> WalletTransaction:
+        """入账（充值、退款、奖励等）"""
+        return await db.run_sync(lambda session: self.credit_sync(
+            session, user_id, amount, biz_type, biz_no, idempotency_key, remark
+        ))
+
+    def credit_sync(
+        self,
+        db: Session,
+        user_id: int,
+        amount: Decimal,
+        biz_type: str,
+        biz_no: Optional[str] = None,
+        idempotency_key: Optional[str] = None,
+        remark: Optional[str] = None
+    ) -> WalletTransaction:
+        """入账（同步会话）"""
+        db.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(prepaid_balance=func.coalesce(User.prepaid_balance, 0) + amount)
+            .execution_options(synchronize_session=False)
+        )
+        return self._append(db, user_id, amount, biz_type, biz_no, idempotency_key, remark)
+
+    def _append(
+        self,
+        db: Session,
+        user_id: int,
+        amount: Decimal,
+        biz_type: str,
+        biz_no: Optional[str],
+        idempotency_key: Optional[str],
+        remark: Optional[str]
+    ) -> WalletTransaction:
+        """追加流水（此时本事务已持有用户行锁，读到的余额即变动后余额）"""
+        auth_cache.invalidate_on_commit(db, user_id)
+        transaction = WalletTransaction(
+            user_id=user_id,
+            amount=amount,
+            balance_after=self._balance(db, user_id),
+            biz_type=biz_type,
+            biz_no=biz_no,
+            idempotency_key=idempotency_key or None,
+            remark=remark
+        )
+        db.add(transaction)
+        db.flush()
+        return transaction
+
+
+# 创建全局实例
+wallet_service = WalletService()
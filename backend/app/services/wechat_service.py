@@ -1,10 +1,11 @@
 """
 微信小程序登录服务
 """
-import httpx
 import logging
-from typing import Optional, Dict
+from typing import Optional, Dict, Tuple
 from app.core.config import settings
+from app.core.credential_cache import CredentialCache
+from app.core.http_client import HTTPClientManager, http_client
 
 logger = logging.getLogger(__name__)
 
@@ -12,10 +13,18 @@ logger = logging.getLogger(__name__)
 class WechatService:
     """微信小程序服务"""
     
-    def __init__(self):
+    def __init__(self, http: HTTPClientManager = http_client):
+        self.http = http
         self.appid = settings.WECHAT_APPID
         self.secret = settings.WECHAT_SECRET
         self.code2session_url = "https://api.weixin.qq.com/sns/jscode2session"
+        self.access_token_url = "https://api.weixin.qq.com/cgi-bin/token"
+        # 凭证缓存：access_token（按有效期提前刷新，多进程共享）；登录code的并发请求合并
+        self.credentials = CredentialCache(
+            name="wechat",
+            refresh_margin=settings.WECHAT_CREDENTIAL_REFRESH_MARGIN_SECONDS,
+            max_entries=settings.WECHAT_CREDENTIAL_CACHE_MAX_ENTRIES
+        )
     
     async def code_to_session(self, code: str) -> Dict:
         """
@@ -45,24 +54,13 @@ class WechatService:
                     "errmsg": "ok"
                 }
             
-            # 调用微信API
-            params = {
-                "appid": self.appid,
-                "secret": self.secret,
-                "js_code": code,
-                "grant_type": "authorization_code"
-            }
-            
-            async with httpx.AsyncClient() as client:
-                response = await client.get(self.code2session_url, params=params)
-                result = response.json()
-                
-                if "errcode" in result and result["errcode"] != 0:
-                    logger.error(f"微信code2session失败: {result}")
-                    return result
-                
-                logger.info(f"微信code2session成功: openid={result.get('openid')}")
-                return result
+            # 同一个code的并发请求（客户端重复提交）共享一次微信调用；
+            # code只能使用一次，结果含session_key，调用结束后不缓存
+            result = await self.credentials.single_flight(
+                f"code:{code}",
+                lambda: self._fetch_session(code)
+            )
+            return dict(result)
                 
         except Exception as e:
             logger.error(f"微信code2session异常: {str(e)}")
@@ -70,6 +68,57 @@ class WechatService:
                 "errcode": -1,
                 "errmsg": f"请求失败: {str(e)}"
             }
+    
+    async def _fetch_session(self, code: str) -> Dict:
+        """调用微信code2session"""
+        params = {
+            "appid": self.appid,
+            "secret": self.secret,
+            "js_code": code,
+            "grant_type": "authorization_code"
+        }
+        
+        # code只能使用一次，仅在请求未发出时重试
+        response = await self.http.get(self.code2session_url, params=params, idempotent=False)
+        result = response.json()
+        
+        if "errcode" in result and result["errcode"] != 0:
+            logger.error(f"微信code2session失败: {result}")
+            return result
+        
+        logger.info(f"微信code2session成功: openid={result.get('openid')}")
+        return result
+    
+    async def get_access_token(self, force_refresh: bool = False) -> Optional[str]:
+        """
+        获取小程序接口调用凭证 access_token
+        
+        Args:
+            force_refresh: 接口返回凭证失效（40001/42001）时传入，强制刷新
+            
+        Returns:
+            access_token，获取失败返回None
+        """
+        return await self.credentials.get("access_token", self._fetch_access_token, force_refresh)
+    
+    async def _fetch_access_token(self) -> Tuple[Optional[str], Optional[float]]:
+        """调用微信接口获取 access_token"""
+        try:
+            response = await self.http.get(self.access_token_url, params={
+                "grant_type": "client_credential",
+                "appid": self.appid,
+                "secret": self.secret
+            })
+            result = response.json()
+        except Exception as e:
+            logger.error(f"获取微信access_token异常: {str(e)}")
+            return None, None
+        
+        if not result.get("access_token"):
+            logger.error(f"获取微信access_token失败: {result}")
+            return None, None
+        
+        return result["access_token"], result.get("expires_in", 7200)
 
 
 # 创建全局实例
@@ -2,25 +2,29 @@
 微信支付服务
 """
 import time
+import logging
 import hashlib
 import random
 import string
 import httpx
 import xml.etree.ElementTree as ET
-from decimal import Decimal
 from datetime import datetime
 from typing import Dict, Optional
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
+from app.core.http_client import HTTPClientManager, http_client
 from app.models.order import Order, Payment
 from app.models.recharge import RechargeRecord, RechargeStatus
+from app.services.wallet_service import wallet_service
 
+logger = logging.getLogger(__name__)
 
 class WeChatPayService:
     """微信支付服务"""
     
-    def __init__(self):
+    def __init__(self, http: HTTPClientManager = http_client):
+        self.http = http
         # 微信小程序支付配置
         self.app_id = getattr(settings, 'WECHAT_APPID', 'wx2ef4744e64c7bc45')
         self.mch_id = getattr(settings, 'WECHAT_MCH_ID', '')  # 商户号
@@ -54,9 +58,6 @@ class WeChatPayService:
         # 添加API密钥
         string_sign_temp = f"{string_a}&key={self.api_key}"
         
-        # 打印签名调试信息
-        print(f"[签名] 待签名字符串: {string_sign_temp}")
-        
         # MD5加密
         if sign_type == 'MD5':
             sign = hashlib.md5(string_sign_temp.encode('utf-8')).hexdigest().upper()
@@ -64,8 +65,6 @@ class WeChatPayService:
             # HMAC-SHA256或其他签名方式
             sign = hashlib.md5(string_sign_temp.encode('utf-8')).hexdigest().upper()
         
-        print(f"[签名] 生成的签名: {sign}")
-        
         return sign
     
     def dict_to_xml(self, params: Dict) -> str:
@@ -102,7 +101,7 @@ class WeChatPayService:
                 result[child.tag] = child.text
             return result
         except Exception as e:
-            print(f"XML解析失败: {str(e)}")
+            logger.error(f"XML解析失败: {str(e)}")
             return {}
     
     async def call_wechat_unifiedorder(self, params: Dict) -> Dict:
@@ -120,51 +119,51 @@ class WeChatPayService:
         # 构建XML请求
         xml_data = self.dict_to_xml(params)
         
-        print(f"[微信支付] 发送统一下单请求到: {url}")
-        print(f"[微信支付] 完整请求XML:")
-        print(xml_data)
+        logger.debug("微信统一下单请求", extra={"url": url, "request_xml": xml_data})
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    url,
-                    content=xml_data.encode('utf-8'),
-                    headers={
-                        'Content-Type': 'text/xml; charset=utf-8',
-                        'User-Agent': 'wxpay sdk python v1.0'
-                    }
-                )
-                
-                print(f"[微信支付] 响应状态码: {response.status_code}")
-                print(f"[微信支付] 响应原始XML:")
-                print(response.text)
-                
-                if response.status_code != 200:
-                    raise Exception(f"微信API返回错误状态码: {response.status_code}")
-                
-                # 解析XML响应
-                result = self.xml_to_dict(response.text)
-                
-                print(f"[微信支付] 响应解析数据: {result}")
-                
-                # 验证签名
-                if result.get('return_code') == 'SUCCESS':
-                    # 验证响应签名
-                    response_sign = result.get('sign', '')
-                    calculated_sign = self.generate_sign(result)
-                    
-                    if response_sign != calculated_sign:
-                        print(f"[微信支付] 警告：响应签名验证失败")
-                        print(f"  响应签名: {response_sign}")
-                        print(f"  计算签名: {calculated_sign}")
-                
-                return result
+            # 同一商户订单号重复下单返回相同的预支付信息，超时可以安全重试
+            response = await self.http.post(
+                url,
+                content=xml_data.encode('utf-8'),
+                headers={
+                    'Content-Type': 'text/xml; charset=utf-8',
+                    'User-Agent': 'wxpay sdk python v1.0'
+                },
+                timeout=30.0,
+                idempotent=True
+            )
+            
+            logger.debug(
+                "微信统一下单响应",
+                extra={"status_code": response.status_code, "response_xml": response.text}
+            )
+            
+            if response.status_code != 200:
+                raise Exception(f"微信API返回错误状态码: {response.status_code}")
+            
+            # 解析XML响应
+            result = self.xml_to_dict(response.text)
+            
+            # 验证签名
+            if result.get('return_code') == 'SUCCESS':
+                # 验证响应签名
+                response_sign = result.get('sign', '')
+                calculated_sign = self.generate_sign(result)
                 
+                if response_sign != calculated_sign:
+                    logger.warning(
+                        "微信统一下单响应签名验证失败",
+                        extra={"out_trade_no": params.get('out_trade_no')}
+                    )
+            
+            return result
+            
         except httpx.TimeoutException:
-            print("[微信支付] 请求超时")
+            logger.error("微信统一下单请求超时", extra={"out_trade_no": params.get('out_trade_no')})
             raise Exception("微信支付请求超时")
         except Exception as e:
-            print(f"[微信支付] 调用统一下单API失败: {str(e)}")
+            logger.error(f"调用微信统一下单API失败: {str(e)}", extra={"out_trade_no": params.get('out_trade_no')})
             raise
     
     async def create_jsapi_payment(
@@ -197,11 +196,10 @@ class WeChatPayService:
         if total_fee <= 0:
             raise ValueError(f"订单支付金额必须大于0，当前金额: {order.total_amount - order.paid_amount}")
         
-        print(f"[订单支付] 创建微信支付订单:")
-        print(f"  - 订单号: {order.order_no}")
-        print(f"  - 支付金额: {order.total_amount - order.paid_amount}元 ({total_fee}分)")
-        print(f"  - 用户OpenID: {openid}")
-        print(f"  - 商户号: {self.mch_id}")
+        logger.info(
+            "创建订单微信支付",
+            extra={"order_no": order.order_no, "total_fee": total_fee, "user_id": user_id}
+        )
         
         # 统一下单参数
         params = {
@@ -220,8 +218,6 @@ class WeChatPayService:
         # 生成签名
         params['sign'] = self.generate_sign(params)
         
-        print(f"[订单支付] 统一下单参数: {params}")
-        
         try:
             # 调用微信统一下单API
             result = await self.call_wechat_unifiedorder(params)
@@ -229,13 +225,16 @@ class WeChatPayService:
             # 检查返回状态
             if result.get('return_code') != 'SUCCESS':
                 error_msg = result.get('return_msg', '未知错误')
-                print(f"[订单支付] 统一下单失败: {error_msg}")
+                logger.warning(f"订单支付统一下单失败: {error_msg}", extra={"order_no": order.order_no})
                 raise Exception(f"微信支付统一下单失败: {error_msg}")
             
             if result.get('result_code') != 'SUCCESS':
                 error_code = result.get('err_code', '')
                 error_desc = result.get('err_code_des', '未知错误')
-                print(f"[订单支付] 支付失败: {error_code} - {error_desc}")
+                logger.warning(
+                    f"订单支付下单失败: {error_code} - {error_desc}",
+                    extra={"order_no": order.order_no}
+                )
                 raise Exception(f"微信支付错误: {error_desc}")
             
             # 获取prepay_id
@@ -243,10 +242,8 @@ class WeChatPayService:
             if not prepay_id:
                 raise Exception("未获取到prepay_id")
             
-            print(f"[订单支付] 获取prepay_id成功: {prepay_id}")
-            
         except Exception as e:
-            print(f"[订单支付] 调用微信API异常: {str(e)}")
+            logger.error(f"订单支付调用微信API异常: {str(e)}", extra={"order_no": order.order_no})
             raise Exception(f"创建支付订单失败: {str(e)}")
         
         # 生成小程序支付参数
@@ -264,8 +261,6 @@ class WeChatPayService:
         # 生成支付签名
         pay_params['paySign'] = self.generate_sign(pay_params)
         
-        print(f"[订单支付] 返回支付参数: appId={pay_params['appId']}, timeStamp={timestamp}, package={pay_params['package']}")
-        
         return pay_params
     
     
@@ -290,7 +285,7 @@ class WeChatPayService:
             calculated_sign = self.generate_sign(notify_data)
             
             if sign != calculated_sign:
-                print('微信支付回调签名验证失败')
+                logger.warning("微信支付回调签名验证失败", extra={"out_trade_no": notify_data.get('out_trade_no')})
                 return False
             
             # 获取支付结果
@@ -310,7 +305,7 @@ class WeChatPayService:
             ).first()
             
             if not order:
-                print(f'订单不存在: {out_trade_no}')
+                logger.warning(f"微信支付回调订单不存在: {out_trade_no}")
                 return False
             
             # 检查订单是否已支付
@@ -335,10 +330,11 @@ class WeChatPayService:
             
             db.commit()
             
+            logger.info("订单微信支付成功", extra={"order_no": out_trade_no, "transaction_id": transaction_id})
             return True
             
         except Exception as e:
-            print(f'处理微信支付回调失败: {str(e)}')
+            logger.exception(f"处理微信支付回调失败: {str(e)}")
             db.rollback()
             return False
     
@@ -372,12 +368,10 @@ class WeChatPayService:
         if not self.mch_id or not self.api_key:
             raise ValueError("未配置微信支付商户号或密钥，请在.env文件中配置WECHAT_MCH_ID和WECHAT_PAY_KEY")
         
-        # 打印调试信息
-        print(f"[充值] 创建微信支付订单:")
-        print(f"  - 充值单号: {recharge.recharge_no}")
-        print(f"  - 充值金额: {recharge.amount}元 ({total_fee}分)")
-        print(f"  - 用户OpenID: {openid}")
-        print(f"  - 商户号: {self.mch_id}")
+        logger.info(
+            "创建充值微信支付",
+            extra={"recharge_no": recharge.recharge_no, "total_fee": total_fee, "user_id": user_id}
+        )
         
         # 统一下单参数
         params = {
@@ -396,8 +390,6 @@ class WeChatPayService:
         # 生成签名
         params['sign'] = self.generate_sign(params)
         
-        print(f"[充值] 统一下单参数: {params}")
-        
         try:
             # 调用微信统一下单API
             result = await self.call_wechat_unifiedorder(params)
@@ -405,13 +397,16 @@ class WeChatPayService:
             # 检查返回状态
             if result.get('return_code') != 'SUCCESS':
                 error_msg = result.get('return_msg', '未知错误')
-                print(f"[充值] 统一下单失败: {error_msg}")
+                logger.warning(f"充值统一下单失败: {error_msg}", extra={"recharge_no": recharge.recharge_no})
                 raise Exception(f"微信支付统一下单失败: {error_msg}")
             
             if result.get('result_code') != 'SUCCESS':
                 error_code = result.get('err_code', '')
                 error_desc = result.get('err_code_des', '未知错误')
-                print(f"[充值] 支付失败: {error_code} - {error_desc}")
+                logger.warning(
+                    f"充值下单失败: {error_code} - {error_desc}",
+                    extra={"recharge_no": recharge.recharge_no}
+                )
                 raise Exception(f"微信支付错误: {error_desc}")
             
             # 获取prepay_id
@@ -419,10 +414,8 @@ class WeChatPayService:
             if not prepay_id:
                 raise Exception("未获取到prepay_id")
             
-            print(f"[充值] 获取prepay_id成功: {prepay_id}")
-            
         except Exception as e:
-            print(f"[充值] 调用微信API异常: {str(e)}")
+            logger.error(f"充值调用微信API异常: {str(e)}", extra={"recharge_no": recharge.recharge_no})
             raise Exception(f"创建支付订单失败: {str(e)}")
         
         # 生成小程序支付参数
@@ -440,8 +433,6 @@ class WeChatPayService:
         # 生成支付签名
         pay_params['paySign'] = self.generate_sign(pay_params)
         
-        print(f"[充值] 返回支付参数: appId={pay_params['appId']}, timeStamp={timestamp}, package={pay_params['package']}")
-        
         return pay_params
     
     async def handle_recharge_notify(
@@ -465,7 +456,7 @@ class WeChatPayService:
             calculated_sign = self.generate_sign(notify_data)
             
             if sign != calculated_sign:
-                print('充值支付回调签名验证失败')
+                logger.warning("充值支付回调签名验证失败", extra={"out_trade_no": notify_data.get('out_trade_no')})
                 return False
             
             # 获取支付结果
@@ -480,28 +471,28 @@ class WeChatPayService:
             transaction_id = notify_data.get('transaction_id')
             
             # 查询充值记录
+            # 锁定充值记录，重复回调串行处理，余额只增加一次
             recharge = db.query(RechargeRecord).filter(
                 RechargeRecord.recharge_no == out_trade_no
-            ).first()
+            ).with_for_update().first()
             
             if not recharge:
-                print(f'充值记录不存在: {out_trade_no}')
+                logger.warning(f"充值支付回调记录不存在: {out_trade_no}")
                 return False
             
             # 检查是否已处理
             if recharge.status == RechargeStatus.SUCCESS:
                 return True
             
-            # 更新用户余额
-            from app.models.user import User
-            user = db.query(User).filter(User.id == recharge.user_id).first()
-            
-            if not user:
-                print(f'用户不存在: {recharge.user_id}')
-                return False
-            
-            # 增加余额（充值金额+赠送金额）
-            user.prepaid_balance = (user.prepaid_balance or Decimal("0")) + recharge.actual_amount
+            # 增加余额（充值金额+赠送金额），原子更新并记录钱包流水
+            wallet_service.credit_sync(
+                db,
+                recharge.user_id,
+                recharge.actual_amount,
+                biz_type="recharge",
+                biz_no=recharge.recharge_no,
+                remark="微信支付充值"
+            )
             
             # 更新充值记录状态
             recharge.status = RechargeStatus.SUCCESS
@@ -511,12 +502,20 @@ class WeChatPayService:
             
             db.commit()
             
-            print(f'充值成功: 用户{user.id}, 充值{float(recharge.amount)}元, 实际到账{float(recharge.actual_amount)}元')
+            logger.info(
+                "充值成功",
+                extra={
+                    "recharge_no": out_trade_no,
+                    "user_id": recharge.user_id,
+                    "amount": float(recharge.amount),
+                    "actual_amount": float(recharge.actual_amount)
+                }
+            )
             
             return True
             
         except Exception as e:
-            print(f'处理充值支付回调失败: {str(e)}')
+            logger.exception(f"处理充值支付回调失败: {str(e)}")
             db.rollback()
             return False
 
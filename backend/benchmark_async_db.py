@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+同步/异步数据库会话并发基准测试
+
+模拟 async def 路由中执行慢查询（SELECT SLEEP）：
+- 同步会话：查询阻塞事件循环，并发请求被串行执行
+- 异步会话：查询期间让出事件循环，并发请求同时等待数据库
+
+用法:
+    python benchmark_async_db.py --concurrency 20 --sleep 0.2
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import text
+
+from app.core.database import SessionLocal, AsyncSessionLocal, async_engine
+
+
+async def sync_handler(seconds: float):
+    """使用同步会话的 async 路由（当前写法）"""
+    db = SessionLocal()
+    try:
+        db.execute(text("SELECT SLEEP(:s)"), {"s": seconds})
+    finally:
+        db.close()
+
+
+async def async_handler(seconds: float):
+    """使用异步会话的 async 路由"""
+    async with AsyncSessionLocal() as db:
+        await db.execute(text("SELECT SLEEP(:s)"), {"s": seconds})
+
+
+async def run(name: str, handler, concurrency: int, rounds: int, seconds: float):
+    """并发执行 rounds 轮，每轮 concurrency 个请求"""
+    # 预热连接池
+    await asyncio.gather(*[handler(0) for _ in range(concurrency)])
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*[handler(seconds) for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    total = concurrency * rounds
+    print(f"{name:<8} 请求数: {total:<6} 耗时: {elapsed:7.2f}s  吞吐量: {total / elapsed:8.1f} req/s")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="同步/异步数据库会话并发基准测试")
+    parser.add_argument("--concurrency", type=int, default=20, help="并发请求数（不超过连接池大小）")
+    parser.add_argument("--rounds", type=int, default=5, help="执行轮数")
+    parser.add_argument("--sleep", type=float, default=0.2, help="每个慢查询耗时（秒）")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"并发 {args.concurrency}，每个查询 SLEEP({args.sleep})，共 {args.rounds} 轮")
+    print("=" * 60)
+
+    await run("同步会话", sync_handler, args.concurrency, args.rounds, args.sleep)
+    await run("异步会话", async_handler, args.concurrency, args.rounds, args.sleep)
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
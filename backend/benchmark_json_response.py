@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+JSON响应序列化基准测试
+
+构造与项目列表、后台订单列表相同结构的大列表响应，比较两种渲染方式的CPU耗时：
+- 原实现：Decimal 逐个 float()、datetime 逐个 isoformat() 后返回 dict，
+  FastAPI 调用 jsonable_encoder 遍历整个响应体，再由标准库 json 序列化（starlette JSONResponse）
+- 现实现：Response.success 直接返回 FastJSONResponse，由 orjson 原生序列化 Decimal/datetime
+
+只测试序列化本身，不需要数据库。
+
+用法:
+    python benchmark_json_response.py --items 1000 --rounds 200
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+from app.core.response import Response
+
+
+def make_rows(count: int) -> list:
+    """模拟 ORM 读出的行：金额为 Decimal，时间为 datetime"""
+    now = datetime.now()
+    return [
+        {
+            "id": i + 1,
+            "project_no": f"P{i + 1:08d}",
+            "name": f"X射线衍射分析 {i + 1}",
+            "category_id": i % 20 + 1,
+            "category_name": "材料测试",
+            "original_price": Decimal("380.00"),
+            "current_price": Decimal("299.50"),
+            "unit": "样",
+            "cover_image": f"/static/uploads/cas/ab/{i:064x}.jpg",
+            "status": "active",
+            "is_hot": i % 3 == 0,
+            "is_recommended": i % 5 == 0,
+            "view_count": i * 7,
+            "booking_count": i * 3,
+            "sort_order": i,
+            "created_at": now - timedelta(minutes=i)
+        }
+        for i in range(count)
+    ]
+
+
+def render_before(rows: list, total: int) -> bytes:
+    """手工转换 + jsonable_encoder + 标准库 json"""
+    data = {
+        "list": [{
+            **row,
+            "original_price": float(row["original_price"]),
+            "current_price": float(row["current_price"]),
+            "created_at": row["created_at"].isoformat() if row["created_at"] else None
+        } for row in rows],
+        "total": total,
+        "page": 1,
+        "page_size": len(rows)
+    }
+    content = {"code": 200, "message": "操作成功", "data": data}
+    return JSONResponse(content=jsonable_encoder(content)).body
+
+
+def render_after(rows: list, total: int) -> bytes:
+    """Response.success 直接渲染"""
+    return Response.success(data={
+        "list": [dict(row) for row in rows],
+        "total": total,
+        "page": 1,
+        "page_size": len(rows)
+    }).body
+
+
+def measure(render, rows: list, rounds: int) -> float:
+    """平均每次渲染的CPU耗时（毫秒）"""
+    started = time.process_time()
+    for _ in range(rounds):
+        render(rows, len(rows))
+    return (time.process_time() - started) / rounds * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON响应序列化基准测试")
+    parser.add_argument("--items", type=int, nargs="+", default=[100, 1000, 5000], help="列表条数")
+    parser.add_argument("--rounds", type=int, default=200, help="每种情况的渲染次数")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"每种情况渲染 {args.rounds} 次（CPU时间）")
+    print("=" * 60)
+
+    ok = True
+    for count in args.items:
+        rows = make_rows(count)
+        before_body = render_before(rows, count)
+        after_body = render_after(rows, count)
+        same = json.loads(before_body) == json.loads(after_body)
+        ok = ok and same
+
+        before = measure(render_before, rows, args.rounds)
+        after = measure(render_after, rows, args.rounds)
+        print(f"{count:>6} 条  原实现: {before:8.2f}ms  orjson: {after:8.2f}ms  "
+              f"节省: {(1 - after / before) * 100:5.1f}%  ({before / after:.1f}x)  "
+              f"响应体: {len(after_body) / 1024:.0f}KB  内容一致: {same}")
+
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+下单写入基准测试
+
+分别用两种方式写入同样的订单（1 / 10 / 100 个样品），统计每单执行的SQL数量和耗时：
+- 逐行写入（原实现）：db.add 订单 + flush 取ID，样品、费用明细、状态记录逐个 db.add，提交后 refresh
+- 批量写入：order_writer 一条 INSERT 写订单，样品、费用明细各一条多行 INSERT，状态记录一条 INSERT
+
+每单在事务内写入后回滚，不会在数据库中留下测试数据（因此不含提交本身的耗时，两种方式都只提交一次）
+
+用法:
+    python benchmark_order_create.py --user-id 1 --rounds 50
+    python benchmark_order_create.py --user-id 1 --samples 1 10 100 500
+"""
+import argparse
+import asyncio
+import time
+from decimal import Decimal
+
+from sqlalchemy import event
+
+from app.core.database import AsyncSessionLocal, async_engine
+from app.core.id_generator import id_generator
+from app.models.order import Order, OrderSample, OrderFee, OrderStatusHistory
+from app.services.order_writer import order_writer
+
+FEES = [
+    ("project", "检测费用", Decimal("300.00")),
+    ("urgent", "加急费用", Decimal("50.00")),
+    ("shipping", "运费", Decimal("20.00")),
+    ("coupon", "优惠券：满300减30", Decimal("-30.00")),
+]
+
+
+class QueryCounter:
+    """统计执行的SQL数量"""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def reset(self):
+        self.count = 0
+
+
+def order_values(user_id: int, sample_count: int) -> dict:
+    return dict(
+        order_no=id_generator.next_no("ORD"),
+        user_id=user_id,
+        project_id=1,
+        project_name="基准测试项目",
+        lab_id=1,
+        lab_name="平台实验室",
+        status="pending_payment",
+        project_fee=Decimal("300.00"),
+        urgent_fee=Decimal("50.00"),
+        shipping_fee=Decimal("20.00"),
+        discount_amount=Decimal("30.00"),
+        total_fee=Decimal("340.00"),
+        paid_fee=Decimal("0"),
+        sample_count=sample_count,
+        shipping_method="express",
+        is_urgent=True,
+        remark="benchmark"
+    )
+
+
+def make_samples(count: int) -> list:
+    return [
+        {
+            "sample_name": f"样品{i + 1}",
+            "sample_type": "粉末",
+            "sample_desc": "基准测试样品",
+            "quantity": 1,
+            "photos": [],
+            "test_params": {"temperature": "25"},
+            "special_requirements": None
+        }
+        for i in range(count)
+    ]
+
+
+async def write_per_row(db, user_id: int, samples: list):
+    """原实现：逐行 db.add，flush 取订单ID，提交前 refresh"""
+    order = Order(**order_values(user_id, len(samples)))
+    db.add(order)
+    await db.flush()
+    for sample in samples:
+        db.add(OrderSample(order_id=order.id, **sample))
+    for fee_type, fee_name, amount in FEES:
+        db.add(OrderFee(order_id=order.id, fee_type=fee_type, fee_name=fee_name, amount=amount))
+    db.add(OrderStatusHistory(
+        order_id=order.id, from_status=None, to_status="pending_payment",
+        operator_id=user_id, operator_type="user", remark="创建订单"
+    ))
+    await db.flush()
+    await db.refresh(order)
+
+
+async def write_bulk(db, user_id: int, samples: list):
+    """批量写入"""
+    await order_writer.create(db, order_values(user_id, len(samples)), samples, FEES, operator_id=user_id)
+
+
+async def run(writer, counter: QueryCounter, user_id: int, sample_count: int, rounds: int):
+    """返回 (每单SQL数, 每单平均耗时ms)"""
+    samples = make_samples(sample_count)
+    statements = 0
+    elapsed = 0.0
+    for _ in range(rounds):
+        async with AsyncSessionLocal() as db:
+            counter.reset()
+            started = time.perf_counter()
+            await writer(db, user_id, samples)
+            elapsed += time.perf_counter() - started
+            statements += counter.count
+            await db.rollback()
+    return statements / rounds, elapsed / rounds * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="下单写入基准测试")
+    parser.add_argument("--user-id", type=int, required=True, help="用户ID")
+    parser.add_argument("--samples", type=int, nargs="+", default=[1, 10, 100], help="每单样品数")
+    parser.add_argument("--rounds", type=int, default=50, help="每种情况的下单次数")
+    args = parser.parse_args()
+
+    counter = QueryCounter(async_engine.sync_engine)
+
+    print("=" * 60)
+    print(f"用户 {args.user_id}，每种情况 {args.rounds} 单（事务内写入后回滚）")
+    print("=" * 60)
+    print(f"{'样品数':>6}  {'方式':<6}  {'SQL/单':>8}  {'耗时/单':>10}")
+
+    for sample_count in args.samples:
+        # 预热连接池
+        await run(write_bulk, counter, args.user_id, sample_count, 1)
+        results = {}
+        for name, writer in (("逐行", write_per_row), ("批量", write_bulk)):
+            results[name] = await run(writer, counter, args.user_id, sample_count, args.rounds)
+            per_order, ms = results[name]
+            print(f"{sample_count:>6}  {name:<6}  {per_order:>8.1f}  {ms:>8.2f}ms")
+        speedup = results["逐行"][1] / results["批量"][1] if results["批量"][1] else 0
+        print(f"{'':>6}  提速 {speedup:.1f}x")
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
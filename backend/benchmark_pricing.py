@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+订单计价基准测试
+
+对同一用户、同一项目重复试算，统计每次试算执行的SQL数量和耗时：
+- 冷启动：项目价格未缓存（项目主键查询 + 优惠券查询）
+- 缓存后：项目价格命中缓存，每次试算只有一次优惠券查询（走 idx_user_status_expire 索引）
+
+用法:
+    python benchmark_pricing.py --user-id 1 --project-id 1 --rounds 1000
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import event
+
+from app.core.database import AsyncSessionLocal, async_engine
+from app.services.pricing_engine import pricing_engine
+
+
+class QueryCounter:
+    """统计执行的SQL数量"""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def reset(self):
+        self.count = 0
+
+
+async def quote_once(args) -> None:
+    async with AsyncSessionLocal() as db:
+        await pricing_engine.quote(
+            db,
+            args.user_id,
+            args.project_id,
+            sample_count=args.samples,
+            is_urgent=True,
+            shipping_method="express",
+            use_points=args.points
+        )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="订单计价基准测试")
+    parser.add_argument("--user-id", type=int, required=True, help="用户ID")
+    parser.add_argument("--project-id", type=int, required=True, help="项目ID")
+    parser.add_argument("--samples", type=int, default=3, help="样品数量")
+    parser.add_argument("--points", type=int, default=500, help="使用积分")
+    parser.add_argument("--rounds", type=int, default=1000, help="试算次数")
+    args = parser.parse_args()
+
+    counter = QueryCounter(async_engine.sync_engine)
+
+    print("=" * 60)
+    print(f"用户 {args.user_id}，项目 {args.project_id}，试算 {args.rounds} 次")
+    print("=" * 60)
+
+    # 冷启动
+    pricing_engine.invalidate_project()
+    counter.reset()
+    started = time.perf_counter()
+    await quote_once(args)
+    cold_ms = (time.perf_counter() - started) * 1000
+    print(f"冷启动   SQL: {counter.count}  耗时: {cold_ms:.2f}ms")
+
+    # 缓存后
+    counter.reset()
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        await quote_once(args)
+    elapsed = time.perf_counter() - started
+    per_quote = counter.count / args.rounds
+    print(f"缓存后   SQL/次: {per_quote:.2f}  平均耗时: {elapsed / args.rounds * 1000:.2f}ms  "
+          f"吞吐量: {args.rounds / elapsed:.0f} 次/秒")
+    print(f"缓存命中: {pricing_engine.stats()}")
+
+    await async_engine.dispose()
+    raise SystemExit(0 if per_quote <= 1 else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
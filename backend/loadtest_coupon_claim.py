@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+优惠券抢领压测
+
+创建一张限量优惠券，用大量并发线程（每个线程模拟不同用户，部分用户重复领取）同时领取，
+结束后校验：
+- 成功领取数 == 发行总量（不超发、不少发）
+- coupons.received_quantity、user_coupons、coupon_claims 三者数量一致
+- 每个用户最多领取一次
+
+用法:
+    python loadtest_coupon_claim.py --stock 1000 --users 5000 --workers 64
+"""
+import argparse
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func
+
+from app.core.database import SessionLocal, engine
+from app.models.coupon import Coupon, UserCoupon, CouponClaim, CouponType, CouponStatus
+from app.services.coupon_inventory import coupon_inventory, CouponClaimError
+
+# 压测用户ID从这里开始，避免与真实用户重叠
+USER_ID_BASE = 900000000
+
+
+def create_coupon(stock: int) -> int:
+    """创建压测用优惠券"""
+    db = SessionLocal()
+    try:
+        coupon = Coupon(
+            name=f"压测优惠券-{int(time.time())}",
+            type=CouponType.CASH,
+            cash_amount=1,
+            total_quantity=stock,
+            received_quantity=0,
+            valid_days=1,
+            status=CouponStatus.ACTIVE
+        )
+        db.add(coupon)
+        db.commit()
+        return coupon.id
+    finally:
+        db.close()
+
+
+def claim(coupon_id: int, user_id: int) -> str:
+    """模拟一次领券请求"""
+    db = SessionLocal()
+    try:
+        coupon = db.query(Coupon).filter(Coupon.id == coupon_id).first()
+        coupon_inventory.claim(db, coupon, user_id)
+        return "success"
+    except CouponClaimError as e:
+        return str(e)
+    except Exception as e:
+        db.rollback()
+        return f"error: {type(e).__name__}"
+    finally:
+        db.close()
+
+
+def verify(coupon_id: int, stock: int, users: int, successes: int) -> bool:
+    """校验库存与领取记录一致"""
+    db = SessionLocal()
+    try:
+        received = db.query(Coupon.received_quantity).filter(Coupon.id == coupon_id).scalar()
+        user_coupons = db.query(func.count(UserCoupon.id)).filter(UserCoupon.coupon_id == coupon_id).scalar()
+        claims = db.query(func.count(CouponClaim.id)).filter(CouponClaim.coupon_id == coupon_id).scalar()
+        max_per_user = db.query(func.count(UserCoupon.id)).filter(
+            UserCoupon.coupon_id == coupon_id
+        ).group_by(UserCoupon.user_id).order_by(func.count(UserCoupon.id).desc()).limit(1).scalar() or 0
+    finally:
+        db.close()
+
+    print(f"发行总量: {stock}  成功领取: {successes}  received_quantity: {received}  "
+          f"user_coupons: {user_coupons}  coupon_claims: {claims}  单用户最多: {max_per_user}")
+    return successes == received == user_coupons == claims == min(stock, users) and max_per_user <= 1
+
+
+def cleanup(coupon_id: int):
+    """删除压测数据"""
+    db = SessionLocal()
+    try:
+        db.query(CouponClaim).filter(CouponClaim.coupon_id == coupon_id).delete()
+        db.query(UserCoupon).filter(UserCoupon.coupon_id == coupon_id).delete()
+        db.query(Coupon).filter(Coupon.id == coupon_id).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="优惠券抢领压测")
+    parser.add_argument("--stock", type=int, default=1000, help="优惠券发行总量")
+    parser.add_argument("--users", type=int, default=5000, help="参与抢领的用户数")
+    parser.add_argument("--repeat", type=float, default=0.2, help="重复领取请求占比")
+    parser.add_argument("--workers", type=int, default=64, help="并发线程数（需小于连接池大小+溢出）")
+    parser.add_argument("--keep", action="store_true", help="保留压测数据")
+    args = parser.parse_args()
+
+    coupon_id = create_coupon(args.stock)
+    user_ids = [USER_ID_BASE + i for i in range(args.users)]
+    requests = user_ids + random.sample(user_ids, int(args.users * args.repeat))
+    random.shuffle(requests)
+
+    print("=" * 70)
+    print(f"优惠券 {coupon_id}: 库存 {args.stock}，{len(requests)} 次请求，{args.workers} 个并发线程")
+    print("=" * 70)
+
+    results = Counter()
+    lock = threading.Lock()
+
+    def worker(user_id: int):
+        outcome = claim(coupon_id, user_id)
+        with lock:
+            results[outcome] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        list(executor.map(worker, requests))
+    elapsed = time.perf_counter() - started
+
+    for outcome, count in results.most_common():
+        print(f"  {outcome:<20} {count}")
+    print(f"耗时: {elapsed:.2f}s  吞吐量: {len(requests) / elapsed:.0f} 次/秒")
+
+    ok = verify(coupon_id, args.stock, args.users, results["success"])
+    print("结果: " + ("通过，无超发" if ok else "失败，库存与领取记录不一致"))
+
+    if not args.keep:
+        cleanup(coupon_id)
+    engine.dispose()
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+分布式ID生成器并发测试
+
+启动多个进程（spawn 方式，与 uvicorn 多 worker 相同，每个进程独立获取机器号），
+每个进程再用多个线程同时生成ID，结束后校验：
+- 所有进程、所有线程生成的ID没有重复
+- 每个线程内生成的ID严格递增（时间有序）
+- 单号长度不超过数据库字段长度（order_no/payment_no 为32位）
+
+用法:
+    python loadtest_id_generator.py --processes 8 --threads 4 --count 200000
+    # 未配置 Redis 时可指定起始机器号，模拟按实例配置 SNOWFLAKE_WORKER_ID
+    python loadtest_id_generator.py --processes 8 --worker-base 100
+"""
+import argparse
+import multiprocessing
+import threading
+import time
+
+# 单号字段长度（orders.order_no / payments.payment_no）
+NO_COLUMN_LENGTH = 32
+
+
+def generate(args) -> tuple:
+    """子进程：多线程生成ID，返回 (机器号, 每个线程的ID列表, 耗时)"""
+    index, worker_base, threads, count = args
+    from app.core.id_generator import SnowflakeGenerator
+
+    generator = SnowflakeGenerator(worker_id=None if worker_base is None else worker_base + index)
+    results = [None] * threads
+
+    def worker(slot: int):
+        results[slot] = [generator.next_id() for _ in range(count)]
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(slot,)) for slot in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return generator.worker_id, results, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分布式ID生成器并发测试")
+    parser.add_argument("--processes", type=int, default=8, help="进程数")
+    parser.add_argument("--threads", type=int, default=4, help="每个进程的线程数")
+    parser.add_argument("--count", type=int, default=200000, help="每个线程生成的ID数")
+    parser.add_argument("--worker-base", type=int, default=None, help="起始机器号（不传则自动分配）")
+    args = parser.parse_args()
+
+    total = args.processes * args.threads * args.count
+    print("=" * 70)
+    print(f"{args.processes} 个进程 x {args.threads} 个线程 x {args.count} 个ID = {total} 个ID")
+    print("=" * 70)
+
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(args.processes) as pool:
+        outcomes = pool.map(
+            generate,
+            [(i, args.worker_base, args.threads, args.count) for i in range(args.processes)]
+        )
+
+    from app.core.id_generator import ID_DIGITS
+
+    seen = set()
+    ordered = True
+    for worker_id, results, elapsed in outcomes:
+        generated = sum(len(ids) for ids in results)
+        print(f"  机器号 {worker_id:<5} {generated} 个ID  {generated / elapsed:,.0f} 个/秒")
+        for ids in results:
+            ordered = ordered and all(a < b for a, b in zip(ids, ids[1:]))
+            seen.update(ids)
+
+    worker_ids = [worker_id for worker_id, _, _ in outcomes]
+    # 按已生成的最大ID计算单号长度（与 next_no 的格式相同），不再获取机器号
+    longest = len(f"PAY{max(seen):0{ID_DIGITS}d}") if seen else 0
+    print(f"不重复ID: {len(seen)} / {total}  机器号不重复: {len(set(worker_ids)) == len(worker_ids)}  "
+          f"线程内递增: {ordered}  单号长度: {longest}")
+
+    ok = len(seen) == total and ordered and longest <= NO_COLUMN_LENGTH
+    print("结果: " + ("通过，无重复" if ok else "失败"))
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,7 @@ sys.path.insert(0, '/Users/yy/Documents/GitHub/eceshi/backend')
 from app.core.database import SessionLocal
 from app.models.recharge import RechargeRecord, RechargeStatus
 from app.models.user import User
+from app.services.wallet_service import wallet_service
 
 def complete_recharge(recharge_no: str):
     """完成指定的充值订单"""
@@ -66,8 +67,23 @@ def complete_recharge(recharge_no: str):
             print("❌ 已取消")
             return False
         
-        # 更新用户余额
-        user.prepaid_balance = new_balance
+        # 锁定充值记录后再次检查状态（等待确认期间回调可能已到达）
+        db.refresh(recharge, with_for_update=True)
+        if recharge.status == RechargeStatus.SUCCESS:
+            db.rollback()
+            print(f"✅ 该充值订单已由支付回调完成")
+            return True
+        
+        # 更新用户余额（原子更新并记录钱包流水）
+        transaction = wallet_service.credit_sync(
+            db,
+            recharge.user_id,
+            recharge.actual_amount,
+            biz_type="recharge",
+            biz_no=recharge.recharge_no,
+            remark="手动完成充值"
+        )
+        new_balance = transaction.balance_after
         
         # 更新充值记录
         recharge.status = RechargeStatus.SUCCESS
@@ -0,0 +1,16 @@
+-- 仪表盘全量合计快照
+-- 后台刷新每日统计时把全量合计和订单状态分布写入当日汇总行，仪表盘接口只读取 daily_stats；
+-- 合计按状态分组聚合，(status, 金额) 覆盖索引使聚合只扫描索引
+
+ALTER TABLE `daily_stats`
+  ADD COLUMN `total_users` INT DEFAULT NULL COMMENT '用户总数',
+  ADD COLUMN `total_orders` INT DEFAULT NULL COMMENT '订单总数',
+  ADD COLUMN `total_revenue` DECIMAL(14,2) DEFAULT NULL COMMENT '累计收入（当前为已支付状态的订单）',
+  ADD COLUMN `total_recharge` DECIMAL(14,2) DEFAULT NULL COMMENT '累计成功充值金额',
+  ADD COLUMN `total_projects` INT DEFAULT NULL COMMENT '项目总数',
+  ADD COLUMN `active_projects` INT DEFAULT NULL COMMENT '上架项目数',
+  ADD COLUMN `pending_recharge_count` INT DEFAULT NULL COMMENT '待处理充值笔数',
+  ADD COLUMN `order_status_counts` JSON DEFAULT NULL COMMENT '订单状态分布 {状态: 数量}';
+
+ALTER TABLE `orders` ADD INDEX `idx_status_total_fee` (`status`, `total_fee`);
+ALTER TABLE `recharge_records` ADD INDEX `idx_status_amount` (`status`, `amount`);
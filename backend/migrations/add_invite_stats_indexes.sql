@@ -0,0 +1,5 @@
+-- 邀请统计聚合索引
+-- 邀请统计和可提现金额按状态 GROUP BY 聚合，索引覆盖筛选和分组列
+
+ALTER TABLE `invite_records` ADD INDEX `idx_inviter_status` (`inviter_id`, `status`);
+ALTER TABLE `withdraw_records` ADD INDEX `idx_user_status` (`user_id`, `status`);
@@ -0,0 +1,8 @@
+-- 游标分页索引
+-- 列表按 (created_at, id) 倒序分页，InnoDB 二级索引隐含主键，(user_id, created_at) 即可覆盖排序
+
+ALTER TABLE `orders` ADD INDEX `idx_user_created` (`user_id`, `created_at`);
+ALTER TABLE `points_records` ADD INDEX `idx_user_created` (`user_id`, `created_at`);
+ALTER TABLE `lottery_records` ADD INDEX `idx_user_created` (`user_id`, `created_at`);
+ALTER TABLE `user_coupons` ADD INDEX `idx_user_created` (`user_id`, `created_at`);
+ALTER TABLE `recharge_records` ADD INDEX `idx_created_at` (`created_at`);
@@ -0,0 +1,5 @@
+-- 预付记录归并分页索引
+-- 充值记录和余额支付订单各自按时间倒序读取一页后归并，索引覆盖筛选条件和排序
+
+ALTER TABLE `recharge_records` ADD INDEX `idx_user_status_completed` (`user_id`, `status`, `completed_at`);
+ALTER TABLE `orders` ADD INDEX `idx_user_payment_paid` (`user_id`, `payment_method`, `paid_at`);
@@ -0,0 +1,5 @@
+-- 项目关键词搜索全文索引
+-- 仅在 PROJECT_SEARCH_BACKEND=mysql 时需要（MySQL 5.7.6+，ngram 分词器默认 ngram_token_size=2）
+
+ALTER TABLE `projects`
+  ADD FULLTEXT INDEX `ft_projects_search` (`name`, `project_no`, `introduction`) WITH PARSER ngram;
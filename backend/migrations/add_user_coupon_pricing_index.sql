@@ -0,0 +1,4 @@
+-- 订单计价索引
+-- 试算/下单时一次查询加载用户未使用且未过期的优惠券
+
+ALTER TABLE `user_coupons` ADD INDEX `idx_user_status_expire` (`user_id`, `status`, `expire_at`);
@@ -0,0 +1,4 @@
+-- 用户更新时间索引
+-- 认证缓存的后台任务每秒按 updated_at 查询最近变更的用户，使各进程的用户快照失效
+
+ALTER TABLE `users` ADD INDEX `idx_updated_at` (`updated_at`);
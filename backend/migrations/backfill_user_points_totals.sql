@@ -0,0 +1,17 @@
+-- 积分汇总回填
+-- 积分余额改为读取 users 表上的汇总字段（积分变动时同步更新），上线前按 points_records 回填一次
+
+UPDATE `users` u
+LEFT JOIN (
+  SELECT
+    `user_id`,
+    SUM(`points`) AS `balance`,
+    SUM(CASE WHEN `points` > 0 THEN `points` ELSE 0 END) AS `earned`,
+    SUM(CASE WHEN `points` < 0 THEN -`points` ELSE 0 END) AS `used`
+  FROM `points_records`
+  GROUP BY `user_id`
+) h ON h.`user_id` = u.`id`
+SET
+  u.`points_balance` = COALESCE(h.`balance`, 0),
+  u.`total_points_earned` = COALESCE(h.`earned`, 0),
+  u.`total_points_used` = COALESCE(h.`used`, 0);
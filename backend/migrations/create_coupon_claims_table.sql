@@ -0,0 +1,21 @@
+-- 优惠券领取记录表
+-- 每个用户每种券一行，指向当前持有的用户优惠券；唯一索引 (coupon_id, user_id) 使并发领取串行化，
+-- 该券仍未使用时不能再次领取（已使用或已过期后可以再领），替代领取前的 SELECT 检查
+
+CREATE TABLE IF NOT EXISTS `coupon_claims` (
+  `id` INT NOT NULL AUTO_INCREMENT COMMENT 'ID',
+  `coupon_id` INT NOT NULL COMMENT '优惠券ID',
+  `user_id` INT NOT NULL COMMENT '用户ID',
+  `user_coupon_id` INT COMMENT '当前持有的用户优惠券ID',
+  `created_at` DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '领取时间',
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uk_coupon_user` (`coupon_id`, `user_id`),
+  KEY `idx_user_id` (`user_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='优惠券领取记录表';
+
+-- 历史数据：用户当前持有的未使用优惠券视为已领取
+INSERT IGNORE INTO `coupon_claims` (`coupon_id`, `user_id`, `user_coupon_id`, `created_at`)
+SELECT `coupon_id`, `user_id`, MIN(`id`), MIN(`received_at`)
+FROM `user_coupons`
+WHERE `status` = 'unused'
+GROUP BY `coupon_id`, `user_id`;
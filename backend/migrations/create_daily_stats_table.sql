@@ -0,0 +1,24 @@
+-- 仪表盘每日统计汇总表
+-- 历史日期计算一次后冻结（is_final=1），之后只重算当日数据
+
+CREATE TABLE IF NOT EXISTS `daily_stats` (
+  `id` INT NOT NULL AUTO_INCREMENT COMMENT 'ID',
+  `stat_date` DATE NOT NULL COMMENT '统计日期',
+  `new_users` INT DEFAULT 0 COMMENT '新增用户数',
+  `order_count` INT DEFAULT 0 COMMENT '新增订单数',
+  `paid_order_count` INT DEFAULT 0 COMMENT '当日支付订单数',
+  `revenue` DECIMAL(12,2) DEFAULT 0 COMMENT '当日收入（按支付时间）',
+  `recharge_count` INT DEFAULT 0 COMMENT '成功充值笔数',
+  `recharge_amount` DECIMAL(12,2) DEFAULT 0 COMMENT '成功充值金额',
+  `is_final` TINYINT(1) DEFAULT 0 COMMENT '是否已冻结',
+  `created_at` DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+  `updated_at` DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uk_stat_date` (`stat_date`),
+  KEY `idx_is_final` (`is_final`, `stat_date`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='每日统计汇总表';
+
+-- 汇总计算使用的时间范围索引（替代 DATE(created_at) = ? 全表扫描）
+ALTER TABLE `orders` ADD INDEX `idx_created_at` (`created_at`);
+ALTER TABLE `orders` ADD INDEX `idx_paid_at` (`paid_at`);
+ALTER TABLE `users` ADD INDEX `idx_created_at` (`created_at`);
@@ -0,0 +1,14 @@
+-- 抽奖奖品每日发放计数表
+-- 抽奖时通过条件 UPDATE 原子扣减每日限量（daily_limit），避免并发超发
+
+CREATE TABLE IF NOT EXISTS `lottery_prize_daily_stock` (
+  `id` BIGINT NOT NULL AUTO_INCREMENT COMMENT 'ID',
+  `prize_id` BIGINT NOT NULL COMMENT '奖品ID',
+  `stat_date` DATE NOT NULL COMMENT '日期',
+  `issued_count` INT NOT NULL DEFAULT 0 COMMENT '当日已发放数量',
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uk_prize_date` (`prize_id`, `stat_date`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='抽奖奖品每日发放计数表';
+
+-- 抽奖时查找可用抽奖机会
+ALTER TABLE `lottery_chances` ADD INDEX `idx_user_unused` (`user_id`, `is_used`);
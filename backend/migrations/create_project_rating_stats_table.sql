@@ -0,0 +1,27 @@
+-- 项目评分汇总表
+-- 项目评价列表的评价数和平均分直接读取汇总行，创建评价时在同一事务中累加
+
+CREATE TABLE IF NOT EXISTS `project_rating_stats` (
+  `project_id` BIGINT NOT NULL COMMENT '项目ID',
+  `review_count` INT NOT NULL DEFAULT 0 COMMENT '评价数',
+  `service_rating_sum` INT NOT NULL DEFAULT 0 COMMENT '服务质量评分总和',
+  `quality_rating_sum` INT NOT NULL DEFAULT 0 COMMENT '检测效果评分总和',
+  `logistics_rating_sum` INT NOT NULL DEFAULT 0 COMMENT '物流配送评分总和',
+  `updated_at` DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+  PRIMARY KEY (`project_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='项目评分汇总表';
+
+-- 按已有评价回填
+INSERT INTO `project_rating_stats`
+  (`project_id`, `review_count`, `service_rating_sum`, `quality_rating_sum`, `logistics_rating_sum`)
+SELECT `project_id`, COUNT(*), SUM(`service_rating`), SUM(`quality_rating`), SUM(`logistics_rating`)
+FROM `order_reviews`
+GROUP BY `project_id`
+ON DUPLICATE KEY UPDATE
+  `review_count` = VALUES(`review_count`),
+  `service_rating_sum` = VALUES(`service_rating_sum`),
+  `quality_rating_sum` = VALUES(`quality_rating_sum`),
+  `logistics_rating_sum` = VALUES(`logistics_rating_sum`);
+
+-- 项目评价列表按时间倒序分页
+ALTER TABLE `order_reviews` ADD INDEX `idx_project_created` (`project_id`, `created_at`);
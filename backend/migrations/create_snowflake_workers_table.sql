@@ -0,0 +1,11 @@
+-- 分布式ID机器号租约表
+-- 未配置 Redis 且未设置 SNOWFLAKE_WORKER_ID 时，每个进程在此表占用一个机器号并定期续期，
+-- 进程退出后租约到期，机器号可被其他进程重新占用
+
+CREATE TABLE IF NOT EXISTS `snowflake_workers` (
+  `worker_id` INT NOT NULL COMMENT '机器号 0-1023',
+  `token` VARCHAR(32) NOT NULL COMMENT '持有者令牌（每个进程随机生成）',
+  `expires_at` DATETIME NOT NULL COMMENT '租约到期时间',
+  PRIMARY KEY (`worker_id`),
+  KEY `idx_expires_at` (`expires_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='机器号租约表';
@@ -0,0 +1,13 @@
+-- 上传文件内容表
+-- 上传文件按内容 SHA-256 摘要保存（static/uploads/cas/<摘要前两位>/<摘要><扩展名>），
+-- 重复上传返回已有URL并增加引用次数，删除时引用次数归零才删除文件
+
+CREATE TABLE IF NOT EXISTS `upload_blobs` (
+  `digest` CHAR(64) NOT NULL COMMENT '内容SHA-256摘要',
+  `url` VARCHAR(255) NOT NULL COMMENT '访问URL',
+  `size` BIGINT NOT NULL COMMENT '文件大小（字节）',
+  `ref_count` INT NOT NULL DEFAULT 0 COMMENT '引用次数',
+  `created_at` DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '首次上传时间',
+  `updated_at` DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+  PRIMARY KEY (`digest`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='上传文件内容表';
@@ -0,0 +1,15 @@
+-- 上传文件引用表
+-- 记录每个上传者对每份内容的引用次数，删除时只能减少自己持有的引用；
+-- upload_blobs.ref_count 为所有用户引用之和，归零时删除文件
+
+CREATE TABLE IF NOT EXISTS `upload_refs` (
+  `digest` CHAR(64) NOT NULL COMMENT '内容SHA-256摘要',
+  `user_id` INT NOT NULL COMMENT '上传用户ID',
+  `ref_count` INT NOT NULL DEFAULT 0 COMMENT '该用户的引用次数',
+  `created_at` DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '首次上传时间',
+  `updated_at` DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+  PRIMARY KEY (`digest`, `user_id`),
+  KEY `idx_user_id` (`user_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='上传文件引用表';
+
+-- 历史数据：已有文件的上传者未记录，不会生成引用行，这些文件不能再通过删除接口删除
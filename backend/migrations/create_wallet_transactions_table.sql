@@ -0,0 +1,19 @@
+-- 钱包余额流水表（只追加）
+-- 余额扣款使用条件 UPDATE（prepaid_balance >= 金额），每次变动写入一条流水；
+-- (user_id, idempotency_key) 唯一索引保证同一个请求重试时只扣款一次
+
+CREATE TABLE IF NOT EXISTS `wallet_transactions` (
+  `id` BIGINT NOT NULL AUTO_INCREMENT COMMENT 'ID',
+  `user_id` INT NOT NULL COMMENT '用户ID',
+  `amount` DECIMAL(10,2) NOT NULL COMMENT '变动金额（正数为入账，负数为扣款）',
+  `balance_after` DECIMAL(10,2) NOT NULL COMMENT '变动后余额',
+  `biz_type` VARCHAR(20) NOT NULL COMMENT '业务类型: order_pay/recharge/refund/prize/adjust',
+  `biz_no` VARCHAR(64) COMMENT '业务单号',
+  `remark` VARCHAR(200) COMMENT '备注',
+  `idempotency_key` VARCHAR(64) COMMENT '幂等键',
+  `created_at` DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uk_user_idempotency_key` (`user_id`, `idempotency_key`),
+  KEY `idx_user_created` (`user_id`, `created_at`),
+  KEY `idx_biz_no` (`biz_no`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='钱包余额流水表';